@@ -0,0 +1,236 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Gap Detection and Patient x Day x Minute of Day Alignment
+
+"""
+# json and os imported to keep the tensor's patient ids and timing checks next to it, warnings
+# imported to quiet numpy about minutes no patient has data for, numpy imported to check
+# timestamps with differences and to line every recording up in one array
+import json
+import os
+import warnings
+import numpy as np
+from finalproject_cache import write_json
+
+# Minutes in a day, the last axis of the aligned tensor
+MINUTES_PER_DAY = 1440
+
+def timing_report(timestamps):
+    """
+    This function takes in a participant's timestamps and finds gaps, repeated minutes, and
+    minutes out of order from the differences between neighbouring timestamps.
+
+    Parameters
+    ----------
+    timestamps : numpy.ndarray
+        Array of datetime64[m] timestamps in file order.
+
+    Returns
+    -------
+    report : dict
+        Dictionary with the number of "rows", the "first" and "last" timestamps (strings,
+        None without rows), the number of "gaps" (jumps of more than a minute), the
+        "missing_minutes" inside those gaps, the number of "duplicates" (a minute repeated
+        right after itself), and the number of "backwards" steps (a minute earlier than the
+        one before it).
+
+    """
+    minutes = np.asarray(timestamps, dtype="datetime64[m]").astype(np.int64)
+    steps = np.diff(minutes)
+    gaps = steps > 1
+    return {"rows": int(minutes.size),
+            "first": str(np.datetime64(int(minutes.min()), "m")) if minutes.size else None,
+            "last": str(np.datetime64(int(minutes.max()), "m")) if minutes.size else None,
+            "gaps": int(np.count_nonzero(gaps)),
+            "missing_minutes": int((steps[gaps] - 1).sum()),
+            "duplicates": int(np.count_nonzero(steps == 0)),
+            "backwards": int(np.count_nonzero(steps < 0))}
+
+def day_minute_positions(timestamps):
+    """
+    This function takes in a participant's timestamps and finds the recording day (0 for
+    the calendar day of the first timestamp) and minute of the day of each one.
+
+    Parameters
+    ----------
+    timestamps : numpy.ndarray
+        Array of datetime64[m] timestamps.
+
+    Returns
+    -------
+    days : numpy.ndarray
+        Recording day of each timestamp.
+    minute_of_day : numpy.ndarray
+        Minute of the day (0 is midnight, 120 is 02:00) of each timestamp.
+
+    """
+    minutes = np.asarray(timestamps, dtype="datetime64[m]").astype(np.int64)
+    days, minute_of_day = np.divmod(minutes, MINUTES_PER_DAY)
+    return days - days.min() if days.size else days, minute_of_day
+
+def fill_patient(tensor_row, movement_data, timestamps):
+    """
+    This function takes in one patient's row of the aligned tensor and the patient's movement
+    data and timestamps, and writes each value at its recording day and minute of day.
+    A minute recorded more than once keeps its last value.
+
+    Parameters
+    ----------
+    tensor_row : numpy.ndarray
+        Array of shape (days, 1440) to fill, nan where there is no data.
+    movement_data : numpy.ndarray
+        Movement data for one participant.
+    timestamps : numpy.ndarray
+        Array of datetime64[m] timestamps matching the movement data.
+
+    Returns
+    -------
+    None.
+
+    """
+    days, minute_of_day = day_minute_positions(timestamps)
+    keep = days < tensor_row.shape[0]
+    tensor_row[days[keep], minute_of_day[keep]] = movement_data[keep]
+
+def build_tensor(ids, recordings, filename=None, n_days=None):
+    """
+    This function takes in patient ids and their recordings and lines every recording up
+    in one (patients, days, 1440) array, day 0 being each patient's first calendar day, so
+    the same clock minute is at the same position for every patient.
+
+    Parameters
+    ----------
+    ids : list
+        Patient ids, one per recording (rows of the tensor, in this order).
+    recordings : list
+        List of (movement data, timestamps) tuples.
+    filename : str, optional
+        Name of a .npy file to write the tensor to (memory mapped, with the ids and the
+        timing report of each patient written to the file name plus ".json"). The default
+        is None (the tensor is kept in memory).
+    n_days : int, optional
+        Number of days to keep. The default is None (the longest recording's days).
+
+    Returns
+    -------
+    tensor : numpy.ndarray
+        float32 array of shape (patients, days, 1440) with nan for minutes without data.
+    reports : list
+        Timing report of each recording made by the timing_report function.
+
+    """
+    # Source for writing arrays straight to .npy files: https://numpy.org/doc/stable/reference/generated/numpy.lib.format.open_memmap.html
+    reports = [timing_report(timestamps) for movement_data, timestamps in recordings]
+    if n_days is None:
+        n_days = max((int(day_minute_positions(timestamps)[0].max()) + 1
+                      for movement_data, timestamps in recordings if len(timestamps)), default=0)
+    shape = (len(recordings), n_days, MINUTES_PER_DAY)
+
+    # Tensor made in memory or as a memory mapped file, filled with nan, then one patient row at a time
+    if filename is None:
+        tensor = np.full(shape, np.nan, dtype=np.float32)
+    else:
+        tensor = np.lib.format.open_memmap(filename + ".tmp", mode="w+", dtype=np.float32, shape=shape)
+        tensor[:] = np.nan
+    for row, (movement_data, timestamps) in enumerate(recordings):
+        fill_patient(tensor[row], np.asarray(movement_data), timestamps)
+
+    # File moved into place and reopened read only, with the ids and timing reports next to it
+    if filename is not None:
+        tensor.flush()
+        del tensor
+        os.replace(filename + ".tmp", filename)
+        write_json(filename + ".json", {"ids": [int(patient_id) for patient_id in ids], "timing": reports})
+        tensor = np.load(filename, mmap_mode="r")
+    return tensor, reports
+
+def load_tensor(filename):
+    """
+    This function takes in the name of a tensor file written by the build_tensor function
+    and memory maps it.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the .npy tensor file.
+
+    Returns
+    -------
+    ids : numpy.ndarray
+        int64 patient id of each row.
+    tensor : numpy.ndarray
+        Read only memory mapped (patients, days, 1440) tensor.
+    reports : list
+        Timing report of each patient.
+
+    """
+    with open(filename + ".json") as file:
+        meta = json.load(file)
+    return np.array(meta["ids"], dtype=np.int64), np.load(filename, mmap_mode="r"), meta["timing"]
+
+def tensor_rows(ids, wanted_ids):
+    """
+    This function takes in the patient ids of the tensor rows and the ids of a group, and
+    finds the rows of the group's patients.
+
+    Parameters
+    ----------
+    ids : numpy.ndarray
+        Sorted patient id of each tensor row.
+    wanted_ids : numpy.ndarray
+        Patient ids of the group, e.g. from stratum_ids in finalproject_info.
+
+    Returns
+    -------
+    rows : numpy.ndarray
+        Rows of the group's patients that are in the tensor.
+
+    """
+    wanted_ids = np.intersect1d(wanted_ids, ids)
+    return np.searchsorted(ids, wanted_ids)
+
+def minute_profile(tensor, rows=None):
+    """
+    This function takes in an aligned tensor and finds the average movement at each minute
+    of the day over the chosen patients and all their days, ignoring minutes without data.
+
+    Parameters
+    ----------
+    tensor : numpy.ndarray
+        Tensor made by the build_tensor function.
+    rows : numpy.ndarray, optional
+        Rows of the patients to average over. The default is None (every patient).
+
+    Returns
+    -------
+    profile : numpy.ndarray
+        Average movement at each of the 1440 minutes of the day (nan where no patient has data).
+
+    """
+    # Source for nanmean: https://numpy.org/doc/stable/reference/generated/numpy.nanmean.html
+    selected = tensor if rows is None else tensor[rows]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmean(selected, axis=(0, 1), dtype=np.float64)
+
+def clock_minute(hour, minute=0):
+    """
+    This function takes in a clock time and returns its position on the tensor's last axis.
+
+    Parameters
+    ----------
+    hour : int
+        Hour (24 hour clock).
+    minute : int, optional
+        Minute. The default is 0.
+
+    Returns
+    -------
+    minute_of_day : int
+        Minute of the day, e.g. 120 for 02:00.
+
+    """
+    return hour * 60 + minute
@@ -0,0 +1,401 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Synthetic Cohort Generator and Benchmark Suite
+
+"""
+# argparse, json, os, platform, subprocess, sys, tempfile, time, and tracemalloc imported
+# to run the pipeline stages on generated cohorts and record their time and memory use
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import finalproject_combine as combine
+
+# Columns of the HYPERACTIV patient_info.csv file, in order
+INFO_COLUMNS = ("ID;SEX;AGE;ACC;ACC_TIME;ACC_DAYS;HRV;HRV_TIME;HRV_HOURS;CPT_II;ADHD;ADD;BIPOLAR;UNIPOLAR;"
+                "ANXIETY;SUBSTANCE;OTHER;CT;MDQ_POS;WURS;ASRS;MADRS;HADS_A;HADS_D;MED;MED_Antidepr;"
+                "MED_Moodstab;MED_Antipsych;MED_Anxiety_Benzo;MED_Sleep;MED_Analgesics_Opioids;"
+                "MED_Stimulants;filter_$").split(";")
+
+# Shortest and longest recordings (in minutes) in the HYPERACTIV activity files
+MIN_MINUTES = 8600
+MAX_MINUTES = 14600
+
+# Directory this file is in, so the graphing program can be found from any working directory
+PROGRAM_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def generate_info_row(rng, patient_id):
+    """
+    This function takes in a random number generator and a patient id and makes one
+    semicolon separated patient_info.csv row with plausible values.
+
+    Parameters
+    ----------
+    rng : numpy.random.Generator
+        Random number generator.
+    patient_id : int
+        The patient id.
+
+    Returns
+    -------
+    row : str
+        One line of patient_info.csv (without a line ending).
+
+    """
+    values = {column: "" for column in INFO_COLUMNS}
+    values["ID"] = str(patient_id)
+    values["SEX"] = str(rng.integers(2))
+    values["AGE"] = str(rng.integers(1, 5))
+    values["ACC"] = "1"
+    values["ACC_TIME"] = str(rng.integers(8, 18)).zfill(2) + ":" + str(rng.integers(60)).zfill(2) + ":00"
+    values["ACC_DAYS"] = str(round(rng.uniform(5, 10), 1))
+    values["ADHD"] = str(rng.integers(2))
+    values["filter_$"] = "1"
+
+    # Yes/no diagnosis columns, questionnaire scores, and (mostly empty) medication columns
+    for column in ("HRV", "CPT_II", "ADD", "BIPOLAR", "UNIPOLAR", "ANXIETY", "SUBSTANCE", "OTHER", "CT", "MDQ_POS", "MED"):
+        values[column] = str(rng.integers(2))
+    for column, high in (("WURS", 90), ("ASRS", 72), ("MADRS", 40), ("HADS_A", 21), ("HADS_D", 21)):
+        values[column] = str(rng.integers(high))
+    for column in INFO_COLUMNS[25:32]:
+        if values["MED"] == "1" and rng.random() < 0.3:
+            values[column] = "1"
+    return ";".join(values[column] for column in INFO_COLUMNS)
+
+def generate_activity(rng, n_minutes):
+    """
+    This function takes in a random number generator and a recording length and makes a
+    synthetic minute by minute recording that starts at a random time, is mostly zeros at
+    night, and has skewed bursts of movement during the day.
+
+    Parameters
+    ----------
+    rng : numpy.random.Generator
+        Random number generator.
+    n_minutes : int
+        Length of the recording in minutes.
+
+    Returns
+    -------
+    timestamps : numpy.ndarray
+        Array of datetime64[m] timestamps, one per minute.
+    activity : numpy.ndarray
+        Array of int64 movement counts.
+
+    """
+    start = np.datetime64("2009-01-01T00:00") + int(rng.integers(0, 365 * 24 * 60))
+    timestamps = start + np.arange(n_minutes)
+    hours = (timestamps.astype(np.int64) // 60) % 24
+    resting = rng.random(n_minutes) < np.where((hours >= 23) | (hours < 7), 0.9, 0.4)
+    bursts = rng.gamma(1.2, 150 * rng.uniform(0.5, 1.5), n_minutes).astype(np.int64)
+    return timestamps, np.where(resting, 0, bursts)
+
+def format_activity(timestamps, activity):
+    """
+    This function takes in timestamps and movement counts and formats them exactly like a
+    HYPERACTIV activity file (TIMESTAMP;ACTIVITY header, MM-DD-YYYY HH:MM timestamps,
+    semicolons, and Windows line endings).
+
+    Parameters
+    ----------
+    timestamps : numpy.ndarray
+        Array of datetime64[m] timestamps.
+    activity : numpy.ndarray
+        Array of integer movement counts.
+
+    Returns
+    -------
+    raw : bytes
+        The file contents.
+
+    """
+    # ISO timestamps (YYYY-MM-DDTHH:MM) rearranged to MM-DD-YYYY HH:MM with fixed width string slicing
+    iso = np.datetime_as_string(timestamps, unit="m").astype("S16")
+    parts = iso.view("S1").reshape(-1, 16)
+    reordered = parts[:, [5, 6, 4, 8, 9, 7, 0, 1, 2, 3, 10, 11, 12, 13, 14, 15]].copy()
+    reordered[:, 10] = b" "
+    stamped = reordered.view("S16").ravel()
+    lines = np.char.add(np.char.add(stamped, b";"), np.char.add(activity.astype("S"), b"\r\n"))
+    return b"TIMESTAMP;ACTIVITY\r\n" + b"".join(lines.tolist())
+
+def generate_cohort(directory, n_patients, min_minutes=MIN_MINUTES, max_minutes=MAX_MINUTES, seed=0):
+    """
+    This function takes in a directory, a number of patients, a range of recording lengths,
+    and a random seed, and writes a synthetic patient_info.csv and one patient_activity_NN.csv
+    file per patient. The same arguments always make the same files.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to write the files to (made if it does not exist).
+    n_patients : int
+        Number of patients (ids 1 to n_patients).
+    min_minutes : int, optional
+        Shortest recording length in minutes. The default is MIN_MINUTES.
+    max_minutes : int, optional
+        Longest recording length in minutes. The default is MAX_MINUTES.
+    seed : int, optional
+        Random seed. The default is 0.
+
+    Returns
+    -------
+    n_bytes : int
+        Total size of the written files in bytes.
+
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    rows = [generate_info_row(rng, patient_id) for patient_id in range(1, n_patients + 1)]
+    info = ";".join(INFO_COLUMNS) + "\r\n" + "\r\n".join(rows) + "\r\n"
+    with open(os.path.join(directory, "patient_info.csv"), "w", newline="") as file:
+        file.write(info)
+    n_bytes = len(info)
+
+    # Each patient gets a child random generator so a patient's file does not depend on the others
+    for patient_id, child in zip(range(1, n_patients + 1), rng.spawn(n_patients)):
+        raw = format_activity(*generate_activity(child, int(child.integers(min_minutes, max_minutes + 1))))
+        with open(os.path.join(directory, combine.activity_file_name(patient_id)), "wb") as file:
+            file.write(raw)
+        n_bytes += len(raw)
+    return n_bytes
+
+def measure(function, *args, trace=True, **kwargs):
+    """
+    This function takes in a function and its arguments, runs it, and records its wall
+    time and peak traced memory.
+
+    Parameters
+    ----------
+    function : function
+        Function to run.
+    *args, **kwargs
+        Arguments for the function.
+    trace : bool, optional
+        Whether to trace memory (tracing slows down code that makes many small python
+        objects). The default is True, with False the peak is recorded as None.
+
+    Returns
+    -------
+    result : object
+        What the function returned.
+    record : dict
+        Dictionary with the "seconds" and "peak_bytes" of the run.
+
+    """
+    # Source for tracemalloc: https://docs.python.org/3/library/tracemalloc.html
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = function(*args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - start
+        peak = None
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return result, {"seconds": seconds, "peak_bytes": peak}
+
+def read_and_reduce(ids):
+    """
+    This function takes in patient ids, reads each patient's activity file (parsing the
+    text, no cache) and finds its statistics, timing the reading and the statistics apart.
+
+    Parameters
+    ----------
+    ids : list
+        Patient ids.
+
+    Returns
+    -------
+    totals : dict
+        Dictionary with the "read_seconds", "stats_seconds", "rows", and "bytes" of all patients.
+
+    """
+    totals = {"read_seconds": 0.0, "stats_seconds": 0.0, "rows": 0, "bytes": 0}
+    for patient_id in ids:
+        activity_file = combine.activity_file_name(patient_id)
+        start = time.perf_counter()
+        movement_data = combine.read_movement(activity_file, use_cache=False)
+        middle = time.perf_counter()
+        combine.calculate_statistics(movement_data)
+        totals["read_seconds"] += middle - start
+        totals["stats_seconds"] += time.perf_counter() - middle
+        totals["rows"] += len(movement_data)
+        totals["bytes"] += os.path.getsize(activity_file)
+    return totals
+
+def run_plot_program():
+    """
+    This function runs the graphing program on the combined csvs in the working directory
+    in a separate process with a non interactive matplotlib backend.
+
+    Returns
+    -------
+    int
+        Peak resident memory in bytes of the graphing process alone.
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        If the graphing program exits with an error.
+
+    """
+    environment = dict(os.environ, MPLBACKEND="Agg")
+    command = [sys.executable, os.path.join(PROGRAM_DIR, "finalproject_plot.py")]
+    process = subprocess.Popen(command, env=environment, stdout=subprocess.DEVNULL)
+
+    # Waiting with wait4 gives the usage of this one child, where getrusage(RUSAGE_CHILDREN)
+    # would give the largest of every child so far, including make_lists workers
+    # Source for wait4: https://docs.python.org/3/library/os.html#os.wait4
+    status, usage = os.wait4(process.pid, 0)[1:]
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command)
+
+    # ru_maxrss is in kilobytes on Linux
+    return usage.ru_maxrss * 1024
+
+def benchmark_cohort(directory, n_patients, min_minutes=MIN_MINUTES, max_minutes=MAX_MINUTES, seed=0,
+                     workers=1, plot=True):
+    """
+    This function takes in a directory, cohort settings, and a worker count, generates a
+    synthetic cohort there, and times each pipeline stage on it.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to generate the cohort in.
+    n_patients : int
+        Number of patients.
+    min_minutes : int, optional
+        Shortest recording length in minutes. The default is MIN_MINUTES.
+    max_minutes : int, optional
+        Longest recording length in minutes. The default is MAX_MINUTES.
+    seed : int, optional
+        Random seed. The default is 0.
+    workers : int, optional
+        Number of worker processes for the parallel make_lists stage. The default is 1.
+    plot : bool, optional
+        Whether to time the graphing program. The default is True.
+
+    Returns
+    -------
+    result : dict
+        Dictionary with the cohort settings and a "stages" dictionary of per stage records
+        ("seconds", "peak_bytes", and "rows"/"bytes"/"rows_per_second" where they apply).
+
+    """
+    stages = {}
+    n_bytes, stages["generate"] = measure(generate_cohort, directory, n_patients, min_minutes, max_minutes, seed,
+                                          trace=False)
+    stages["generate"]["bytes"] = n_bytes
+
+    # Pipeline run from the cohort directory since file names are relative to the working directory
+    previous_directory = os.getcwd()
+    os.chdir(directory)
+    try:
+        patient_info, stages["info_load"] = measure(combine.make_patient_info_dict, "patient_info.csv")
+        ids = combine.patient_ids(patient_info)
+
+        # Reading and statistics timed apart, sharing one traced memory peak
+        totals, record = measure(read_and_reduce, ids)
+        stages["read_movement"] = {"seconds": totals["read_seconds"], "peak_bytes": record["peak_bytes"],
+                                   "rows": totals["rows"], "bytes": totals["bytes"],
+                                   "rows_per_second": totals["rows"] / max(totals["read_seconds"], 1e-9)}
+        stages["calculate_statistics"] = {"seconds": totals["stats_seconds"], "peak_bytes": record["peak_bytes"],
+                                          "rows": totals["rows"],
+                                          "rows_per_second": totals["rows"] / max(totals["stats_seconds"], 1e-9)}
+
+        # make_lists timed parsing text, filling the cache, loading from a warm cache, and in parallel
+        stages["make_lists"] = measure(combine.make_lists, patient_info, use_cache=False)[1]
+        stages["make_lists_cache_cold"] = measure(combine.make_lists, patient_info)[1]
+        stages["make_lists_cache_warm"] = measure(combine.make_lists, patient_info)[1]
+        if workers != 1:
+            stages["make_lists_parallel"] = measure(combine.make_lists, patient_info, use_cache=False,
+                                                    workers=workers)[1]
+        stages["combine_main"] = measure(combine.main, incremental=False)[1]
+
+        # Graphing program run in its own process, its peak memory taken from that process's usage
+        if plot:
+            peak_bytes, stages["plot_main"] = measure(run_plot_program, trace=False)
+            stages["plot_main"]["peak_bytes"] = peak_bytes
+    finally:
+        os.chdir(previous_directory)
+    return {"patients": n_patients, "min_minutes": min_minutes, "max_minutes": max_minutes,
+            "seed": seed, "workers": workers, "stages": stages}
+
+def environment_info():
+    """
+    This function records the versions and machine the benchmark ran on, so results from
+    different versions of the code can be compared.
+
+    Returns
+    -------
+    info : dict
+        Dictionary of the python and numpy versions, platform, CPU count, time, and git commit.
+
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=PROGRAM_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+            "cpus": os.cpu_count(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": commit}
+
+def main(argv=None):
+    """
+    This function reads the command line options, benchmarks each requested cohort size,
+    prints a short table, and saves every result as JSON.
+
+    Parameters
+    ----------
+    argv : list, optional
+        Command line arguments. The default is None (the arguments the program was run with).
+
+    Returns
+    -------
+    results : dict
+        The saved results.
+
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic HYPERACTIV-style cohorts.")
+    parser.add_argument("--patients", type=int, nargs="+", default=[100],
+                        help="cohort sizes to benchmark, e.g. 100 1000 10000 (default 100)")
+    parser.add_argument("--min-minutes", type=int, default=MIN_MINUTES, help="shortest recording length")
+    parser.add_argument("--max-minutes", type=int, default=MAX_MINUTES, help="longest recording length")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the generator")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes for the parallel make_lists stage")
+    parser.add_argument("--no-plot", action="store_true", help="skip timing the graphing program")
+    parser.add_argument("--workdir", help="directory to generate cohorts in (default: a temporary directory)")
+    parser.add_argument("--output", default="bench_results.json", help="JSON file to save results to")
+    args = parser.parse_args(argv)
+
+    results = {"environment": environment_info(), "cohorts": []}
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        for n_patients in args.patients:
+            directory = os.path.join(args.workdir or temporary_directory, "cohort_" + str(n_patients))
+            result = benchmark_cohort(directory, n_patients, args.min_minutes, args.max_minutes, args.seed,
+                                      args.workers, not args.no_plot)
+            results["cohorts"].append(result)
+            for stage, record in result["stages"].items():
+                peak = () if record["peak_bytes"] is None else (round(record["peak_bytes"] / 2 ** 20, 1), "MiB")
+                print(n_patients, "patients", stage, round(record["seconds"], 3), "s", *peak)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    return results
+
+# Call to main, only when run as a program
+if __name__ == "__main__":
+    main()
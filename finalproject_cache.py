@@ -0,0 +1,297 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Binary Activity Cache
+
+"""
+# hashlib, json, and os imported to fingerprint source files and store cache entries next to them,
+# numpy imported to save and memory map the cached arrays
+import hashlib
+import json
+import os
+import numpy as np
+from finalproject_reader import compression_suffix, parse_activity_bytes, read_activity_file, resolve_input
+
+# Folder (made next to the activity files) that holds the cached arrays
+CACHE_DIR = ".activity_cache"
+
+# Size of the blocks a file is read in when its content hash is found
+HASH_BLOCK_SIZE = 1 << 20
+
+def file_digest(filename):
+    """
+    This function takes in a file name and finds the SHA-256 hash of the file contents,
+    reading the file in fixed size blocks.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file to hash.
+
+    Returns
+    -------
+    digest : str
+        Hexadecimal SHA-256 hash of the file.
+
+    """
+    # Source for hashlib: https://docs.python.org/3/library/hashlib.html
+    digest = hashlib.sha256()
+    with open(filename, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def file_fingerprint(filename, digest=True):
+    """
+    This function takes in a file name and creates a fingerprint of the file from its
+    size, modification time, and (if asked) content hash.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file to fingerprint.
+    digest : bool, optional
+        Whether to hash the file contents as well. The default is True.
+
+    Returns
+    -------
+    fingerprint : dict
+        Dictionary with the file "size", "mtime_ns", and "sha256" (None if not hashed).
+
+    """
+    status = os.stat(filename)
+    return {"size": status.st_size,
+            "mtime_ns": status.st_mtime_ns,
+            "sha256": file_digest(filename) if digest else None}
+
+def cache_paths(filename):
+    """
+    This function takes in an activity file name and returns the names of the files
+    its cache entry is stored in.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the participant's movement data file.
+
+    Returns
+    -------
+    meta_path : str
+        Name of the json file holding the source file fingerprint.
+    activity_path : str
+        Name of the .npy file holding the activity array.
+    timestamp_path : str
+        Name of the .npy file holding the timestamp array.
+
+    """
+    # Cache entries named after the activity file and kept in a folder next to it
+    folder = os.path.join(os.path.dirname(filename), CACHE_DIR)
+    stem = os.path.join(folder, os.path.basename(filename))
+    return stem + ".json", stem + ".activity.npy", stem + ".timestamp.npy"
+
+def fingerprint_matches(filename, fingerprint):
+    """
+    This function takes in a file name and a fingerprint stored earlier, and checks 
+    whether the file is unchanged. Files of a different size are changed, files with the 
+    same modification time are unchanged, and otherwise the content hash decides (the 
+    fingerprint's modification time is updated in place when only the time changed).
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file to check.
+    fingerprint : dict
+        Fingerprint made by the file_fingerprint function.
+
+    Returns
+    -------
+    matches : bool
+        True if the file is unchanged.
+
+    """
+    status = os.stat(filename)
+    if status.st_size != fingerprint["size"]:
+        return False
+    if status.st_mtime_ns == fingerprint["mtime_ns"]:
+        return True
+
+    # Modification time changed but size did not, so contents compared by hash and the
+    # fingerprint refreshed if the file was only touched
+    if fingerprint["sha256"] is None or file_digest(filename) != fingerprint["sha256"]:
+        return False
+    fingerprint["mtime_ns"] = status.st_mtime_ns
+    return True
+
+def write_json(path, data):
+    """
+    This function takes in a file name and a json compatible object and writes the object
+    to the file, replacing the file in one step so readers never see a half written file.
+    numpy arrays in the object (such as quantile sketch levels) are written as lists.
+
+    Parameters
+    ----------
+    path : str
+        Name of the file to write.
+    data : dict
+        Data to write.
+
+    Returns
+    -------
+    None.
+
+    """
+    temporary_path = path + "." + str(os.getpid()) + ".tmp"
+    with open(temporary_path, "w") as file:
+        json.dump(data, file, default=lambda value: value.tolist())
+    os.replace(temporary_path, path)
+
+def save_array(path, array):
+    """
+    This function takes in a file name and an array and saves the array as a .npy file,
+    replacing the file in one step so readers never see a half written file.
+
+    Parameters
+    ----------
+    path : str
+        Name of the .npy file to write.
+    array : numpy.ndarray
+        Array to save.
+
+    Returns
+    -------
+    None.
+
+    """
+    temporary_path = path + "." + str(os.getpid()) + ".tmp"
+    with open(temporary_path, "wb") as file:
+        np.save(file, array)
+    os.replace(temporary_path, path)
+
+def load_cached_activity(filename):
+    """
+    This function takes in an activity file name and loads its cached arrays with memory
+    mapping if the cache entry exists and the file has not changed.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the participant's movement data file.
+
+    Returns
+    -------
+    cached : tuple or None
+        Tuple of the memory mapped int32 activity and datetime64[m] timestamp arrays,
+        None if there is no usable cache entry.
+
+    """
+    meta_path, activity_path, timestamp_path = cache_paths(filename)
+    try:
+        with open(meta_path) as file:
+            fingerprint = json.load(file)
+        stored_mtime = fingerprint["mtime_ns"]
+        if not fingerprint_matches(filename, fingerprint):
+            return None
+
+        # Entry refreshed if the file was only touched so the hash is not checked again next time
+        if fingerprint["mtime_ns"] != stored_mtime:
+            write_json(meta_path, fingerprint)
+
+        # Source for memory mapped loading: https://numpy.org/doc/stable/reference/generated/numpy.load.html
+        return np.load(activity_path, mmap_mode="r"), np.load(timestamp_path, mmap_mode="r")
+
+    # Missing or broken cache entries are treated as a cache miss
+    except (OSError, ValueError, KeyError):
+        return None
+
+def save_cached_activity(filename, fingerprint, activity, timestamps):
+    """
+    This function takes in an activity file name, the fingerprint the file had when it was
+    read, and its parsed arrays, and writes them as a cache entry. The fingerprint is
+    written last so an entry is only used once its arrays are complete.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the participant's movement data file.
+    fingerprint : dict
+        Fingerprint of the file made by the file_fingerprint function before it was read.
+    activity : numpy.ndarray
+        Array of int32 movement data.
+    timestamps : numpy.ndarray
+        Array of datetime64[m] timestamps.
+
+    Returns
+    -------
+    None.
+
+    """
+    meta_path, activity_path, timestamp_path = cache_paths(filename)
+
+    # Cache entries are only a speed up, so a folder that cannot be written to is skipped
+    try:
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        save_array(activity_path, activity)
+        save_array(timestamp_path, timestamps)
+        write_json(meta_path, fingerprint)
+    except OSError:
+        pass
+
+def read_cached_activity(filename, timestamps=False):
+    """
+    This function takes in an activity file name and returns its parsed arrays, loading
+    them from the cache when the file is unchanged and otherwise parsing the file with
+    the parse_activity_bytes function and caching the result. A file whose timestamps
+    cannot be parsed is returned but not cached when only the activity is asked for.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the participant's movement data file (a compressed copy is read, and
+        cached under its own name, if only that exists).
+    timestamps : bool, optional
+        Whether to also return the timestamps. The default is False.
+
+    Returns
+    -------
+    activity : numpy.ndarray
+        Array of int32 movement data for one participant.
+    timestamp : numpy.ndarray
+        Array of datetime64[m] timestamps, only returned if timestamps is True.
+
+    """
+    filename = resolve_input(filename)
+    cached = load_cached_activity(filename)
+    if cached is None and compression_suffix(filename):
+
+        # Compressed files hashed as stored and decompressed block by block into the parser
+        # using read_activity_file function, so the cache holds the parsed arrays
+        fingerprint = file_fingerprint(filename)
+        try:
+            cached = read_activity_file(filename, timestamps=True)
+        except ValueError:
+            if timestamps:
+                raise
+            return read_activity_file(filename)
+        save_cached_activity(filename, fingerprint, *cached)
+    elif cached is None:
+
+        # Size and modification time taken before reading so a file changed while it is read
+        # is parsed again next run, contents read once and both hashed and parsed
+        status = os.stat(filename)
+        with open(filename, "rb") as file:
+            raw = file.read()
+        fingerprint = {"size": status.st_size,
+                       "mtime_ns": status.st_mtime_ns,
+                       "sha256": hashlib.sha256(raw).hexdigest()}
+        # Entries hold both arrays, so a file whose timestamps cannot be parsed is not cached when
+        # only its activity is asked for, and is parsed the same way as without the cache
+        try:
+            cached = parse_activity_bytes(raw, timestamps=True)
+        except ValueError:
+            if timestamps:
+                raise
+            return parse_activity_bytes(raw)
+        save_cached_activity(filename, fingerprint, *cached)
+    return cached if timestamps else cached[0]
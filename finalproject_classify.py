@@ -0,0 +1,406 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Cross Validated ADHD Classifier
+
+"""
+# json and os imported to save results and count CPUs, functools imported to send the shared
+# arrays to process pool workers, numpy imported to fit the model and score every fold without
+# machine learning libraries
+import json
+import os
+from functools import partial
+import numpy as np
+from finalproject_manifest import data_digest, input_fingerprint
+from finalproject_summary import read_summary
+
+# Combined group files with the ADHD status (1 is adhd) and sex (0 is female) of their patients
+GROUP_FILES = (("patient_activity_combined_f.csv", 1, 0), ("patient_activity_combined_m.csv", 1, 1),
+               ("patient_activity_c_combined_f.csv", 0, 0), ("patient_activity_c_combined_m.csv", 0, 1))
+
+# File holding the last feature matrix built, with a key of what it was built from
+MATRIX_CACHE_FILE = ".classify_cache.npz"
+
+# L2 penalties tried for the logistic regression, and the number of inner folds each outer
+# fold's training patients are split into to choose between them
+PENALTY_GRID = (0.01, 0.1, 1.0, 10.0)
+INNER_FOLDS = 5
+
+def build_feature_matrix(extra_suffixes=()):
+    """
+    This function loads the combined group files (and optionally the matching windowed,
+    feature, or spectral files) into one feature matrix with ADHD and sex labels.
+
+    Parameters
+    ----------
+    extra_suffixes : tuple, optional
+        Suffixes of extra group files to join on patient id, e.g. ("_features", "_spectral")
+        for the files written by finalproject_combine.py --features --spectral. The default
+        is () (average and standard deviation only).
+
+    Returns
+    -------
+    matrix : dict
+        Dictionary with "features" (patients x features), "adhd" and "sex" label arrays,
+        "patient_ids", and "columns" (feature names).
+
+    """
+    rows = []
+    for filename, adhd_status, sex in GROUP_FILES:
+        summary = read_summary(filename)
+        ids = summary["patient_id"]
+        columns = {name: values for name, values in summary.items() if name != "patient_id"}
+
+        # Extra files joined on patient id, patients missing from an extra file get nan
+        for suffix in extra_suffixes:
+            extra = read_summary(filename.replace(".csv", suffix + ".csv"))
+            positions = {patient_id: row for row, patient_id in enumerate(extra["patient_id"].tolist())}
+            rows_in_extra = np.array([positions.get(patient_id, -1) for patient_id in ids.tolist()], dtype=np.int64)
+            for name, values in extra.items():
+                if name != "patient_id":
+                    columns[suffix.strip("_") + ":" + name] = np.where(rows_in_extra >= 0, values[rows_in_extra], np.nan)
+        rows.append((ids, columns, adhd_status, sex))
+
+    # Columns every group has, in the order of the first group
+    names = [name for name in rows[0][1] if all(name in columns for ids, columns, adhd_status, sex in rows)]
+    return {"features": np.vstack([np.column_stack([columns[name] for name in names]) for ids, columns, a, s in rows]),
+            "adhd": np.concatenate([np.full(ids.size, adhd_status) for ids, columns, adhd_status, s in rows]),
+            "sex": np.concatenate([np.full(ids.size, sex) for ids, columns, a, sex in rows]),
+            "patient_ids": np.concatenate([ids for ids, columns, a, s in rows]),
+            "columns": names}
+
+def load_feature_matrix(extra_suffixes=(), cache_file=MATRIX_CACHE_FILE):
+    """
+    This function returns the feature matrix, loading it from the cache file if none of
+    the files it is built from changed, and building (and caching) it otherwise.
+
+    Parameters
+    ----------
+    extra_suffixes : tuple, optional
+        Suffixes of extra group files to join (see build_feature_matrix). The default is ().
+    cache_file : str, optional
+        Name of the cache file, None to always build. The default is MATRIX_CACHE_FILE.
+
+    Returns
+    -------
+    matrix : dict
+        Feature matrix made by the build_feature_matrix function.
+
+    """
+    # Key made from the size and modification time of every input file and the suffixes
+    filenames = [filename.replace(".csv", suffix + ".csv") for filename, a, s in GROUP_FILES for suffix in ("",) + tuple(extra_suffixes)]
+    key = data_digest([(filename, input_fingerprint(filename)) for filename in filenames])
+    if cache_file and os.path.exists(cache_file):
+        with np.load(cache_file) as cached:
+            if str(cached["key"]) == key:
+                return {"features": cached["features"], "adhd": cached["adhd"], "sex": cached["sex"],
+                        "patient_ids": cached["patient_ids"], "columns": cached["columns"].tolist()}
+    matrix = build_feature_matrix(extra_suffixes)
+    if cache_file:
+        np.savez(cache_file, key=key, features=matrix["features"], adhd=matrix["adhd"], sex=matrix["sex"],
+                 patient_ids=matrix["patient_ids"], columns=np.array(matrix["columns"], dtype=str))
+    return matrix
+
+def fit_logistic(features, labels, penalty, iterations=100, tolerance=1e-8):
+    """
+    This function fits an L2 penalized logistic regression with Newton's method.
+
+    Parameters
+    ----------
+    features : numpy.ndarray
+        Standardized training features (patients x features).
+    labels : numpy.ndarray
+        0 or 1 label of each patient.
+    penalty : float
+        L2 penalty on the weights (the intercept is not penalized).
+    iterations : int, optional
+        Largest number of Newton steps. The default is 100.
+    tolerance : float, optional
+        Stop once no weight changes by more than this. The default is 1e-8.
+
+    Returns
+    -------
+    weights : numpy.ndarray
+        Intercept followed by one weight per feature.
+
+    """
+    # Source for Newton's method (iteratively reweighted least squares): https://en.wikipedia.org/wiki/Logistic_regression#Iteratively_reweighted_least_squares_(IRLS)
+    design = np.column_stack((np.ones(len(features)), features))
+    weights = np.zeros(design.shape[1])
+    penalties = np.full(design.shape[1], float(penalty))
+    penalties[0] = 1e-9
+    for iteration in range(iterations):
+        probabilities = predict_logistic(weights, features)
+        gradient = design.T @ (probabilities - labels) + penalties * weights
+        hessian = (design * (probabilities * (1 - probabilities))[:, None]).T @ design + np.diag(penalties)
+        step = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if np.abs(step).max() < tolerance:
+            break
+    return weights
+
+def predict_logistic(weights, features):
+    """
+    This function takes in logistic regression weights and features and returns the
+    predicted probability of label 1 for each patient.
+
+    Parameters
+    ----------
+    weights : numpy.ndarray
+        Weights made by the fit_logistic function.
+    features : numpy.ndarray
+        Standardized features (patients x features).
+
+    Returns
+    -------
+    probabilities : numpy.ndarray
+        Probability of label 1 of each patient.
+
+    """
+    # Sigmoid written with logaddexp so large scores do not overflow
+    scores = weights[0] + features @ weights[1:]
+    return np.exp(-np.logaddexp(0, -scores))
+
+def stratified_folds(labels, n_folds, seed=0):
+    """
+    This function splits patients into folds with about the same share of each label.
+
+    Parameters
+    ----------
+    labels : numpy.ndarray
+        Label of each patient.
+    n_folds : int
+        Number of folds (the number of patients gives leave one out).
+    seed : int, optional
+        Random seed for the order patients are dealt into folds. The default is 0.
+
+    Returns
+    -------
+    folds : numpy.ndarray
+        Fold number of each patient.
+
+    """
+    # Patients of each label shuffled, then dealt into folds in turn, continuing where the
+    # last label stopped so fold sizes differ by at most one
+    rng = np.random.default_rng(seed)
+    folds = np.empty(len(labels), dtype=np.int64)
+    start = 0
+    for label in np.unique(labels):
+        members = rng.permutation(np.flatnonzero(labels == label))
+        folds[members] = (start + np.arange(members.size)) % n_folds
+        start += members.size
+    return folds
+
+def fold_predictions(features, labels, folds, fold, penalty):
+    """
+    This function trains on every fold but one and predicts the held out fold. It is kept
+    at module level so process pool workers can run it.
+
+    Parameters
+    ----------
+    features : numpy.ndarray
+        Features of every patient (patients x features); nan is replaced by the training
+        average.
+    labels : numpy.ndarray
+        0 or 1 label of each patient.
+    folds : numpy.ndarray
+        Fold number of each patient, -1 for patients left out of training and predicting.
+    fold : int
+        Fold to hold out.
+    penalty : float
+        L2 penalty.
+
+    Returns
+    -------
+    probabilities : numpy.ndarray
+        Predicted probability of label 1 for the held out patients, in patient order.
+
+    """
+    # Features standardized with the training patients' averages and standard deviations only
+    train = (folds != fold) & (folds >= 0)
+    means = np.nanmean(features[train], axis=0)
+    stds = np.nanstd(features[train], axis=0)
+    stds[~(stds > 0)] = 1.0
+    standardized = np.nan_to_num((features - means) / stds)
+    weights = fit_logistic(standardized[train], labels[train], penalty)
+    return predict_logistic(weights, standardized[folds == fold])
+
+def roc_auc(labels, scores):
+    """
+    This function finds the area under the ROC curve from the ranks of the scores (ties
+    get their average rank).
+
+    Parameters
+    ----------
+    labels : numpy.ndarray
+        0 or 1 label of each patient.
+    scores : numpy.ndarray
+        Score of each patient, higher meaning label 1 is more likely.
+
+    Returns
+    -------
+    auc : float
+        Area under the ROC curve, nan if only one label is present.
+
+    """
+    # Source for AUC from ranks (Mann-Whitney U): https://en.wikipedia.org/wiki/Mann%E2%80%93Whitney_U_test#Area-under-curve_(AUC)_statistic_for_ROC_curves
+    positives = int(np.count_nonzero(labels == 1))
+    negatives = labels.size - positives
+    if positives == 0 or negatives == 0:
+        return float("nan")
+    unique, inverse = np.unique(scores, return_inverse=True)
+    order_ranks = np.empty(scores.size)
+    order_ranks[np.argsort(scores, kind="stable")] = np.arange(1, scores.size + 1)
+    ranks = (np.bincount(inverse, weights=order_ranks) / np.bincount(inverse))[inverse]
+    return float((ranks[labels == 1].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+def run_folds(features, labels, jobs, workers=1):
+    """
+    This function runs fold_predictions for every job, one after another or over a process
+    pool.
+
+    Parameters
+    ----------
+    features : numpy.ndarray
+        Features of every patient (patients x features).
+    labels : numpy.ndarray
+        0 or 1 label of each patient.
+    jobs : list
+        List of (folds, fold, penalty) tuples, see the fold_predictions function.
+    workers : int, optional
+        Number of worker processes, None uses one per CPU. The default is 1.
+
+    Returns
+    -------
+    predictions : list
+        Held out predictions of each job, in job order.
+
+    """
+    # Source for process pools: https://docs.python.org/3/library/concurrent.futures.html
+    predict = partial(fold_predictions, features, labels)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1 and len(jobs) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(predict, *zip(*jobs), chunksize=max(1, len(jobs) // (workers * 4))))
+    return [predict(folds, fold, penalty) for folds, fold, penalty in jobs]
+
+def cross_validate(matrix, n_folds=5, penalties=PENALTY_GRID, inner_folds=INNER_FOLDS, seed=0, workers=1):
+    """
+    This function cross validates the logistic regression with nested folds: for each outer
+    fold the penalty is chosen by the AUC of inner folds made from the outer training
+    patients only, then the held out outer fold is predicted with that penalty. The held out
+    predictions are scored overall and by sex, so the scores are not biased by the choice.
+
+    Parameters
+    ----------
+    matrix : dict
+        Feature matrix made by the load_feature_matrix function.
+    n_folds : int, optional
+        Number of stratified outer folds, None for leave one out. The default is 5.
+    penalties : tuple, optional
+        L2 penalties to choose from. The default is PENALTY_GRID.
+    inner_folds : int, optional
+        Number of stratified inner folds. The default is INNER_FOLDS.
+    seed : int, optional
+        Random seed for the folds. The default is 0.
+    workers : int, optional
+        Number of worker processes, None uses one per CPU. The default is 1.
+
+    Returns
+    -------
+    results : dict
+        Dictionary with the "penalties" chosen for each outer fold and the "auc" and
+        "accuracy" (at a 0.5 threshold) of the held out predictions for "all", "female",
+        and "male" patients.
+
+    """
+    features, labels, sexes = matrix["features"], matrix["adhd"], matrix["sex"]
+    n_folds = labels.size if n_folds is None else n_folds
+    folds = stratified_folds(labels, n_folds, seed)
+
+    # Inner folds of each outer fold's training patients, outer held out patients left out (-1)
+    inner = []
+    for fold in range(n_folds):
+        train = folds != fold
+        inner_fold = np.full(labels.size, -1)
+        inner_fold[train] = stratified_folds(labels[train], inner_folds, seed)
+        inner.append(inner_fold)
+
+    # Every (outer fold, penalty, inner fold) fit run at once, then each outer fold's penalty
+    # chosen by the AUC of its inner held out predictions (the first penalty if none can be scored)
+    jobs = [(inner[fold], inner_fold, penalty) for fold in range(n_folds) for penalty in penalties
+            for inner_fold in range(inner_folds)]
+    predictions = iter(run_folds(features, labels, jobs, workers))
+    chosen_penalties = []
+    for fold in range(n_folds):
+        aucs = []
+        for penalty in penalties:
+            probabilities = np.empty(labels.size)
+            for inner_fold in range(inner_folds):
+                probabilities[inner[fold] == inner_fold] = next(predictions)
+            train = inner[fold] >= 0
+            aucs.append(roc_auc(labels[train], probabilities[train]))
+        chosen_penalties.append(penalties[int(np.argmax(np.nan_to_num(aucs, nan=-1.0)))])
+
+    # Outer held out predictions made with each fold's chosen penalty, put back in patient order,
+    # and scored by sex
+    outer = run_folds(features, labels, [(folds, fold, chosen_penalties[fold]) for fold in range(n_folds)], workers)
+    probabilities = np.empty(labels.size)
+    for fold in range(n_folds):
+        probabilities[folds == fold] = outer[fold]
+    results = {"penalties": chosen_penalties}
+    for name, chosen in (("all", np.ones(labels.size, dtype=bool)), ("female", sexes == 0), ("male", sexes == 1)):
+        results[name] = {"auc": roc_auc(labels[chosen], probabilities[chosen]),
+                         "accuracy": float(np.mean((probabilities[chosen] >= 0.5) == labels[chosen])) if chosen.any() else float("nan"),
+                         "patients": int(np.count_nonzero(chosen))}
+    return results
+
+def main(argv=None):
+    """
+    This function reads the command line options, cross validates the classifier with
+    stratified k fold and leave one out, prints a short table, and saves the results as JSON.
+
+    Parameters
+    ----------
+    argv : list, optional
+        Command line arguments. The default is None (the arguments the program was run with).
+
+    Returns
+    -------
+    results : dict
+        The saved results.
+
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description="Cross validate a logistic regression predicting ADHD from movement.")
+    parser.add_argument("--folds", type=int, default=5, help="number of stratified folds (default 5)")
+    parser.add_argument("--inner-folds", type=int, default=INNER_FOLDS,
+                        help="number of inner folds used to choose the penalty (default " + str(INNER_FOLDS) + ")")
+    parser.add_argument("--no-loo", action="store_true", help="skip leave one out cross validation")
+    parser.add_argument("--extra", nargs="*", default=[], choices=["windows", "features", "spectral"],
+                        help="also use the _windows, _features, or _spectral group files")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the folds")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, 0 for one per CPU (default 1)")
+    parser.add_argument("--output", default="classify_results.json", help="JSON file to save results to")
+    args = parser.parse_args(argv)
+
+    matrix = load_feature_matrix(tuple("_" + suffix for suffix in args.extra))
+    results = {"patients": int(matrix["adhd"].size), "features": matrix["columns"], "validations": {}}
+    validations = [(str(args.folds) + "_fold", args.folds)] + ([] if args.no_loo else [("leave_one_out", None)])
+    for name, n_folds in validations:
+        result = cross_validate(matrix, n_folds, inner_folds=args.inner_folds, seed=args.seed, workers=args.workers or None)
+        results["validations"][name] = result
+        print(name, "penalties", sorted(set(result["penalties"])))
+        for group in ("all", "female", "male"):
+            print("   ", group, "AUC", round(result[group]["auc"], 3), "accuracy", round(result[group]["accuracy"], 3))
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    return results
+
+# Call to main, only when run as a program
+if __name__ == "__main__":
+    main()
@@ -6,58 +6,126 @@ DS2001 Programming with Data Practicum
 Final Project Code; Data Sorting, Combining, & Statistics Program
 
 """
-# csv imported to allow csv files to be written
+# csv imported to allow csv files to be written, numpy imported for array statistics, 
+# os and functools imported for parallel reading; argparse and concurrent.futures are imported
+# only when the command line is read or a process pool is started, so importing this file is fast
 import csv
+import os
+import time
+from functools import partial
+import numpy as np
+import finalproject_instrument as instrument
+from finalproject_align import build_tensor
+from finalproject_cache import read_cached_activity, write_json
+from finalproject_features import extract_features
+from finalproject_info import load_patient_info, stratum_ids, table_rows, value_index
+from finalproject_manifest import (MANIFEST_FILE, input_fingerprint, input_unchanged, load_manifest,
+                                   new_manifest, output_unchanged, record_output, save_manifest)
+from finalproject_reader import read_activity_file, resolve_input
+from finalproject_sketch import DEFAULT_K, merge_sketches, new_sketch, sketch_summary
+from finalproject_spectral import spectral_features
+from finalproject_store import cohort_statistics, open_store, patient_slice
+from finalproject_stream import accumulator_statistics, chunk_accumulator, stream_statistics
+from finalproject_summary import write_summary
+from finalproject_tail import TAIL_STATE_FILE, load_tail_state, new_tail, save_tail_state, tail_file
+from finalproject_windows import window_statistics
 
-def read_movement(filename, split_by = ','):
+# Conditions on the patient info columns that pick out each combined group, by file name suffix;
+# for SEX, 0 is female and 1 is male, for ADHD, 0 is no adhd and 1 is adhd
+GROUP_CONDITIONS = {"f": {"SEX": 0, "ADHD": 1}, "m": {"SEX": 1, "ADHD": 1},
+                    "c_f": {"SEX": 0, "ADHD": 0}, "c_m": {"SEX": 1, "ADHD": 0}}
+
+# File every patient's and group's quantile sketch is saved to when quantiles are asked for
+SKETCH_FILE = "patient_activity_sketches.json"
+
+def record_read_error(filename, error):
+    """
+    This function takes in the name of a file that could not be read and the error that
+    was raised, and records the file as skipped (missing) or failed (unreadable or not
+    parsable) for the instrumentation report.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file.
+    error : Exception
+        The error raised while reading the file.
+
+    Returns
+    -------
+    None.
+
+    """
+    # Patient ids without an activity file are expected, anything else is a failure
+    if isinstance(error, FileNotFoundError):
+        instrument.file_problem(filename, "skipped", "missing file")
+    elif isinstance(error, OSError):
+        instrument.file_problem(filename, "failed", "unreadable: " + (error.strerror or str(error)))
+    else:
+        instrument.file_problem(filename, "failed", "parse error: " + str(error))
+
+def read_movement(filename, split_by = ',', timestamps=False, use_cache=True):
     """
     This function takes in a file name as a parameter, reads the file, 
-    gets the movement data from each row and appends it to a list to form 
-    a list of movement data for the participant.
+    and gets the movement data from every row at once to form an array 
+    of movement data for the participant.
 
     Parameters
     ----------
     filename : str
-        The name of the participant's movement data file.
+        The name of the participant's movement data file (a compressed copy is read if
+        only that exists).
     split_by : str, optional
         The punctuation to split the data by. The default is ','.
+    timestamps : bool, optional
+        Whether to also return the timestamp of each movement value. The default is False.
+    use_cache : bool, optional
+        Whether to load the movement data from the binary cache next to the file (memory 
+        mapped, and refreshed automatically when the file changes). The default is True.
 
     Returns
     -------
-    movement_ls : list
-        List of movement data for one participant.
+    movement_ls : numpy.ndarray
+        Array of int32 movement data for one participant, empty if the file could not be read.
+    timestamp_ls : numpy.ndarray
+        Array of datetime64[m] timestamps matching the movement data, only returned
+        if timestamps is True.
 
     """
     
-    # Empty list created
-    movement_ls = []
-    
+    # Compressed copy of the file found using resolve_input function if only that exists
+    filename = resolve_input(filename)
+
     # Code is tried to check for errors (to see if file exists)
     try:
         
-        # File opened, lines read and set to lines variable
-        with open(filename, "r") as file:
-           lines = file.readlines()
-           
-           # For loop iterates through all lines except header line, sets each line
-           # equal to a variable, removes whitespace, and splits it by a semicolon
-           for line in lines[1:]:
-               line_data = line.strip().split(';')
-               
-               # If data in movement cell is not empty, data is set to variable, 
-               # converted to integer, and appended to the list 
-               if line_data[1] != "": 
-                   patient_movement = int(line_data[1]) # Patient movement
-                   movement_ls.append(patient_movement)
+        # Movement data loaded from the cache using read_cached_activity function, or whole file 
+        # read and parsed in one go using read_activity_file function; rows with empty movement
+        # cells are left out. Rows and bytes counted for the "read" stage if recording is on
+        with instrument.stage("read"):
+            if use_cache:
+                movement_data = read_cached_activity(filename, timestamps)
+            else:
+                movement_data = read_activity_file(filename, timestamps)
+            if instrument.enabled():
+                rows = len(movement_data[0] if timestamps else movement_data)
+                instrument.count("read", rows, os.path.getsize(filename))
+                
+                # Files that were read but hold no movement data recorded as skipped
+                if rows == 0:
+                    instrument.file_problem(filename, "skipped", "no movement data")
+        return movement_data
     
-    # If error is encountered (file does not exist), above code not run and pass 
-    # allows no errors to occur and for program to continue running
-    except:
-        pass
-    return movement_ls
+    # If error is encountered (file does not exist or cannot be parsed), the reason is recorded
+    # and empty movement data returned so the program continues running
+    except (OSError, ValueError) as error:
+        record_read_error(filename, error)
+        movement_ls = np.array([], dtype=np.int32)
+        if timestamps:
+            return movement_ls, np.array([], dtype="datetime64[m]")
+        return movement_ls
 
     # try/except source: https://www.geeksforgeeks.org/python-try-except/
-    # pass source: https://www.w3schools.com/python/ref_keyword_pass.asp
 
 def calculate_statistics(movement_data):
     """
@@ -66,7 +134,7 @@ def calculate_statistics(movement_data):
 
     Parameters
     ----------
-    movement_data : list
+    movement_data : list or numpy.ndarray
         List of movement data for one participant.
 
     Returns
@@ -77,18 +145,11 @@ def calculate_statistics(movement_data):
         The calculated standard deviation of the inputted movement list.
 
     """
-    # Function run if list has a length, avoids "ZeroDivisionError"
-    if len(movement_data) > 0:
-        
-        # Average calculated by dividing sum of list by length of list
-        average = sum(movement_data) / len(movement_data)
-        
-        # Standard deviation calculated by finding variance then square rooting it using 
-        # formula from https://byjus.com/maths/variance-and-standard-deviation/
-        variance = sum((x - average) ** 2 for x in movement_data) / len(movement_data)
-        std_dev = variance ** 0.5
-    
-        return average, std_dev
+    # Average and standard deviation found from a running statistics accumulator made from
+    # the whole list at once using chunk_accumulator function, the same accumulator the
+    # streaming reader builds one chunk at a time; nothing returned for empty lists
+    with instrument.stage("stats"):
+        return accumulator_statistics(chunk_accumulator(movement_data))
 
 def make_patient_info_dict(filename, split_by = ','):
     """
@@ -109,29 +170,583 @@ def make_patient_info_dict(filename, split_by = ','):
         sex and adhd statuses as the values.
 
     """
-    # Empty dictionary created 
-    patient_info = {}
+    # Only the id, sex, and adhd columns read into typed arrays using load_patient_info function,
+    # then turned into the dictionary using patient_info_dict function
+    return patient_info_dict(load_patient_info(filename, ["SEX", "ADHD"]))
+
+def patient_info_dict(info):
+    """
+    This function takes in a typed patient information table and turns it into a patient
+    information dictionary.
+
+    Parameters
+    ----------
+    info : dict
+        Patient information table made by the load_patient_info function, with at least
+        the SEX and ADHD columns.
+
+    Returns
+    -------
+    patient_info : dict
+        Patient information dictionary with the patient ids as the keys and the patient
+        sex and adhd statuses as the values (None where the cell is empty).
+
+    """
+    # Dictionary entry created with patient id as key and patient sex and adhd status as values
+    def status(value):
+        return None if np.isnan(value) else int(value)
+    return {str(patient_id): {"sex": status(sex), "adhd status": status(adhd)}
+            for patient_id, sex, adhd in zip(info["ID"].tolist(), info["SEX"], info["ADHD"])}
+
+def patient_info_index(patient_info):
+    """
+    This function takes in a patient information dictionary and makes the SEX and ADHD
+    index of it, for callers that only have the dictionary.
+
+    Parameters
+    ----------
+    patient_info : dict
+        Patient information dictionary made by the make_patient_info_dict function.
+
+    Returns
+    -------
+    info_index : dict
+        Index made by the value_index function over the SEX and ADHD columns.
+
+    """
+    # Statuses turned back into columns (nan where missing) and indexed using value_index function
+    ids = patient_ids(patient_info)
+    columns = {"ID": np.array(ids, dtype=np.int64)}
+    for name, key in (("SEX", "sex"), ("ADHD", "adhd status")):
+        statuses = [patient_info[str(patient_id)][key] for patient_id in ids]
+        columns[name] = np.array([np.nan if status is None else status for status in statuses], dtype=np.float64)
+    return value_index(columns, ["SEX", "ADHD"])
+
+def activity_file_name(patient_id):
+    """
+    This function takes in a patient id and returns the name of that patient's
+    activity file, zero padding ids below 10 to match the dataset file names. The
+    functions that read the file find a compressed copy (.gz, .xz, or .bz2) if only that
+    exists, see resolve_input in finalproject_reader.
+
+    Parameters
+    ----------
+    patient_id : int
+        The patient id.
+
+    Returns
+    -------
+    activity_file_name : str
+        The name of the patient's movement data file.
+
+    """
+    # Ids below 10 are zero padded to two digits (patient_activity_01.csv), larger
+    # ids are written as they are (patient_activity_101.csv)
+    return "patient_activity_" + str(patient_id).zfill(2) + ".csv"
+
+def patient_ids(patient_info):
+    """
+    This function takes in a patient information dictionary and returns the numeric 
+    patient ids in it in increasing order.
+
+    Parameters
+    ----------
+    patient_info : dict
+        Patient information dictionary with the patient ids as the keys.
+
+    Returns
+    -------
+    ids : list
+        Sorted list of integer patient ids.
+
+    """
+    return sorted(int(patient_id_str) for patient_id_str in patient_info if patient_id_str.isdigit())
+
+def ingest_patient(patient_id, use_cache=True, streaming=False, windows=False):
+    """
+    This function takes in a patient id, reads the patient's activity file, and finds 
+    the patient's movement statistics. It is kept at module level so process pool 
+    workers can run it.
+
+    Parameters
+    ----------
+    patient_id : int
+        The patient id.
+    use_cache : bool, optional
+        Whether to load movement data from the binary cache. The default is True.
+    streaming : bool, optional
+        Whether to read the activity file in fixed size chunks with stream_statistics
+        function so memory use does not grow with the recording length (the cache is not
+        used). The default is False.
+    windows : bool, optional
+        Whether to also find time windowed statistics with the window_statistics function.
+        Windowed statistics need the timestamps, so the whole recording is read (streaming 
+        is not used). The default is False.
+
+    Returns
+    -------
+    data_movement_stat : tuple or None
+        The average and standard deviation of the patient's movement data, None if the
+        patient has no movement data.
+    window_stats : dict
+        The patient's time windowed statistics, only returned if windows is True.
+
+    """
+    activity_file = activity_file_name(patient_id)
+    if windows:
+        movement_data, timestamps = read_movement(activity_file, timestamps=True, use_cache=use_cache)
+        with instrument.stage("windows"):
+            window_stats = window_statistics(movement_data, timestamps)
+        return calculate_statistics(movement_data), window_stats
+    if streaming:
+        try:
+            with instrument.stage("read"):
+                accumulator = stream_statistics(activity_file)
+            instrument.count("read", accumulator["count"], os.path.getsize(resolve_input(activity_file)) if instrument.enabled() else 0)
+            return accumulator_statistics(accumulator)
+        except (OSError, ValueError) as error:
+            record_read_error(activity_file, error)
+            return None
+    return calculate_statistics(read_movement(activity_file, use_cache=use_cache))
+
+def store_results(ids, use_cache=True, windows=False):
+    """
+    This function takes in patient ids, opens the cohort store of their activity files
+    (building it if any file changed), and finds every patient's movement statistics from
+    their slice of the store, one patient at a time.
+
+    Parameters
+    ----------
+    ids : list
+        Sorted list of integer patient ids.
+    use_cache : bool, optional
+        Whether the binary cache is used if the store has to be built. The default is True.
+    windows : bool, optional
+        Whether to also find time windowed statistics. The default is False.
+
+    Returns
+    -------
+    results : dict
+        Dictionary of patient id to a (movement stat, window stats) tuple, with None for
+        patients without movement data (and for window stats if windows is False).
+    store_patients : dict
+        Store index entries of each patient, with the fingerprint each file had when stored.
+
+    """
+    # Store opened (or built, reading each file with read_movement function so errors are recorded)
+    # using open_store function, and every patient's average and stdev found from their slice; files are
+    # fingerprinted by the name that is read, so compressed copies are found using resolve_input function
+    files = {patient_id: resolve_input(activity_file_name(patient_id)) for patient_id in ids}
+    with instrument.stage("store_open"):
+        cohort = open_store(files, partial(read_movement, timestamps=True, use_cache=use_cache))
+    with instrument.stage("stats"):
+        averages, std_devs = cohort_statistics(cohort)
+    stats = {patient_id: (avg, std) for patient_id, avg, std in zip(cohort["ids"].tolist(), averages.tolist(), std_devs.tolist())}
     
-    # File opened, lines read except headers, each line set to variable, stripped of whitespace, 
-    # and split by semicolons
-    with open(filename, "r") as file:
-        lines = file.readlines()
-        for line in lines[1:]:
-            line_data = line.strip().split(';')
+    # Windowed statistics found from each patient's slice of the store if asked
+    results = {}
+    for patient_id in ids:
+        data_movement_stat = stats.get(patient_id)
+        window_stats = None
+        if windows and data_movement_stat:
+            with instrument.stage("windows"):
+                window_stats = window_statistics(*patient_slice(cohort, patient_id, timestamps=True))
+        results[patient_id] = (data_movement_stat, window_stats)
+    return results, cohort["patients"]
+
+def map_patients(function, ids, workers=1):
+    """
+    This function takes in a function of one patient id and a list of ids, and runs the
+    function for every id, either one patient after another or spread over a process pool.
+
+    Parameters
+    ----------
+    function : function
+        Module level function (or partial of one) taking a patient id.
+    ids : list
+        List of integer patient ids.
+    workers : int, optional
+        Number of worker processes. The default is 1 (no process pool), None uses one
+        worker per CPU.
+
+    Returns
+    -------
+    results : list
+        What the function returned for each id, in the order of ids.
+
+    """
+    # Map returns results in patient id order either way, so the tables (and the csvs made 
+    # from them) are the same
+    # Source for process pools: https://docs.python.org/3/library/concurrent.futures.html
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1 and len(ids) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        chunksize = max(1, len(ids) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
             
-            # If patient id exists, patient id, sex, and adhd status assigned to variables if 
-            # sex and adhd status data exists, sex and adhd data variables converted to int
-            if line_data[0] != "":
-                patient_id = line_data[0]
-                patient_sex = int(line_data[1]) if line_data[1] else None 
-                patient_adhd = int(line_data[10]) if line_data[10] else None
-                
-                # Dictionary entry created with patient id as key and patient sex and adhd status as
-                # values 
-                patient_info[patient_id] = {"sex": patient_sex, "adhd status": patient_adhd}
-    return patient_info 
+            # If recording is on, each worker records into its own report which is merged here
+            if instrument.enabled():
+                results = []
+                for result, worker_report in executor.map(partial(instrument.collect, function), ids,
+                                                          chunksize=chunksize):
+                    instrument.merge(worker_report)
+                    results.append(result)
+                return results
+            return list(executor.map(function, ids, chunksize=chunksize))
+    return [function(patient_id) for patient_id in ids]
+
+def feature_patient(patient_id, use_cache=True):
+    """
+    This function takes in a patient id, reads the patient's activity file, and finds the
+    patient's rolling window and activity bout features. It is kept at module level so 
+    process pool workers can run it.
+
+    Parameters
+    ----------
+    patient_id : int
+        The patient id.
+    use_cache : bool, optional
+        Whether to load movement data from the binary cache. The default is True.
+
+    Returns
+    -------
+    features : dict or None
+        The patient's features made by the extract_features function, None if the patient
+        has no movement data.
+
+    """
+    movement_data = read_movement(activity_file_name(patient_id), use_cache=use_cache)
+    if movement_data.size == 0:
+        return None
+    with instrument.stage("features"):
+        return extract_features(movement_data)
+
+def make_feature_table(patient_info, use_cache=True, workers=1):
+    """
+    This function takes in a patient information dictionary and creates a table of
+    rolling window and activity bout features for each patient.
+
+    Parameters
+    ----------
+    patient_info : dict
+        Patient information dictionary with the patient ids as the keys.
+    use_cache : bool, optional
+        Whether to load movement data from the binary cache. The default is True.
+    workers : int, optional
+        Number of worker processes. The default is 1, None uses one worker per CPU.
+
+    Returns
+    -------
+    feature_table : dict
+        Table with the patient id strings as the keys (in patient id order) and the feature
+        dictionaries (with a "patient_id" entry added) as the values. Patients without
+        movement data are left out of the table.
+
+    """
+    # Features of each patient found using feature_patient function over map_patients function
+    ids = patient_ids(patient_info)
+    features = map_patients(partial(feature_patient, use_cache=use_cache), ids, workers)
+    return {str(patient_id): dict(patient_id=patient_id, **patient_features)
+            for patient_id, patient_features in zip(ids, features) if patient_features is not None}
+
+def quantile_patient(patient_id, use_cache=True, streaming=False, sketch_k=DEFAULT_K):
+    """
+    This function takes in a patient id, reads the patient's activity file, and finds the
+    patient's running statistics together with a quantile sketch of the movement data, in
+    the same pass. It is kept at module level so process pool workers can run it.
+
+    Parameters
+    ----------
+    patient_id : int
+        The patient id.
+    use_cache : bool, optional
+        Whether to load movement data from the binary cache. The default is True.
+    streaming : bool, optional
+        Whether to read the activity file in fixed size chunks with stream_statistics
+        function. The default is False.
+    sketch_k : int, optional
+        Size of the quantile sketch (see new_sketch in finalproject_sketch). The default
+        is DEFAULT_K.
+
+    Returns
+    -------
+    accumulator : dict or None
+        Accumulator with a "sketch" entry, None if the patient has no movement data.
+
+    """
+    activity_file = activity_file_name(patient_id)
+    with instrument.stage("quantiles"):
+        if streaming:
+            try:
+                accumulator = stream_statistics(activity_file, sketch_k=sketch_k)
+            except (OSError, ValueError) as error:
+                record_read_error(activity_file, error)
+                return None
+        else:
+            accumulator = chunk_accumulator(read_movement(activity_file, use_cache=use_cache), sketch_k)
+    return accumulator if accumulator["count"] else None
+
+def make_quantile_table(patient_info, use_cache=True, workers=1, streaming=False, sketch_k=DEFAULT_K):
+    """
+    This function takes in a patient information dictionary and creates a table of each
+    patient's median, quartiles, interquartile range, and 95th percentile, estimated from
+    quantile sketches.
+
+    Parameters
+    ----------
+    patient_info : dict
+        Patient information dictionary with the patient ids as the keys.
+    use_cache : bool, optional
+        Whether to load movement data from the binary cache. The default is True.
+    workers : int, optional
+        Number of worker processes. The default is 1, None uses one worker per CPU.
+    streaming : bool, optional
+        Whether to read activity files in fixed size chunks. The default is False.
+    sketch_k : int, optional
+        Size of each quantile sketch. The default is DEFAULT_K.
+
+    Returns
+    -------
+    quantile_table : dict
+        Table with the patient id strings as the keys (in patient id order) and dictionaries
+        of the patient_id and the entries of the sketch_summary function as the values.
+        Patients without movement data are left out of the table.
+    sketches : dict
+        Table of the same patients' sketches, so groups can be summarized by merging them.
+
+    """
+    # Sketch of each patient found using quantile_patient function over map_patients function
+    ids = patient_ids(patient_info)
+    accumulators = map_patients(partial(quantile_patient, use_cache=use_cache, streaming=streaming, sketch_k=sketch_k), ids, workers)
+    sketches = {str(patient_id): accumulator["sketch"] for patient_id, accumulator in zip(ids, accumulators) if accumulator}
+    quantile_table = {patient_id_str: dict(patient_id=int(patient_id_str), **sketch_summary(sketch))
+                      for patient_id_str, sketch in sketches.items()}
+    return quantile_table, sketches
+
+def merge_group_sketches(sketches, sketch_k=DEFAULT_K):
+    """
+    This function takes in a list of sketches and merges them into one sketch of the group.
+
+    Parameters
+    ----------
+    sketches : list
+        List of sketches, e.g. made by group_patients over the sketches of make_quantile_table.
+    sketch_k : int, optional
+        Size of the sketch of an empty group. The default is DEFAULT_K.
 
-def make_lists(patient_info):   
+    Returns
+    -------
+    sketch : dict
+        Merged sketch of every value the group's sketches have seen.
+
+    """
+    group_sketch = new_sketch(sketch_k)
+    for sketch in sketches:
+        group_sketch = merge_sketches(group_sketch, sketch)
+    return group_sketch
+
+def make_spectral_table(patient_info, use_cache=True):
+    """
+    This function takes in a patient information dictionary and creates a table of
+    circadian and spectral features for each patient, transforming batches of patients at once.
+
+    Parameters
+    ----------
+    patient_info : dict
+        Patient information dictionary with the patient ids as the keys.
+    use_cache : bool, optional
+        Whether to load movement data from the binary cache. The default is True.
+
+    Returns
+    -------
+    spectral_table : dict
+        Table with the patient id strings as the keys (in patient id order) and the feature
+        dictionaries made by the spectral_features function (with a "patient_id" entry 
+        added) as the values. Patients without movement data are left out of the table.
+
+    """
+    # Movement data and timestamps of each patient with data read using read_movement function,
+    # then every patient's features found at once using spectral_features function
+    ids = []
+    recordings = []
+    for patient_id in patient_ids(patient_info):
+        movement_data, timestamps = read_movement(activity_file_name(patient_id), timestamps=True, use_cache=use_cache)
+        if movement_data.size:
+            ids.append(patient_id)
+            recordings.append((movement_data, timestamps))
+    with instrument.stage("spectral"):
+        features = spectral_features(recordings)
+    return {str(patient_id): dict(patient_id=patient_id, **patient_features)
+            for patient_id, patient_features in zip(ids, features)}
+
+def make_aligned_tensor(patient_info, filename=None, use_cache=True):
+    """
+    This function takes in a patient information dictionary, checks every patient's
+    timestamps for gaps and repeated minutes, and lines the recordings up in one
+    (patients, days, 1440) tensor.
+
+    Parameters
+    ----------
+    patient_info : dict
+        Patient information dictionary with the patient ids as the keys.
+    filename : str, optional
+        Name of a .npy file to write the tensor to (see build_tensor in finalproject_align).
+        The default is None (the tensor is kept in memory).
+    use_cache : bool, optional
+        Whether to load movement data from the binary cache. The default is True.
+
+    Returns
+    -------
+    ids : numpy.ndarray
+        int64 patient id of each tensor row (patients with movement data, in id order).
+    tensor : numpy.ndarray
+        float32 tensor with nan for minutes without data.
+    reports : list
+        Timing report (gaps, missing minutes, duplicates) of each row's recording.
+
+    """
+    # Movement data and timestamps of each patient with data read using read_movement function,
+    # then lined up using build_tensor function
+    ids = []
+    recordings = []
+    for patient_id in patient_ids(patient_info):
+        movement_data, timestamps = read_movement(activity_file_name(patient_id), timestamps=True, use_cache=use_cache)
+        if movement_data.size:
+            ids.append(patient_id)
+            recordings.append((movement_data, timestamps))
+    with instrument.stage("align"):
+        tensor, reports = build_tensor(ids, recordings, filename)
+    instrument.count("align", sum(report["rows"] for report in reports), tensor.nbytes if instrument.enabled() else 0)
+    return np.array(ids, dtype=np.int64), tensor, reports
+
+def make_patient_table(patient_info, use_cache=True, workers=1, streaming=False, windows=False, manifest=None, use_store=False):
+    """
+    This function takes in a patient information dictionary, reads every patient 
+    activity file exactly once, and creates a table of movement statistics for
+    each patient.
+
+    Parameters
+    ----------
+    patient_info : dict
+        Patient information dictionary with the patient ids as the keys and the patient
+        sex and adhd statuses as the values.
+    use_cache : bool, optional
+        Whether to load movement data from the binary cache. The default is True.
+    workers : int, optional
+        Number of worker processes to read patients with. The default is 1 (no process 
+        pool), None uses one worker per CPU.
+    streaming : bool, optional
+        Whether to read activity files in fixed size chunks. The default is False.
+    windows : bool, optional
+        Whether to also make a table of time windowed statistics. The default is False.
+    manifest : dict, optional
+        Run manifest made by the load_manifest function. If given, only patients whose
+        activity file changed since it was recorded are read, and the manifest is updated
+        with their new results. The default is None (every patient is read).
+    use_store : bool, optional
+        Whether to find every patient's statistics from the memory mapped cohort store
+        (see finalproject_store) instead of patient by patient; the store is built again
+        if any activity file changed. The default is False.
+
+    Returns
+    -------
+    patient_table : dict
+        Patient table with the patient ids as the keys (in patient id order) and the 
+        average and standard deviation tuples as the values. Patients without movement
+        data are left out of the table.
+    window_table : dict
+        Table with the same keys as the patient table and the time windowed statistics
+        dictionaries (with a "patient_id" entry added) as the values, only returned if 
+        windows is True.
+
+    """
+    # Patient ids found in the patient info file
+    ids = patient_ids(patient_info)
+    
+    # Patients whose activity file is unchanged since the manifest was recorded reuse their
+    # recorded statistics, the rest are fingerprinted (before reading) and read again
+    results = {}
+    todo = ids
+    if use_store:
+        results, store_patients = store_results(ids, use_cache, windows)
+        todo = []
+        if manifest is not None:
+            for patient_id in ids:
+                data_movement_stat, window_stats = results[patient_id]
+                manifest["patients"][str(patient_id)] = {"fingerprint": store_patients[str(patient_id)]["fingerprint"],
+                                                         "stat": data_movement_stat,
+                                                         "windows": window_stats}
+    elif manifest is not None:
+        todo = []
+        for patient_id in ids:
+            entry = manifest["patients"].get(str(patient_id))
+            if (entry is not None and (not windows or entry.get("windows") is not None or entry["stat"] is None)
+                    and input_unchanged(resolve_input(activity_file_name(patient_id)), entry["fingerprint"])):
+                results[patient_id] = (tuple(entry["stat"]) if entry["stat"] else None, entry.get("windows"))
+            else:
+                todo.append(patient_id)
+        fingerprints = [input_fingerprint(resolve_input(activity_file_name(patient_id))) for patient_id in todo]
+    
+    # Movement data for each patient read and avg and std found using ingest_patient function
+    # over map_patients function
+    stats = map_patients(partial(ingest_patient, use_cache=use_cache, streaming=streaming, windows=windows), todo, workers)
+    for index, patient_id in enumerate(todo):
+        results[patient_id] = stats[index] if windows else (stats[index], None)
+        
+        # New results recorded in the manifest with the fingerprint the file had when it was read
+        if manifest is not None:
+            data_movement_stat, window_stats = results[patient_id]
+            manifest["patients"][str(patient_id)] = {"fingerprint": fingerprints[index],
+                                                     "stat": data_movement_stat,
+                                                     "windows": window_stats}
+    
+    # Manifest entries of patients no longer in the patient info file removed
+    if manifest is not None:
+        manifest["patients"] = {patient_id_str: manifest["patients"][patient_id_str] for patient_id_str in map(str, ids)}
+    
+    # Movement stat (and windowed stats) added to the tables if the patient had movement data
+    patient_table = {}
+    window_table = {}
+    for patient_id in ids:
+        data_movement_stat, window_stats = results[patient_id]
+        if data_movement_stat:
+            patient_table[str(patient_id)] = data_movement_stat
+            if windows:
+                window_table[str(patient_id)] = dict(patient_id=patient_id, **window_stats)
+    if windows:
+        return patient_table, window_table
+    return patient_table
+
+def group_patients(patient_table, info_index, conditions):
+    """
+    This function takes in a patient table, a patient information index, and conditions on
+    the patient information columns, and returns the statistics of the patients in that 
+    group without reading any activity files again.
+
+    Parameters
+    ----------
+    patient_table : dict
+        Patient table (or window table) made by the make_patient_table function.
+    info_index : dict
+        Index of patient information values made by the value_index function in
+        finalproject_info (or by the patient_info_index function).
+    conditions : dict
+        Dictionary of column name to the value (or list of values) the group has, e.g.
+        GROUP_CONDITIONS["f"] or {"ADHD": 1, "MED_Stimulants": 1}.
+
+    Returns
+    -------
+    group_data : list
+        List of averages and standard deviations (or whatever else the table holds) 
+        for the patients in the group, in patient id order.
+
+    """
+    # Ids of the group found by intersecting index sets using stratum_ids function, and their
+    # statistics picked out of the table using table_rows function
+    return table_rows(patient_table, stratum_ids(info_index, conditions))
+
+def make_lists(patient_info, patient_table=None, use_cache=True, workers=1, streaming=False, info_index=None, use_store=False):   
     """
     This function takes in a patient information dictionary, reads through each patient activity file
     using patient ids, and adds data to lists based on sex and adhd status.
@@ -141,6 +756,20 @@ def make_lists(patient_info):
     patient_info : dict
         Patient information dictionary with the patient ids as the keys and the patient
         sex and adhd statuses as the values.
+    patient_table : dict, optional
+        Patient table made by the make_patient_table function. The default is None, 
+        in which case the table is made here.
+    use_cache : bool, optional
+        Whether to load movement data from the binary cache. The default is True.
+    workers : int, optional
+        Number of worker processes to read patients with. The default is 1.
+    streaming : bool, optional
+        Whether to read activity files in fixed size chunks. The default is False.
+    info_index : dict, optional
+        Index of patient information values made by the value_index function in
+        finalproject_info. The default is None, in which case it is made from patient_info.
+    use_store : bool, optional
+        Whether to find statistics from the memory mapped cohort store. The default is False.
 
     Returns
     -------
@@ -154,75 +783,265 @@ def make_lists(patient_info):
         List of averages and standard deviations for male patients without ADHD.
 
     """
-    # Empty sex and adhd status lists created
-    combined_data_f = []
-    combined_data_m = []
-    combined_data_c_f = []
-    combined_data_c_m = []
+    # Every patient file read once into the patient table using make_patient_table function
+    if patient_table is None:
+        patient_table = make_patient_table(patient_info, use_cache, workers, streaming, use_store=use_store)
     
-    # For loop iterates through each patient movement file with index correspondin to patient id 
-    for i in range (1, 109):
-        patient_id_str = str(i)
-        
-        # If patient id found in patient info file, activity file set to variable using index/id,
-        # movement data for patient read using readz_movement function, avg and std found using 
-        # calculate_statistics function, and movement stat set to variable
-        if patient_id_str in patient_info:
-            if i <= 9:
-                activity_file_name = "patient_activity_0" + str(i) + ".csv"
-                data_movement_stat = calculate_statistics(read_movement(activity_file_name))
-            elif 10 <= i <= 108:
-                activity_file_name = "patient_activity_" + str(i) + ".csv"
-                data_movement_stat = calculate_statistics(read_movement(activity_file_name))
-            
-            # Patient dict set to variable, sex and adhd info extracted from dict using index
-            patient_data = patient_info[patient_id_str]
-            sex_info = patient_data["sex"]
-            adhd_info = patient_data["adhd status"]
-            
-            # for sex, 0 is female and 1 is male, for adhd, 0 is no adhd and 1 is adhd
-            # patient activity data appended to respected lists based on sex and adhd status
-            if data_movement_stat:
-                if sex_info == 0 and adhd_info == 1: 
-                        combined_data_f.append(data_movement_stat)
-                elif sex_info == 1 and adhd_info == 1: 
-                        combined_data_m.append(data_movement_stat)
-                elif sex_info == 0 and adhd_info == 0:
-                        combined_data_c_f.append(data_movement_stat)
-                elif sex_info == 1 and adhd_info == 0:
-                        combined_data_c_m.append(data_movement_stat)
+    # group lists picked out of the patient table using group_patients function with each
+    # group's conditions
+    with instrument.stage("grouping"):
+        if info_index is None:
+            info_index = patient_info_index(patient_info)
+        combined_data_f = group_patients(patient_table, info_index, GROUP_CONDITIONS["f"])
+        combined_data_m = group_patients(patient_table, info_index, GROUP_CONDITIONS["m"])
+        combined_data_c_f = group_patients(patient_table, info_index, GROUP_CONDITIONS["c_f"])
+        combined_data_c_m = group_patients(patient_table, info_index, GROUP_CONDITIONS["c_m"])
     return combined_data_f, combined_data_m, combined_data_c_f, combined_data_c_m
 
 def create_csv(filename, data):
     """
     This function takes in a file name to create, a list of data to add to the file, 
-    and adds the data to the file.
+    and adds the data to the file as a typed summary with named columns.
 
     Parameters
     ----------
     filename : str
         Name of file to create
     data : list
-        List of data to write to file
+        List of (patient id, average, standard deviation) rows to write to file
+
+    Returns
+    -------
+    None.
+
+    """
+    # File created with a patient_id,average,std_dev header and one row per patient using
+    # write_summary function, so the graphing program can load each column as an array
+    write_summary(filename, data)
+   
+    
+def create_window_csv(filename, window_data):
+    """
+    This function takes in a file name to create and a list of time windowed statistics
+    (or feature) dictionaries, and writes them to the file with one named column per statistic.
+
+    Parameters
+    ----------
+    filename : str
+        Name of file to create
+    window_data : list
+        List of time windowed statistics dictionaries made by the make_patient_table function,
+        or of feature dictionaries made by the make_feature_table function
 
     Returns
     -------
     None.
 
     """
-    # Technique to write csv source: https://blog.enterprisedna.co/how-to-write-a-list-to-csv-in-python/
+    # Columns are every statistic any patient has (patients with shorter recordings have fewer 
+    # recording days), in the order they first appear; missing statistics are written as nan
+    fieldnames = list(dict.fromkeys(key for row in window_data for key in row))
     
-    # File created, csv writer to write each row of the list to the csv file
+    # Source for DictWriter: https://docs.python.org/3/library/csv.html#csv.DictWriter
     with open(filename, 'w', newline='') as file:
-        writer = csv.writer(file)
-        for row in data:
-            writer.writerow([row])  
-   
+        writer = csv.DictWriter(file, fieldnames=fieldnames, restval="nan")
+        writer.writeheader()
+        writer.writerows(window_data)
+
+def write_output(filename, data, manifest, create=create_csv):
+    """
+    This function takes in an output file name, the data to write to it, a run manifest,
+    and the function that writes the file, and writes the file only if its data changed
+    since the manifest was recorded (or the file was changed or removed since).
+
+    Parameters
+    ----------
+    filename : str
+        Name of file to create
+    data : list
+        List of data to write to file
+    manifest : dict
+        Run manifest made by the load_manifest function.
+    create : function, optional
+        Function that writes the data to the file. The default is create_csv.
+
+    Returns
+    -------
+    written : bool
+        True if the file was written.
+
+    """
+    if output_unchanged(manifest, filename, data):
+        return False
+    with instrument.stage("csv_write"):
+        create(filename, data)
+    instrument.count("csv_write", len(data))
+    record_output(manifest, filename, data)
+    return True
+
+def follow_patients(ids, tails):
+    """
+    This function takes in patient ids and the state of every followed activity file, and
+    reads only what was added to each file since the last time, using tail_file function.
+
+    Parameters
+    ----------
+    ids : list
+        List of integer patient ids.
+    tails : dict
+        Dictionary of activity file name to state made by the tail_file function; updated
+        in place.
+
+    Returns
+    -------
+    changed : int
+        Number of files with new movement data (or read again from the start, or deleted).
+
+    """
+    changed = 0
+    for patient_id in ids:
+        activity_file = activity_file_name(patient_id)
+        
+        # Files that do not exist (yet) are skipped, files that cannot be read are recorded, and
+        # the state of a file deleted since it was read dropped so it no longer counts in its group
+        try:
+            with instrument.stage("read"):
+                tail, new_rows = tail_file(activity_file, tails.get(activity_file, new_tail()))
+        except (OSError, ValueError) as error:
+            record_read_error(activity_file, error)
+            if activity_file in tails and not os.path.exists(resolve_input(activity_file)):
+                del tails[activity_file]
+                changed += 1
+            continue
+        tails[activity_file] = tail
+        if new_rows:
+            changed += 1
+            instrument.count("read", max(new_rows, 0))
+    return changed
+
+def watch(patient_info, info_index, interval=1.0, rounds=None, state_file=TAIL_STATE_FILE):
+    """
+    This function follows the activity files as they grow: every interval it parses only
+    the rows added to each file, updates those patients' running averages and standard
+    deviations, and rewrites the combined csvs whose groups changed. Read positions and
+    running statistics are saved, so a restarted watch carries on where it stopped.
+
+    Parameters
+    ----------
+    patient_info : dict
+        Patient information dictionary made by the patient_info_dict function.
+    info_index : dict
+        Index of patient information values made by the value_index function in
+        finalproject_info.
+    interval : float, optional
+        Seconds between checks of the files. The default is 1.0.
+    rounds : int, optional
+        Number of checks to make. The default is None (watch until interrupted).
+    state_file : str, optional
+        Name of the file the read positions and running statistics are kept in. The
+        default is TAIL_STATE_FILE.
+
+    Returns
+    -------
+    None.
+
+    """
+    ids = patient_ids(patient_info)
+    tails = load_tail_state(state_file)
+    manifest = load_manifest(MANIFEST_FILE)
+    group_files = (("patient_activity_combined_f.csv", "f"), ("patient_activity_combined_m.csv", "m"),
+                   ("patient_activity_c_combined_f.csv", "c_f"), ("patient_activity_c_combined_m.csv", "c_m"))
+    checks = 0
+    try:
+        while rounds is None or checks < rounds:
+            started = time.perf_counter()
+            changed = follow_patients(ids, tails)
+            
+            # Patient table made from the running statistics, and the group csvs whose data
+            # changed written using write_output function
+            if changed:
+                summary_table = {}
+                for patient_id in ids:
+                    tail = tails.get(activity_file_name(patient_id))
+                    data_movement_stat = tail and accumulator_statistics(tail["accumulator"])
+                    if data_movement_stat:
+                        summary_table[str(patient_id)] = (patient_id,) + data_movement_stat
+                written = [filename for filename, group in group_files
+                           if write_output(filename, group_patients(summary_table, info_index, GROUP_CONDITIONS[group]), manifest)]
+                save_manifest(manifest, MANIFEST_FILE)
+                save_tail_state(tails, state_file)
+                print(time.strftime("%H:%M:%S"), changed, "files changed,", len(written), "csvs rewritten in",
+                      round(time.perf_counter() - started, 3), "seconds")
+            checks += 1
+            if rounds is None or checks < rounds:
+                time.sleep(max(0.0, interval - (time.perf_counter() - started)))
+    
+    # Stopped with Ctrl+C, with everything read so far already saved
+    except KeyboardInterrupt:
+        pass
+
+def main(workers=1, use_cache=True, streaming=False, windows=False, incremental=True, report=None, use_store=False, features=False,
+         spectral=False, align=None, quantiles=None):
+    """
+    This function reads the patient info and activity files and writes the four combined 
+    patient activity csvs.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Number of worker processes to read patients with. The default is 1.
+    use_cache : bool, optional
+        Whether to load movement data from the binary cache. The default is True.
+    streaming : bool, optional
+        Whether to read activity files in fixed size chunks. The default is False.
+    windows : bool, optional
+        Whether to also write time windowed statistics csvs (one per group, named like the 
+        combined csvs with "_windows" added). The default is False.
+    incremental : bool, optional
+        Whether to use the run manifest from the last run, so only patients whose activity 
+        file changed are read again and only group csvs whose data changed are written 
+        again. The default is True (False rebuilds everything).
+    report : str, optional
+        Name of a JSON file to write a report of each stage's wall time, rows, bytes, and peak
+        memory, and of skipped and failed files, to. The default is None (nothing is recorded).
+    use_store : bool, optional
+        Whether to find statistics from the memory mapped cohort store. The default is False.
+    features : bool, optional
+        Whether to also write rolling window and activity bout feature csvs (one per group,
+        named like the combined csvs with "_features" added). The default is False.
+    spectral : bool, optional
+        Whether to also write circadian (cosinor) and spectral power feature csvs (one per
+        group, named like the combined csvs with "_spectral" added). The default is False.
+    align : str, optional
+        Name of a .npy file to write the (patients, days, 1440) aligned tensor to, with its
+        patient ids and each recording's gaps and repeated minutes in the file name plus
+        ".json". The default is None (no tensor is made).
+    quantiles : int, optional
+        Size k of the quantile sketches used to also write median, quartile, interquartile
+        range, and 95th percentile csvs (one per group, named like the combined csvs with
+        "_quantiles" added), with every patient's and group's sketch saved to SKETCH_FILE.
+        The default is None (no quantiles).
+
+    Returns
+    -------
+    None.
+
+    """
     
-def main():
+    # Recording turned on if a report was asked for
+    if report:
+        instrument.enable()
     
-    # Patient info dictionary created using make_patient_info_dict function using dataset provided file
-    patient_info = make_patient_info_dict("patient_info.csv")
+    # Patient info file read once into typed columns using load_patient_info function, with the
+    # patient info dictionary and the per value index of its columns made from it
+    with instrument.stage("info_load"):
+        info = load_patient_info("patient_info.csv")
+        patient_info = patient_info_dict(info)
+        info_index = value_index(info)
+    instrument.count("info_load", len(patient_info))
+    
+    # Run manifest from the last run loaded, or a new one started for a full rebuild
+    manifest = load_manifest(MANIFEST_FILE) if incremental else new_manifest()
     
     # File names set to variables
     combined_file_f = "patient_activity_combined_f.csv"
@@ -230,18 +1049,76 @@ def main():
     combined_file_c_f = "patient_activity_c_combined_f.csv"
     combined_file_c_m = "patient_activity_c_combined_m.csv"
     
-    # Patient activity average and stdev lists created based on sex and adhd status using make_lists function
-    # and lists set to variable
-    combined_data_f = make_lists(patient_info)[0]
-    combined_data_m = make_lists(patient_info)[1]
-    combined_data_c_f = make_lists(patient_info)[2]
-    combined_data_c_m = make_lists(patient_info)[3]
+    # Patient table made once using make_patient_table function (every changed patient file is 
+    # read once), with a time windowed statistics table as well if asked
+    patient_table = make_patient_table(patient_info, use_cache, workers, streaming, windows, manifest, use_store)
+    if windows:
+        patient_table, window_table = patient_table
+    
+    # Patient activity (patient id, average, stdev) lists created based on sex and adhd status using 
+    # make_lists function over the patient table with ids added, and lists set to variables
+    summary_table = {patient_id_str: (int(patient_id_str),) + data_movement_stat 
+                     for patient_id_str, data_movement_stat in patient_table.items()}
+    combined_data_f, combined_data_m, combined_data_c_f, combined_data_c_m = make_lists(patient_info, summary_table, info_index=info_index)
+    
+    # Patient csvs created using lists based on attributes, specified filenames, and the create_csv function,
+    # skipping groups whose data did not change (a changed patient info row changes the groups it moves between)
+    write_output(combined_file_f, combined_data_f, manifest)
+    write_output(combined_file_m, combined_data_m, manifest)
+    write_output(combined_file_c_f, combined_data_c_f, manifest)
+    write_output(combined_file_c_m, combined_data_c_m, manifest)
+    
+    # Windowed statistics csvs created for each group using the same groupings over the window table
+    if windows:
+        for combined_file, group in ((combined_file_f, "f"), (combined_file_m, "m"),
+                                     (combined_file_c_f, "c_f"), (combined_file_c_m, "c_m")):
+            write_output(combined_file.replace(".csv", "_windows.csv"),
+                         group_patients(window_table, info_index, GROUP_CONDITIONS[group]), manifest, create_window_csv)
+    
+    # Feature csvs created for each group the same way from a feature table made using
+    # make_feature_table function
+    if features:
+        feature_table = make_feature_table(patient_info, use_cache, workers)
+        for combined_file, group in ((combined_file_f, "f"), (combined_file_m, "m"),
+                                     (combined_file_c_f, "c_f"), (combined_file_c_m, "c_m")):
+            write_output(combined_file.replace(".csv", "_features.csv"),
+                         group_patients(feature_table, info_index, GROUP_CONDITIONS[group]), manifest, create_window_csv)
     
-    # Patient csvs created using lists based on attributes, specified filenames, and the create_csv function
-    create_csv(combined_file_f, combined_data_f)
-    create_csv(combined_file_m, combined_data_m)
-    create_csv(combined_file_c_f, combined_data_c_f)
-    create_csv(combined_file_c_m, combined_data_c_m)
+    # Circadian and spectral feature csvs created for each group the same way from a table made
+    # using make_spectral_table function
+    if spectral:
+        spectral_table = make_spectral_table(patient_info, use_cache)
+        for combined_file, group in ((combined_file_f, "f"), (combined_file_m, "m"),
+                                     (combined_file_c_f, "c_f"), (combined_file_c_m, "c_m")):
+            write_output(combined_file.replace(".csv", "_spectral.csv"),
+                         group_patients(spectral_table, info_index, GROUP_CONDITIONS[group]), manifest, create_window_csv)
+    
+    # Quantile csvs created for each group the same way from a table made using make_quantile_table
+    # function, and each group's sketches merged into one using merge_group_sketches function
+    if quantiles:
+        quantile_table, sketches = make_quantile_table(patient_info, use_cache, workers, streaming, quantiles)
+        group_sketches = {}
+        for combined_file, group in ((combined_file_f, "f"), (combined_file_m, "m"),
+                                     (combined_file_c_f, "c_f"), (combined_file_c_m, "c_m")):
+            write_output(combined_file.replace(".csv", "_quantiles.csv"),
+                         group_patients(quantile_table, info_index, GROUP_CONDITIONS[group]), manifest, create_window_csv)
+            group_sketches[group] = merge_group_sketches(group_patients(sketches, info_index, GROUP_CONDITIONS[group]), quantiles)
+            summary = sketch_summary(group_sketches[group])
+            print("Group", group, "median", summary["median"], "IQR", summary["iqr"], "p95", summary["p95"])
+        write_json(SKETCH_FILE, {"patients": sketches, "groups": group_sketches})
+    
+    # Aligned tensor written if asked for, with a count of recordings with gaps or repeated minutes
+    if align:
+        ids, tensor, reports = make_aligned_tensor(patient_info, align, use_cache)
+        print("Aligned", len(ids), "recordings into", align, tensor.shape, "-",
+              sum(1 for report in reports if report["gaps"]), "with gaps,",
+              sum(1 for report in reports if report["duplicates"] or report["backwards"]), "with repeated or out of order minutes")
+    
+    # Manifest saved for the next run, and the instrumentation report written if asked for
+    save_manifest(manifest, MANIFEST_FILE)
+    if report:
+        instrument.write_report(report)
+        instrument.disable()
     
           
 # testing center: 
@@ -257,4 +1134,65 @@ def main():
    
     
 
-main()
\ No newline at end of file
+def parse_args(argv=None):
+    """
+    This function reads the command line options of the program.
+
+    Parameters
+    ----------
+    argv : list, optional
+        Command line arguments. The default is None (the arguments the program was run with).
+
+    Returns
+    -------
+    args : argparse.Namespace
+        The parsed options.
+
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description="Combine patient activity files into per-group statistics csvs.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes to read patients with (0 uses one per CPU, default 1)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="parse every activity file instead of loading the binary cache")
+    parser.add_argument("--streaming", action="store_true",
+                        help="read activity files in fixed size chunks to keep memory use constant")
+    parser.add_argument("--windows", action="store_true",
+                        help="also write hour of day, day/night, recording day, and weekday/weekend statistics")
+    parser.add_argument("--features", action="store_true",
+                        help="also write 5/15/60 minute rolling window and sedentary/active bout features")
+    parser.add_argument("--spectral", action="store_true",
+                        help="also write 24 hour cosinor (mesor, amplitude, acrophase) and spectral power features")
+    parser.add_argument("--align", metavar="FILE",
+                        help="also write a memory mappable patients x days x 1440 minute tensor (.npy) with gap checks")
+    parser.add_argument("--quantiles", type=int, nargs="?", const=DEFAULT_K, metavar="K",
+                        help="also write median, IQR, and 95th percentile csvs from mergeable quantile sketches of size K "
+                             "(default " + str(DEFAULT_K) + ", larger is more accurate)")
+    parser.add_argument("--store", action="store_true",
+                        help="find statistics from one memory mapped cohort store (built once, rebuilt if a file changes)")
+    parser.add_argument("--full", action="store_true",
+                        help="ignore the run manifest and rebuild every output from scratch")
+    parser.add_argument("--watch", type=float, nargs="?", const=1.0, metavar="SECONDS",
+                        help="keep following the activity files, updating the csvs from appended rows every SECONDS (default 1)")
+    parser.add_argument("--report", metavar="FILE",
+                        help="write per stage timing, memory, and skipped/failed file counts to a JSON file")
+    args = parser.parse_args(argv)
+    if args.streaming and args.windows:
+        parser.error("--windows needs the timestamps of the whole recording and cannot be used with --streaming")
+    if args.streaming and args.store:
+        parser.error("--store reads whole recordings into the store and cannot be used with --streaming")
+    if args.watch is not None and (args.windows or args.features or args.spectral or args.align or args.store or args.quantiles):
+        parser.error("--watch only updates the averages and standard deviations of the combined csvs")
+    if args.watch is not None and args.report:
+        parser.error("--report cannot be used with --watch, which runs until it is stopped")
+    return args
+
+# Call to main, only when run as a program so process pool workers can import this file
+if __name__ == "__main__":
+    args = parse_args()
+    if args.watch is not None:
+        info = load_patient_info("patient_info.csv")
+        watch(patient_info_dict(info), value_index(info), args.watch)
+    else:
+        main(args.workers or None, not args.no_cache, args.streaming, args.windows, not args.full, args.report, args.store,
+             args.features, args.spectral, args.align, args.quantiles)
@@ -0,0 +1,139 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Rolling Window and Activity Bout Features
+
+"""
+# numpy imported to find rolling statistics with cumulative sums and bouts with run lengths,
+# so every feature takes a few passes over the recording however long it is
+import numpy as np
+
+# Rolling window lengths in minutes
+ROLLING_WINDOWS = (5, 15, 60)
+
+# Minutes with movement below this count are sedentary, the rest are active
+SEDENTARY_THRESHOLD = 100
+
+# Shortest run of sedentary or active minutes counted as a bout
+MIN_BOUT_MINUTES = 10
+
+def rolling_mean_var(movement_data, window):
+    """
+    This function takes in movement data and a window length and finds the average and
+    population variance of every run of window consecutive minutes.
+
+    Parameters
+    ----------
+    movement_data : numpy.ndarray
+        Movement data for one participant, one value per minute.
+    window : int
+        Window length in minutes.
+
+    Returns
+    -------
+    rolling_means : numpy.ndarray
+        Average of each window, len(movement_data) - window + 1 values (none if the
+        recording is shorter than the window).
+    rolling_vars : numpy.ndarray
+        Population variance of each window.
+
+    """
+    # Source for rolling sums from cumulative sums: https://numpy.org/doc/stable/reference/generated/numpy.cumsum.html
+    data = np.asarray(movement_data, dtype=np.float64)
+    if data.size < window:
+        return np.empty(0), np.empty(0)
+
+    # Data shifted by its own average first so the sums of squares stay small, then the sum and
+    # sum of squares of each window found as differences of cumulative sums
+    shifted = data - data.mean()
+    sums = np.cumsum(np.concatenate(([0.0], shifted)))
+    squares = np.cumsum(np.concatenate(([0.0], shifted * shifted)))
+    window_sums = sums[window:] - sums[:-window]
+    window_means = window_sums / window
+    rolling_vars = np.maximum((squares[window:] - squares[:-window]) / window - window_means * window_means, 0.0)
+    return window_means + data.mean(), rolling_vars
+
+def run_lengths(values):
+    """
+    This function takes in an array and splits it into runs of equal values.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Array to split.
+
+    Returns
+    -------
+    run_values : numpy.ndarray
+        Value of each run.
+    lengths : numpy.ndarray
+        Length of each run.
+
+    """
+    # Source for run length encoding: https://en.wikipedia.org/wiki/Run-length_encoding
+    # Runs start at the first value and wherever a value differs from the one before it
+    values = np.asarray(values)
+    if values.size == 0:
+        return values, np.empty(0, dtype=np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(values[1:] != values[:-1]) + 1))
+    lengths = np.diff(np.concatenate((starts, [values.size])))
+    return values[starts], lengths
+
+def bout_features(movement_data, threshold=SEDENTARY_THRESHOLD, min_bout=MIN_BOUT_MINUTES):
+    """
+    This function takes in movement data and finds the number of sedentary and active bouts
+    and the longest bout of each.
+
+    Parameters
+    ----------
+    movement_data : numpy.ndarray
+        Movement data for one participant, one value per minute.
+    threshold : int, optional
+        Minutes with movement below this are sedentary. The default is SEDENTARY_THRESHOLD.
+    min_bout : int, optional
+        Shortest run counted as a bout. The default is MIN_BOUT_MINUTES.
+
+    Returns
+    -------
+    bouts : dict
+        Dictionary with "sedentary_bouts", "active_bouts", "longest_sedentary_bout", and
+        "longest_active_bout" (minutes, 0 if there are none).
+
+    """
+    run_values, lengths = run_lengths(np.asarray(movement_data) < threshold)
+    bouts = {}
+    for name, sedentary in (("sedentary", True), ("active", False)):
+        state_lengths = lengths[run_values == sedentary]
+        bouts[name + "_bouts"] = int(np.count_nonzero(state_lengths >= min_bout))
+        bouts["longest_" + name + "_bout"] = int(state_lengths.max()) if state_lengths.size else 0
+    return bouts
+
+def extract_features(movement_data, windows=ROLLING_WINDOWS):
+    """
+    This function takes in a participant's movement data and finds their rolling window
+    and activity bout features. Minutes are taken to be consecutive, as in the recordings.
+
+    Parameters
+    ----------
+    movement_data : numpy.ndarray
+        Movement data for one participant, one value per minute.
+    windows : tuple, optional
+        Rolling window lengths in minutes. The default is ROLLING_WINDOWS.
+
+    Returns
+    -------
+    features : dict
+        Dictionary with, for each window length w, "rolling_w_peak" (highest w minute
+        average) and "rolling_w_var" (average variance within w minute windows), both nan
+        if the recording is shorter than w, and the entries of bout_features.
+
+    """
+    features = {}
+    for window in windows:
+        rolling_means, rolling_vars = rolling_mean_var(movement_data, window)
+        features["rolling_" + str(window) + "_peak"] = float(rolling_means.max()) if rolling_means.size else float("nan")
+        features["rolling_" + str(window) + "_var"] = float(rolling_vars.mean()) if rolling_vars.size else float("nan")
+    features.update(bout_features(movement_data))
+    return features
@@ -0,0 +1,240 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Typed Patient Information Table and Group Indexes
+
+"""
+# itertools imported to list every combination of column values, numpy imported to hold each
+# column as an array and to intersect groups of patient ids
+import itertools
+import numpy as np
+from finalproject_reader import open_input, resolve_input
+
+# Columns with at most this many different values get a per value index by default
+# (SEX, ADHD, AGE, MED_Stimulants, ...); score columns such as WURS and ASRS are banded instead
+MAX_INDEX_VALUES = 10
+
+def load_patient_info(filename, columns=None, delimiter=";"):
+    """
+    This function takes in a patient information file name and reads it once into a
+    table of typed columns, keeping only the columns asked for.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the patient info csv file; a .gz, .xz, or .bz2 copy of it is read if
+        the file itself does not exist.
+    columns : list, optional
+        Names of the columns to keep, e.g. ["SEX", "ADHD", "AGE"]. The default is None
+        (every column). The ID column is always kept.
+    delimiter : str, optional
+        The punctuation the columns are split by. The default is ';'.
+
+    Returns
+    -------
+    info : dict
+        Dictionary with the column names as the keys and arrays as the values, one entry
+        per patient with an id. "ID" is an int64 array, numeric columns are float64 arrays
+        with nan for empty cells, and other columns (such as ACC_TIME) are string arrays.
+
+    """
+    # File read once, header split into column names, and rows without a patient id skipped
+    with open_input(resolve_input(filename), "r") as file:
+        header = file.readline().strip().split(delimiter)
+        rows = [line.strip().split(delimiter) for line in file]
+    rows = [row for row in rows if row[0] != ""]
+
+    # Only the columns asked for are converted, ID first
+    names = header if columns is None else ["ID"] + [name for name in columns if name != "ID"]
+    info = {}
+    for name in names:
+        position = header.index(name)
+        cells = [row[position] if position < len(row) else "" for row in rows]
+
+        # Numeric columns converted to floats with empty cells as nan (some rows of the dataset
+        # write decimals with a comma, e.g. ACC_DAYS of 14,3), anything else kept as strings
+        try:
+            info[name] = np.array([cell.replace(",", ".") if cell else "nan" for cell in cells], dtype=np.float64)
+        except ValueError:
+            info[name] = np.array(cells, dtype=str)
+    info["ID"] = info["ID"].astype(np.int64)
+    return info
+
+def index_key(value):
+    """
+    This function takes in a column value and returns it as an int if it is a whole number,
+    so index keys can be written as 0 and 1 instead of 0.0 and 1.0.
+
+    Parameters
+    ----------
+    value : float or str
+        A column value.
+
+    Returns
+    -------
+    key : int, float, or str
+        The value to use as an index key.
+
+    """
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return int(value)
+    return value.item() if isinstance(value, np.generic) else value
+
+def value_index(info, columns=None, max_values=MAX_INDEX_VALUES):
+    """
+    This function takes in a patient information table and finds, for each value of each
+    column, the sorted array of ids of the patients with that value.
+
+    Parameters
+    ----------
+    info : dict
+        Patient information table made by the load_patient_info function.
+    columns : list, optional
+        Names of the columns to index. The default is None (every column, other than ID,
+        with at most max_values different values).
+    max_values : int, optional
+        Largest number of different values a column can have to be indexed when columns is
+        not given. The default is MAX_INDEX_VALUES.
+
+    Returns
+    -------
+    index : dict
+        Dictionary with the column names as the keys and, as the values, dictionaries of
+        each column value to the sorted int64 array of ids with that value. Empty cells
+        are left out.
+
+    """
+    # Source for unique with inverse: https://numpy.org/doc/stable/reference/generated/numpy.unique.html
+    index = {}
+    ids = info["ID"]
+    for name in (columns if columns is not None else info):
+        if name == "ID":
+            continue
+        values = info[name]
+        present = values != "" if values.dtype.kind == "U" else ~np.isnan(values)
+        unique, inverse = np.unique(values[present], return_inverse=True)
+        if columns is None and unique.size > max_values:
+            continue
+
+        # Ids sorted once, then split into one group per value by sorting on the value number
+        present_ids = ids[present]
+        order = np.lexsort((present_ids, inverse))
+        groups = np.split(present_ids[order], np.cumsum(np.bincount(inverse, minlength=unique.size))[:-1])
+        index[name] = {index_key(value): group for value, group in zip(unique, groups)}
+    return index
+
+def band_index(info, column, edges):
+    """
+    This function takes in a patient information table, a numeric column, and band edges,
+    and finds the sorted ids of the patients in each band, so bands of a score (such as
+    ASRS) can be used like any other indexed column.
+
+    Parameters
+    ----------
+    info : dict
+        Patient information table made by the load_patient_info function.
+    column : str
+        Name of a numeric column.
+    edges : list
+        Increasing band edges. Band 0 is below edges[0], band i is from edges[i - 1] up to
+        (not including) edges[i], and band len(edges) is edges[-1] and above.
+
+    Returns
+    -------
+    bands : dict
+        Dictionary of band number to the sorted int64 array of ids in that band. Patients
+        with an empty cell are left out. Add it to an index (index["ASRS_band"] = bands)
+        to stratify by it.
+
+    """
+    # Source for digitize: https://numpy.org/doc/stable/reference/generated/numpy.digitize.html
+    values = info[column]
+    present = ~np.isnan(values)
+    bands = np.digitize(values[present], edges)
+    return value_index({"ID": info["ID"][present], "band": bands}, ["band"])["band"]
+
+def stratum_ids(index, conditions):
+    """
+    This function takes in an index and a set of conditions on indexed columns, and finds
+    the ids of the patients meeting every condition by intersecting index sets.
+
+    Parameters
+    ----------
+    index : dict
+        Index made by the value_index function (bands from band_index can be added to it).
+    conditions : dict
+        Dictionary of column name to the value the column must have, or to a list of
+        values any of which it can have, e.g. {"ADHD": 1, "AGE": [1, 2]}.
+
+    Returns
+    -------
+    ids : numpy.ndarray
+        Sorted int64 array of the ids of the patients meeting every condition.
+
+    """
+    # Source for intersect1d: https://numpy.org/doc/stable/reference/generated/numpy.intersect1d.html
+    ids = None
+    empty = np.empty(0, dtype=np.int64)
+    for name, wanted in conditions.items():
+        values = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+
+        # Ids with any of the wanted values joined, then intersected with the ids found so far
+        matched = empty
+        for value in values:
+            matched = np.union1d(matched, index[name].get(value, empty))
+        ids = matched if ids is None else np.intersect1d(ids, matched, assume_unique=True)
+    return ids if ids is not None else empty
+
+def stratify(index, columns):
+    """
+    This function takes in an index and a list of indexed columns, and splits the patients
+    into every combination of the columns' values.
+
+    Parameters
+    ----------
+    index : dict
+        Index made by the value_index function.
+    columns : list
+        Names of the columns to split by, e.g. ["ADHD", "MED_Stimulants", "AGE"].
+
+    Returns
+    -------
+    strata : dict
+        Dictionary of value tuples (in the order of columns) to the sorted int64 array of
+        ids of the patients with those values. Combinations without patients are left out.
+
+    """
+    strata = {}
+    for values in itertools.product(*(index[name] for name in columns)):
+        ids = stratum_ids(index, dict(zip(columns, values)))
+        if ids.size:
+            strata[values] = ids
+    return strata
+
+def table_rows(patient_table, ids):
+    """
+    This function takes in a patient table and an array of ids, and returns the table
+    entries of those patients without reading any activity files again.
+
+    Parameters
+    ----------
+    patient_table : dict
+        Patient table with the patient id strings as the keys (see make_patient_table in
+        finalproject_combine).
+    ids : numpy.ndarray
+        Patient ids, e.g. from the stratum_ids function.
+
+    Returns
+    -------
+    rows : list
+        Table entries of the patients in the table, in the order of ids.
+
+    """
+    rows = []
+    for patient_id in ids:
+        row = patient_table.get(str(patient_id))
+        if row is not None:
+            rows.append(row)
+    return rows
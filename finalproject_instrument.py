@@ -0,0 +1,290 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Pipeline Stage Timing, Memory, and Ingest Error Counters
+
+"""
+# contextlib, json, time, and tracemalloc imported to time stages, trace memory, and write reports
+import contextlib
+import json
+import time
+import tracemalloc
+
+# Recorder state: whether recording is on, the per stage records, the skipped and failed
+# files, and the memory peaks of the stages that are currently open
+_state = {"enabled": False, "tracing": False, "stages": {}, "files": [], "open_peaks": []}
+
+# Shared do-nothing context returned by stage() while recording is off, so a disabled
+# stage costs one dictionary lookup
+_DISABLED_STAGE = contextlib.nullcontext()
+
+def enable(trace_memory=True):
+    """
+    This function turns recording on (and starts memory tracing if asked), clearing
+    anything recorded before.
+
+    Parameters
+    ----------
+    trace_memory : bool, optional
+        Whether to record the peak allocated memory of each stage with tracemalloc, which
+        slows down code that makes many small python objects. The default is True.
+
+    Returns
+    -------
+    None.
+
+    """
+    reset()
+    _state["enabled"] = True
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _state["tracing"] = True
+
+def disable():
+    """
+    This function turns recording off (and stops memory tracing if enable started it).
+    What was recorded is kept until the next enable() or reset().
+
+    Returns
+    -------
+    None.
+
+    """
+    _state["enabled"] = False
+    if _state["tracing"]:
+        tracemalloc.stop()
+        _state["tracing"] = False
+
+def enabled():
+    """
+    This function checks whether recording is on.
+
+    Returns
+    -------
+    enabled : bool
+        True if recording is on.
+
+    """
+    return _state["enabled"]
+
+def reset():
+    """
+    This function clears every recorded stage and file.
+
+    Returns
+    -------
+    None.
+
+    """
+    _state["stages"] = {}
+    _state["files"] = []
+    _state["open_peaks"] = []
+
+def stage_record(name):
+    """
+    This function takes in a stage name and returns its record, making an empty one
+    the first time.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage.
+
+    Returns
+    -------
+    record : dict
+        Record with the "calls", "seconds", "rows", "bytes", and "peak_bytes" of the stage.
+
+    """
+    record = _state["stages"].get(name)
+    if record is None:
+        record = {"calls": 0, "seconds": 0.0, "rows": 0, "bytes": 0, "peak_bytes": None}
+        _state["stages"][name] = record
+    return record
+
+@contextlib.contextmanager
+def _timed_stage(name):
+    # Memory traced since the stage started is measured by resetting the tracemalloc peak;
+    # enclosing stages keep their own running peak since the reset clears theirs
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        start_memory, outer_peak = tracemalloc.get_traced_memory()
+        for index, peak in enumerate(_state["open_peaks"]):
+            _state["open_peaks"][index] = max(peak, outer_peak)
+        tracemalloc.reset_peak()
+        _state["open_peaks"].append(start_memory)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        record = stage_record(name)
+        record["calls"] += 1
+        record["seconds"] += seconds
+        if tracing and tracemalloc.is_tracing():
+            peak = max(_state["open_peaks"].pop(), tracemalloc.get_traced_memory()[1])
+            record["peak_bytes"] = max(record["peak_bytes"] or 0, peak - start_memory)
+            for index, open_peak in enumerate(_state["open_peaks"]):
+                _state["open_peaks"][index] = max(open_peak, peak)
+
+def stage(name):
+    """
+    This function takes in a stage name and returns a context manager that records the
+    wall time (and peak allocated memory) of the code run inside it. Stages with the same
+    name add up, and stages can be inside each other.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage, e.g. "read" or "figure:scatter".
+
+    Returns
+    -------
+    context : context manager
+        Use as "with stage(name):".
+
+    """
+    if not _state["enabled"]:
+        return _DISABLED_STAGE
+    return _timed_stage(name)
+
+def count(name, rows=0, n_bytes=0):
+    """
+    This function takes in a stage name and adds to the number of rows parsed and bytes
+    read in that stage.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage.
+    rows : int, optional
+        Number of rows to add. The default is 0.
+    n_bytes : int, optional
+        Number of bytes to add. The default is 0.
+
+    Returns
+    -------
+    None.
+
+    """
+    if _state["enabled"]:
+        record = stage_record(name)
+        record["rows"] += rows
+        record["bytes"] += n_bytes
+
+def file_problem(filename, status, reason):
+    """
+    This function takes in a file name, whether it was skipped or failed, and why, and
+    records it.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the file.
+    status : str
+        "skipped" for files that are expected to be missing or empty, "failed" for files
+        that could not be read or parsed.
+    reason : str
+        Why the file was skipped or failed.
+
+    Returns
+    -------
+    None.
+
+    """
+    if _state["enabled"]:
+        _state["files"].append({"file": filename, "status": status, "reason": reason})
+
+def report():
+    """
+    This function puts everything recorded into a structured report.
+
+    Returns
+    -------
+    report : dict
+        Dictionary with the per stage records under "stages", the skipped and failed files
+        under "files", and counts of skipped and failed files by reason under "skipped" and
+        "failed".
+
+    """
+    totals = {"skipped": {}, "failed": {}}
+    for problem in _state["files"]:
+        reasons = totals[problem["status"]]
+        reasons[problem["reason"]] = reasons.get(problem["reason"], 0) + 1
+    return {"stages": {name: dict(record) for name, record in _state["stages"].items()},
+            "files": list(_state["files"]),
+            "skipped": totals["skipped"],
+            "failed": totals["failed"]}
+
+def merge(other):
+    """
+    This function takes in a report made in another process (see the collect function)
+    and adds it to what this process has recorded.
+
+    Parameters
+    ----------
+    other : dict
+        Report made by the report function.
+
+    Returns
+    -------
+    None.
+
+    """
+    if not _state["enabled"] or other is None:
+        return
+    for name, other_record in other["stages"].items():
+        record = stage_record(name)
+        for key in ("calls", "seconds", "rows", "bytes"):
+            record[key] += other_record[key]
+        if other_record["peak_bytes"] is not None:
+            record["peak_bytes"] = max(record["peak_bytes"] or 0, other_record["peak_bytes"])
+    _state["files"].extend(other["files"])
+
+def collect(function, *args, trace_memory=True):
+    """
+    This function takes in a function and its arguments, and runs it with recording on
+    and starting empty, returning what was recorded with the result. Process pool workers
+    run work through it so the parent process can merge their reports.
+
+    Parameters
+    ----------
+    function : function
+        Function to run.
+    *args
+        Arguments for the function.
+    trace_memory : bool, optional
+        Whether to trace memory in the worker. The default is True.
+
+    Returns
+    -------
+    result : object
+        What the function returned.
+    report : dict
+        Report of what was recorded while it ran.
+
+    """
+    if not _state["enabled"]:
+        enable(trace_memory)
+    reset()
+    result = function(*args)
+    return result, report()
+
+def write_report(filename):
+    """
+    This function takes in a file name and writes the report to it as JSON.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the JSON file to write.
+
+    Returns
+    -------
+    None.
+
+    """
+    with open(filename, "w") as file:
+        json.dump(report(), file, indent=2)
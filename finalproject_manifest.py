@@ -0,0 +1,184 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Run Manifest for Incremental Recomputing
+
+"""
+# hashlib, json, and os imported to fingerprint inputs and outputs and store the manifest
+import hashlib
+import json
+import os
+from finalproject_cache import file_fingerprint, fingerprint_matches, write_json
+
+# Manifest file name, and a version number that is raised whenever the way statistics are
+# calculated changes so manifests from older code are not trusted
+MANIFEST_FILE = ".combine_manifest.json"
+MANIFEST_VERSION = 1
+
+def new_manifest():
+    """
+    This function creates an empty run manifest.
+
+    Returns
+    -------
+    manifest : dict
+        Manifest with a "version", a "patients" dictionary of per patient entries keyed by
+        patient id, and an "outputs" dictionary of per output file entries keyed by file name.
+
+    """
+    return {"version": MANIFEST_VERSION, "patients": {}, "outputs": {}}
+
+def load_manifest(filename=MANIFEST_FILE):
+    """
+    This function takes in a manifest file name and loads the manifest, starting a new
+    one if the file does not exist, cannot be read, or was written by older code.
+
+    Parameters
+    ----------
+    filename : str, optional
+        Name of the manifest file. The default is MANIFEST_FILE.
+
+    Returns
+    -------
+    manifest : dict
+        The loaded manifest, see the new_manifest function.
+
+    """
+    try:
+        with open(filename) as file:
+            manifest = json.load(file)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return new_manifest()
+
+def save_manifest(manifest, filename=MANIFEST_FILE):
+    """
+    This function takes in a manifest and writes it to the manifest file.
+
+    Parameters
+    ----------
+    manifest : dict
+        The manifest to save.
+    filename : str, optional
+        Name of the manifest file. The default is MANIFEST_FILE.
+
+    Returns
+    -------
+    None.
+
+    """
+    write_json(filename, manifest)
+
+def input_fingerprint(filename):
+    """
+    This function takes in an input file name and fingerprints it, giving None for
+    files that do not exist so missing files can be recorded too.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the input file.
+
+    Returns
+    -------
+    fingerprint : dict or None
+        Fingerprint made by the file_fingerprint function, None if the file does not exist.
+
+    """
+    try:
+        return file_fingerprint(filename)
+    except OSError:
+        return None
+
+def input_unchanged(filename, fingerprint):
+    """
+    This function takes in an input file name and the fingerprint recorded for it, and
+    checks whether the file is the same as when it was recorded (including still missing).
+
+    Parameters
+    ----------
+    filename : str
+        Name of the input file.
+    fingerprint : dict or None
+        Fingerprint recorded by the input_fingerprint function.
+
+    Returns
+    -------
+    unchanged : bool
+        True if the recorded results for the file can be reused.
+
+    """
+    if fingerprint is None:
+        return not os.path.exists(filename)
+    try:
+        return fingerprint_matches(filename, fingerprint)
+    except OSError:
+        return False
+
+def data_digest(data):
+    """
+    This function takes in the data an output file is made from and hashes it, so an
+    output can be skipped when its data has not changed.
+
+    Parameters
+    ----------
+    data : list
+        List of rows written to an output file.
+
+    Returns
+    -------
+    digest : str
+        Hexadecimal SHA-256 hash of the rows.
+
+    """
+    # repr of floats round trips exactly, so equal digests mean equal files
+    return hashlib.sha256(repr(data).encode()).hexdigest()
+
+def output_unchanged(manifest, filename, data):
+    """
+    This function takes in a manifest, an output file name, and the data the file would
+    be made from, and checks whether the file already holds exactly that data.
+
+    Parameters
+    ----------
+    manifest : dict
+        The run manifest.
+    filename : str
+        Name of the output file.
+    data : list
+        List of rows that would be written to the file.
+
+    Returns
+    -------
+    unchanged : bool
+        True if the file does not need to be written again.
+
+    """
+    entry = manifest["outputs"].get(filename)
+    return (entry is not None and entry["data"] == data_digest(data)
+            and input_unchanged(filename, entry["fingerprint"]))
+
+def record_output(manifest, filename, data):
+    """
+    This function takes in a manifest, the name of an output file that was just written,
+    and the data it was made from, and records them in the manifest.
+
+    Parameters
+    ----------
+    manifest : dict
+        The run manifest.
+    filename : str
+        Name of the output file.
+    data : list
+        List of rows written to the file.
+
+    Returns
+    -------
+    None.
+
+    """
+    manifest["outputs"][filename] = {"data": data_digest(data), "fingerprint": file_fingerprint(filename)}
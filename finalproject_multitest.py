@@ -0,0 +1,155 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Batched Welch t Tests with False Discovery Rate Correction
+
+"""
+# numpy imported to test every feature in every stratum with a few matrix products; scipy is
+# imported inside welch_t_tests (for the t distribution) so importing this file is fast
+import numpy as np
+from finalproject_summary import read_summary
+
+def welch_t_tests(features, labels, strata=None):
+    """
+    This function takes in a feature matrix and a two group label for each patient (and
+    optionally a stratum for each patient) and runs a two sided Welch t test of every
+    feature in every stratum at once. Nothing is printed or rounded.
+
+    Parameters
+    ----------
+    features : numpy.ndarray
+        Array of shape (patients, features); nan marks a missing value, which leaves that
+        patient out of that feature's tests.
+    labels : numpy.ndarray
+        Group of each patient, 0 for the first group (e.g. control) and 1 for the second
+        (e.g. ADHD); patients with any other label are left out.
+    strata : numpy.ndarray, optional
+        Stratum of each patient (any hashable values, e.g. sex). The default is None (one
+        stratum of every patient).
+
+    Returns
+    -------
+    results : dict
+        Dictionary of arrays of shape (strata, features): "t" (first group minus second),
+        "df" (Welch-Satterthwaite degrees of freedom), "p", "q" (Benjamini-Hochberg adjusted
+        over every feature and stratum), "n_first", "n_second", "mean_first", and
+        "mean_second", plus "strata", the stratum value of each row. Tests with fewer than
+        two patients in a group get nan.
+
+    """
+    # Source for Welch's t test: https://en.wikipedia.org/wiki/Welch%27s_t-test
+    features = np.asarray(features, dtype=np.float64)
+    if features.ndim == 1:
+        features = features[:, None]
+    labels = np.asarray(labels)
+    if strata is None:
+        strata = np.zeros(features.shape[0], dtype=np.int64)
+    stratum_values, stratum_numbers = np.unique(np.asarray(strata), return_inverse=True)
+
+    # One row per (stratum, group) that is 1 for the patients in it; counts, sums, and sums of
+    # squares of every feature in every row then found with three matrix products (features are
+    # shifted by their own average first so the sums of squares stay accurate)
+    valid = ~np.isnan(features)
+    present = valid.sum(axis=0)
+    offsets = np.where(valid, features, 0.0).sum(axis=0) / np.maximum(present, 1)
+    shifted = np.where(valid, features - offsets, 0.0)
+    membership = np.zeros((stratum_values.size * 2, features.shape[0]))
+    for group in (0, 1):
+        in_group = labels == group
+        membership[stratum_numbers[in_group] * 2 + group, np.flatnonzero(in_group)] = 1.0
+    counts = (membership @ valid).reshape(stratum_values.size, 2, features.shape[1])
+    sums = (membership @ shifted).reshape(stratum_values.size, 2, features.shape[1])
+    squares = (membership @ (shifted * shifted)).reshape(stratum_values.size, 2, features.shape[1])
+
+    # Means, sample variances, t scores, and degrees of freedom of every test
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+        variances = np.maximum(squares - sums * means, 0.0) / (counts - 1)
+        errors = variances / counts
+        t_scores = (means[:, 0] - means[:, 1]) / np.sqrt(errors[:, 0] + errors[:, 1])
+        dfs = (errors[:, 0] + errors[:, 1]) ** 2 / (errors[:, 0] ** 2 / (counts[:, 0] - 1) + errors[:, 1] ** 2 / (counts[:, 1] - 1))
+    untestable = (counts[:, 0] < 2) | (counts[:, 1] < 2)
+    t_scores[untestable] = np.nan
+    dfs[untestable] = np.nan
+
+    # Two tailed p values from the t distribution's survival function for every test at once
+    # Source: https://docs.scipy.org/doc/scipy/reference/generated/scipy.stats.t.html
+    from scipy.stats import t
+    p_values = 2 * t.sf(np.abs(t_scores), dfs)
+    return {"t": t_scores,
+            "df": dfs,
+            "p": p_values,
+            "q": benjamini_hochberg(p_values),
+            "n_first": counts[:, 0].astype(np.int64),
+            "n_second": counts[:, 1].astype(np.int64),
+            "mean_first": means[:, 0] + offsets,
+            "mean_second": means[:, 1] + offsets,
+            "strata": stratum_values}
+
+def benjamini_hochberg(p_values):
+    """
+    This function takes in an array of p values and finds the Benjamini-Hochberg adjusted
+    q values (false discovery rate) over all of them at once.
+
+    Parameters
+    ----------
+    p_values : numpy.ndarray
+        Array of p values of any shape; nan values are left out and stay nan.
+
+    Returns
+    -------
+    q_values : numpy.ndarray
+        Array of q values of the same shape.
+
+    """
+    # Source for the Benjamini-Hochberg procedure: https://en.wikipedia.org/wiki/False_discovery_rate#Benjamini%E2%80%93Hochberg_procedure
+    p_values = np.asarray(p_values, dtype=np.float64)
+    flat = p_values.ravel()
+    tested = np.flatnonzero(~np.isnan(flat))
+    q_values = np.full(flat.shape, np.nan)
+    if tested.size:
+
+        # p values sorted, scaled by tests / rank, and made non decreasing from the largest down
+        order = tested[np.argsort(flat[tested], kind="stable")]
+        scaled = flat[order] * tested.size / np.arange(1, tested.size + 1)
+        q_values[order] = np.minimum(np.minimum.accumulate(scaled[::-1])[::-1], 1.0)
+    return q_values.reshape(p_values.shape)
+
+def group_feature_matrix(first_filename, second_filename, columns=None):
+    """
+    This function takes in two group files with named numeric columns (combined, windowed,
+    feature, or spectral csvs) and stacks them into one feature matrix with group labels.
+
+    Parameters
+    ----------
+    first_filename : str
+        Name of the first group's file (label 0), e.g. a control group csv.
+    second_filename : str
+        Name of the second group's file (label 1), e.g. an ADHD group csv.
+    columns : list, optional
+        Names of the columns to use. The default is None (every column both files have
+        other than patient_id).
+
+    Returns
+    -------
+    features : numpy.ndarray
+        Array of shape (patients, features).
+    labels : numpy.ndarray
+        Group of each patient, 0 for the first file and 1 for the second.
+    columns : list
+        Name of each feature.
+    patient_ids : numpy.ndarray
+        Patient id of each row.
+
+    """
+    # Both files loaded into arrays using read_summary function
+    first = read_summary(first_filename)
+    second = read_summary(second_filename)
+    if columns is None:
+        columns = [name for name in first if name != "patient_id" and name in second]
+    features = np.vstack([np.column_stack([group[name] for name in columns]) if columns else
+                          np.empty((group["patient_id"].size, 0)) for group in (first, second)])
+    labels = np.repeat([0, 1], [first["patient_id"].size, second["patient_id"].size])
+    return features, labels, columns, np.concatenate((first["patient_id"], second["patient_id"]))
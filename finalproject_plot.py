@@ -6,90 +6,84 @@ DS2001 Programming with Data Practicum
 Final Project Code; Graphing Program
 
 """
-# Import needed libraries for file opening, statistics, and graphing
-import csv
-import matplotlib.pyplot as plt
+# Import needed libraries for statistics; matplotlib, scipy, and argparse are imported inside the 
+# graphing, t distribution, and command line functions that use them, so importing this file is fast;
+# json and os imported for the headless render cache
+import json
+import os
 import numpy as np
-from scipy.stats import t
+import finalproject_instrument as instrument
+from finalproject_cache import write_json
+from finalproject_manifest import data_digest
+from finalproject_pyramid import LEVELS, choose_level, level_window, load_pyramid
+from finalproject_summary import read_summary
+from finalproject_resample import permutation_test, bootstrap_mean_ci, bootstrap_difference_ci, ci_error_bar
 
-def get_avgs(filename):
+# Sidecar file recording what each headless figure was rendered from, so unchanged figures are skipped
+RENDER_CACHE_FILE = ".render_cache.json"
+
+# Font size of the bar graphs (source: https://www.geeksforgeeks.org/change-font-size-in-matplotlib/)
+BAR_FONT_SIZE = 14
+
+# Size in inches of the movement trace figure
+TRACE_SIZE = (12, 6)
+
+# File names (without the format extension) of the scatterplot and of the bar graphs after their p value
+SCATTER_NAME = "adhd_vs_control_movement_scatter_across_genders"
+BAR_NAME = "adhd_vs_control"
+
+def get_avgs(summary):
     """
-    This function reads a CSV file containing statistics info, extracts the averages from
-    the file, and appends them to a list. 
+    This function takes in a combined patient activity summary and extracts the averages
+    from it as an array.
 
     Parameters
     ----------
-    filename : str
-        CSV file that is read.
+    summary : dict or str
+        Summary loaded by the read_summary function, or the name of a summary CSV file 
+        to load.
 
     Returns
     -------
-    avgs_ls : list
-        List of averages from the CSV file. 
+    avgs_ls : numpy.ndarray
+        Array of averages from the CSV file. 
 
     """
-    # Empty lists created
-    avgs_ls = []
+    # Summary file loaded once into numpy arrays using read_summary function if a file name was given
+    if isinstance(summary, str):
+        summary = read_summary(summary)
     
-    # Technique to read csv source: https://docs.python.org/3/library/csv.html
-    # Source for list function: https://www.w3schools.com/python/ref_func_list.asp
-    
-    # CSV file opened, read with csvreader, set to variable, converted to a list of 
-    # rows using list function
-    with open(filename) as file:
-        csvreader = csv.reader(file, delimiter=',')
-        rows = list(csvreader)
-    
-    # Source for eval() function: https://www.programiz.com/python-programming/methods/built-in/eval
-    
-    # Data in rows set to variable, list of tuples evaluated as python expression
-    # using eval() function, first and second elements of tuple (average movement and standard deviation) 
-    # converted to float and appended to respective lists
-    for data in rows:
-        movement_data = eval(data[0])
-        avg = float(movement_data[0])
-        avgs_ls.append(avg)
+    # Average movement column taken straight from the summary
+    avgs_ls = summary["average"]
     return avgs_ls
 
-def std_errors_scatter(filename):
+def std_errors_scatter(summary):
     """
-    This function reads a CSV file containing statistics info, extracts the standard 
-    deviations from the file, calculates the standard errors using the standard deviations,
-    and appends them to a list.
+    This function takes in a combined patient activity summary, and calculates the standard 
+    errors of each patient's (average, standard deviation) pair as an array.
 
     Parameters
     ----------
-    filename : str
-        CSV file that is read.
+    summary : dict or str
+        Summary loaded by the read_summary function, or the name of a summary CSV file 
+        to load.
 
     Returns
     -------
-    std_error_ls : list
-        List of standard errors from the CSV file. 
+    std_error_ls : numpy.ndarray
+        Array of standard errors from the CSV file. 
 
     """
-    # Empty list created
-    std_error_ls = []
-    
-    # Technique to read csv source: https://docs.python.org/3/library/csv.html
-    # Source for list function: https://www.w3schools.com/python/ref_func_list.asp
     # Technique for finding standard errors source: https://www.statology.org/standard-error-of-mean-python/
     
-    # CSV file opened, read with csvreader, set to variable, converted to a list of 
-    # rows using list function
-    with open(filename) as file:
-        csvreader = csv.reader(file, delimiter=',')
-        rows = list(csvreader)
-    
-    # Source for eval() function: https://www.programiz.com/python-programming/methods/built-in/eval
-    
-    # Data in rows set to variable, list of tuples evaluated as python expression
-    # using eval() function, first and second elements of tuple (average movement and standard deviation) 
-    # converted to float and appended to respective lists
-    for data in rows:
-        movement_data = eval(data[0])
-        std_error = np.std(movement_data, ddof = 1) / np.sqrt(np.size(movement_data))
-        std_error_ls.append(std_error)
+    # Summary file loaded once into numpy arrays using read_summary function if a file name was given
+    if isinstance(summary, str):
+        summary = read_summary(summary)
+    
+    # Average movement and standard deviation of each patient paired up as the rows of an array, 
+    # and the standard error of every row found at once
+    movement_data = np.column_stack((summary["average"], summary["std_dev"]))
+    std_error_ls = np.std(movement_data, axis=1, ddof=1) / np.sqrt(movement_data.shape[1])
     return std_error_ls
 
 def std_errors_bar(avgs_list):
@@ -207,6 +201,7 @@ def p_value(control_avgs_ls, adhd_avgs_ls, correction, alpha = 0.2):
     df = n1 + n2 - 2  # For a two-sample t-test
         
     # two tailed p value found using scipy stats module function and numpy absolute value function (for negative t values)
+    from scipy.stats import t
     p_value = 2 * (1 - t.cdf(np.abs(t_score), df))
     
     # printed if null hypothesis is rejected or not using alpha and p value
@@ -256,36 +251,57 @@ def scatter(adhd_f_avgs, adhd_m_avgs, c_f_avgs, c_m_avgs, c_f_avg, c_m_avg, adhd
     # Source for adding error bars: https://www.geeksforgeeks.org/use-error-bars-in-a-matplotlib-scatter-plot/
     # Source for adding horizontal lines at averages of averages:  https://www.geeksforgeeks.org/plot-a-horizontal-line-in-matplotlib/
     
-    # Figure  size and pixelation set; number of participants found for x values using range() and len() functions,
-    # starting at 1 because python indexes start at 0
+    # Figure  size and pixelation set, scatterplot drawn on it using draw_scatter function, figure saved and shown
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(7, 7), dpi=800)
+    draw_scatter(plt.gca(), adhd_f_avgs, adhd_m_avgs, c_f_avgs, c_m_avgs, c_f_avg, c_m_avg, adhd_f_avg, adhd_m_avg,
+                 adhd_f_std_errors, adhd_m_std_errors, c_f_std_errors, c_m_std_errors)
+    plt.savefig(SCATTER_NAME + ".jpg")
+    plt.show()
+
+def draw_scatter(ax, adhd_f_avgs, adhd_m_avgs, c_f_avgs, c_m_avgs, c_f_avg, c_m_avg, adhd_f_avg, adhd_m_avg, adhd_f_std_errors, adhd_m_std_errors, c_f_std_errors, c_m_std_errors):
+    """
+    This function draws the scatterplot of movement averages for each participant on a set
+    of matplotlib axes. The arguments after ax are the same as the scatter function's.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        Axes to draw on.
+
+    Returns
+    -------
+    None.
+
+    """
+    # Source for the object oriented interface: https://matplotlib.org/stable/users/explain/figure/api_interfaces.html
+    # Number of participants found for x values using range() and len() functions,
+    # starting at 1 because python indexes start at 0
     adhd_f_part = range(1, len(adhd_f_avgs) + 1)
     adhd_m_part = range(1, len(adhd_m_avgs) + 1)
     control_f_part = range(1, len(c_f_avgs) + 1)
     control_m_part = range(1, len(c_m_avgs) + 1)
     
     # Data scatterplotted for each group, averages for each group's total data plotted as horizontal line, standard error bars added
-    plt.scatter(adhd_f_part, adhd_f_avgs, color='pink', label="ADHD Females")
-    plt.axhline(y=adhd_f_avg, color='pink', linestyle='-')
-    plt.errorbar(adhd_f_part, adhd_f_avgs, yerr=adhd_f_std_errors, fmt="o", color='pink')
-    plt.scatter(adhd_m_part, adhd_m_avgs, color='green', label="ADHD Males")
-    plt.axhline(y=adhd_m_avg, color='green', linestyle='-')
-    plt.errorbar(adhd_m_part, adhd_m_avgs, yerr=adhd_m_std_errors, fmt="o", color='green')
-    plt.scatter(control_f_part, c_f_avgs, color='purple', label="Control Females")
-    plt.axhline(y=c_f_avg, color='purple', linestyle='-')
-    plt.errorbar(control_f_part, c_f_avgs, yerr=c_f_std_errors, fmt="o", color='purple')
-    plt.scatter(control_m_part, c_m_avgs, color='blue', label="Control Males")
-    plt.axhline(y=c_m_avg, color='blue', linestyle='-')
-    plt.errorbar(control_m_part, c_m_avgs, yerr=c_m_std_errors, fmt="o", color='blue')
-    
-    # Title, axes labels, y range, & legend added; figured saved and shown
-    plt.title("Average Movement of Each Participant Based on Gender and ADHD Status")
-    plt.xlabel("Participants")
-    plt.ylabel("Movement")
-    plt.ylim(0, 600)
-    plt.legend()
-    plt.savefig("adhd_vs_control_movement_scatter_across_genders.jpg")
-    plt.show()
+    ax.scatter(adhd_f_part, adhd_f_avgs, color='pink', label="ADHD Females")
+    ax.axhline(y=adhd_f_avg, color='pink', linestyle='-')
+    ax.errorbar(adhd_f_part, adhd_f_avgs, yerr=adhd_f_std_errors, fmt="o", color='pink')
+    ax.scatter(adhd_m_part, adhd_m_avgs, color='green', label="ADHD Males")
+    ax.axhline(y=adhd_m_avg, color='green', linestyle='-')
+    ax.errorbar(adhd_m_part, adhd_m_avgs, yerr=adhd_m_std_errors, fmt="o", color='green')
+    ax.scatter(control_f_part, c_f_avgs, color='purple', label="Control Females")
+    ax.axhline(y=c_f_avg, color='purple', linestyle='-')
+    ax.errorbar(control_f_part, c_f_avgs, yerr=c_f_std_errors, fmt="o", color='purple')
+    ax.scatter(control_m_part, c_m_avgs, color='blue', label="Control Males")
+    ax.axhline(y=c_m_avg, color='blue', linestyle='-')
+    ax.errorbar(control_m_part, c_m_avgs, yerr=c_m_std_errors, fmt="o", color='blue')
+    
+    # Title, axes labels, y range, & legend added
+    ax.set_title("Average Movement of Each Participant Based on Gender and ADHD Status")
+    ax.set_xlabel("Participants")
+    ax.set_ylabel("Movement")
+    ax.set_ylim(0, 600)
+    ax.legend()
 
 def bar_graphs(c_f_avg, c_m_avg, adhd_f_avg, adhd_m_avg, adhd_f_std_error, adhd_m_std_error, c_f_std_error, c_m_std_error, female_p, male_p, alpha):
     """
@@ -301,14 +317,18 @@ def bar_graphs(c_f_avg, c_m_avg, adhd_f_avg, adhd_m_avg, adhd_f_std_error, adhd_
         Average movement of ADHD females.
     adhd_m_avg : float
         Average movement of ADHD males.
-    adhd_f_std_error : float
-        Standard error for ADHD females.
-    adhd_m_std_error : float
-        Standard error for ADHD males.
-    c_f_std_error : float
-        Standard error for control females.
-    c_m_std_error : float
-        Standard error for control males.
+    adhd_f_std_error : float or numpy.ndarray
+        Standard error for ADHD females, or a (2, 1) array of lower and upper error bar lengths
+        (see ci_error_bar in finalproject_resample).
+    adhd_m_std_error : float or numpy.ndarray
+        Standard error for ADHD males, or a (2, 1) array of lower and upper error bar lengths
+        (see ci_error_bar in finalproject_resample).
+    c_f_std_error : float or numpy.ndarray
+        Standard error for control females, or a (2, 1) array of lower and upper error bar lengths
+        (see ci_error_bar in finalproject_resample).
+    c_m_std_error : float or numpy.ndarray
+        Standard error for control males, or a (2, 1) array of lower and upper error bar lengths
+        (see ci_error_bar in finalproject_resample).
     female_p : float
         The calculated p-value for the significance test for females.
     male_p : float
@@ -321,36 +341,11 @@ def bar_graphs(c_f_avg, c_m_avg, adhd_f_avg, adhd_m_avg, adhd_f_std_error, adhd_
     None.
 
     """
-    # Techninque for adding significance text source: https://bbquercus.medium.com/adding-statistical-significance-asterisks-to-seaborn-plots-9c8317383235
-    # used option 2 in source
     # Source for adding error bars: https://www.geeksforgeeks.org/use-error-bars-in-a-matplotlib-scatter-plot/
     
     # font size updated (source: https://www.geeksforgeeks.org/change-font-size-in-matplotlib/)
-    plt.rcParams.update({'font.size': 14}) 
-
-    def add_significance_text(p_value, x, y):
-        """
-        The function takes in a x-y coordinate location and a p value and outputs significance text.
-
-        Parameters
-        ----------
-        p_value : The calculated p-value for the significance test 
-            
-        x : int
-            The x position for the significance text
-        y : int
-            The x position for the significance text
-
-        Returns
-        -------
-        str
-            Significance text based on p value
-
-        """
-        if p_value <= alpha:
-            return "*"
-        else:
-            return " (n.s.)"
+    import matplotlib.pyplot as plt
+    plt.rcParams.update({'font.size': BAR_FONT_SIZE}) 
 
     def plot_bar_graph(title, x_label, y_label, ylim, control_avg, adhd_avg, control_std_error, adhd_std_error, control_color, adhd_color, p_value):
         """
@@ -370,10 +365,10 @@ def bar_graphs(c_f_avg, c_m_avg, adhd_f_avg, adhd_m_avg, adhd_f_std_error, adhd_
             Average movement of control group
         adhd_avg : float
             Average movement of ADHD group
-        control_std_error : float
-            Standard error of control group
-        adhd_std_error : float
-            Standard error of ADHD group
+        control_std_error : float or numpy.ndarray
+            Standard error (or lower and upper error bar lengths) of control group
+        adhd_std_error : float or numpy.ndarray
+            Standard error (or lower and upper error bar lengths) of ADHD group
         control_color : str
             Color of control group
         adhd_color : str
@@ -386,57 +381,472 @@ def bar_graphs(c_f_avg, c_m_avg, adhd_f_avg, adhd_m_avg, adhd_f_std_error, adhd_
         None.
 
         """
-        # Figure size, pixelation, title, axes titles, and y limit set
+        # Figure size and pixelation set, bar graph drawn on it using draw_bar_graph function,
+        # figure saved and shown
         plt.figure(figsize=(9, 9),dpi=800)
-        plt.title(title)
-        plt.xlabel(x_label)
-        plt.ylabel(y_label)
-        plt.ylim(0, 400)
-        
-        # Bar labels created using significance text function
-        control_label = "Control" + add_significance_text(p_value, 0, ylim - 20)
-        adhd_label = "ADHD" + add_significance_text(p_value, 0, ylim - 20)
-
-        # Bars and standard error bars plotted and labeled
-        plt.bar(control_label, control_avg, width=0.6, color=control_color, label="Control")
-        plt.errorbar(control_label, control_avg, yerr=control_std_error, fmt="o", color='black')
-        plt.bar(adhd_label, adhd_avg, width=0.6, color=adhd_color, label="ADHD")
-        plt.errorbar(adhd_label, adhd_avg, yerr=adhd_std_error, fmt="o", color='black')
-        
-        # legend added, figure saved and shown
-        plt.legend(loc="upper left")
-        plt.savefig(str(p_value) + "adhd_vs_control.jpg")
+        draw_bar_graph(plt.gca(), title, x_label, y_label, control_avg, adhd_avg, control_std_error, adhd_std_error,
+                       control_color, adhd_color, p_value, alpha)
+        plt.savefig(str(p_value) + BAR_NAME + ".jpg")
         plt.show()
 
-    # Bar graphs plotted for both groups using plot_bar_graph function
-    plot_bar_graph("Average Movement of All Female Participants Based on ADHD Status",
-                   "Group", "Average Movement", 300,
-                   c_f_avg, adhd_f_avg, c_f_std_error, adhd_f_std_error, 'purple', 'pink', female_p)
-    plot_bar_graph("Average Movement of All Male Participants Based on ADHD Status",
-                   "Group", "Average Movement", 300,
-                   c_m_avg, adhd_m_avg, c_m_std_error, adhd_m_std_error, 'blue', 'green', male_p)
+    # Bar graphs plotted for both groups using plot_bar_graph function, each recorded as its own stage
+    with instrument.stage("figure:female_bar"):
+        plot_bar_graph("Average Movement of All Female Participants Based on ADHD Status",
+                       "Group", "Average Movement", 300,
+                       c_f_avg, adhd_f_avg, c_f_std_error, adhd_f_std_error, 'purple', 'pink', female_p)
+    with instrument.stage("figure:male_bar"):
+        plot_bar_graph("Average Movement of All Male Participants Based on ADHD Status",
+                       "Group", "Average Movement", 300,
+                       c_m_avg, adhd_m_avg, c_m_std_error, adhd_m_std_error, 'blue', 'green', male_p)
+
+def add_significance_text(p_value, alpha):
+    """
+    The function takes in a p value and an alpha value and outputs significance text.
+
+    Parameters
+    ----------
+    p_value : float
+        The calculated p-value for the significance test 
+    alpha : float
+        Alpha value for significance.
+
+    Returns
+    -------
+    str
+        Significance text based on p value
+
+    """
+    # Techninque for adding significance text source: https://bbquercus.medium.com/adding-statistical-significance-asterisks-to-seaborn-plots-9c8317383235
+    # used option 2 in source
+    if p_value <= alpha:
+        return "*"
+    else:
+        return " (n.s.)"
+
+def draw_bar_graph(ax, title, x_label, y_label, control_avg, adhd_avg, control_std_error, adhd_std_error, control_color, adhd_color, p_value, alpha):
+    """
+    This function draws a bar graph of the average movement of a control and an ADHD group
+    on a set of matplotlib axes.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        Axes to draw on.
+    title : str
+        Title of bar graph
+    x_label : str
+        x axis label
+    y_label : str
+        y axis label
+    control_avg : float
+        Average movement of control group
+    adhd_avg : float
+        Average movement of ADHD group
+    control_std_error : float or numpy.ndarray
+        Standard error (or lower and upper error bar lengths) of control group
+    adhd_std_error : float or numpy.ndarray
+        Standard error (or lower and upper error bar lengths) of ADHD group
+    control_color : str
+        Color of control group
+    adhd_color : str
+        Color of ADHD group
+    p_value : float
+        Calculated p value for groups
+    alpha : float
+        Alpha value for significance.
 
+    Returns
+    -------
+    None.
 
-def main():
-    # Files read for participants with adhd using read_csv function, averages set to variable, 
-    # and average of those averages found using avg function
-    adhd_f_avgs = get_avgs("patient_activity_combined_f.csv")
-    adhd_m_avgs = get_avgs("patient_activity_combined_m.csv")
+    """
+    # Title, axes titles, and y limit set
+    ax.set_title(title)
+    ax.set_xlabel(x_label)
+    ax.set_ylabel(y_label)
+    ax.set_ylim(0, 400)
+    
+    # Bar labels created using significance text function
+    control_label = "Control" + add_significance_text(p_value, alpha)
+    adhd_label = "ADHD" + add_significance_text(p_value, alpha)
+
+    # Bars and standard error bars plotted and labeled, legend added
+    ax.bar(control_label, control_avg, width=0.6, color=control_color, label="Control")
+    ax.errorbar(control_label, control_avg, yerr=control_std_error, fmt="o", color='black')
+    ax.bar(adhd_label, adhd_avg, width=0.6, color=adhd_color, label="ADHD")
+    ax.errorbar(adhd_label, adhd_avg, yerr=adhd_std_error, fmt="o", color='black')
+    ax.legend(loc="upper left")
+
+def plain(value):
+    """
+    This function takes in a number, list, or numpy array and returns it as plain python
+    numbers and lists, so figure data can be sent to worker processes and hashed exactly.
+
+    Parameters
+    ----------
+    value : float, list, or numpy.ndarray
+        Value to convert.
+
+    Returns
+    -------
+    value : float or list
+        The value as python floats (or ints) and lists.
+
+    """
+    return np.asarray(value).tolist()
+
+def figure_specs(adhd_f_avgs, adhd_m_avgs, c_f_avgs, c_m_avgs, c_f_avg, c_m_avg, adhd_f_avg, adhd_m_avg, adhd_f_std_errors, adhd_m_std_errors, c_f_std_errors, c_m_std_errors, adhd_f_std_error, adhd_m_std_error, c_f_std_error, c_m_std_error, female_p, male_p, alpha):
+    """
+    This function takes in everything the scatterplot and bar graphs are drawn from (the
+    arguments of the scatter and bar_graphs functions) and describes each figure as a
+    dictionary that can be rendered on its own.
+
+    Returns
+    -------
+    specs : list
+        List of figure descriptions, each a dictionary with the "kind" of figure ("scatter"
+        or "bar"), the file "name" without an extension, and the "args" to draw it with.
+
+    """
+    scatter_args = [adhd_f_avgs, adhd_m_avgs, c_f_avgs, c_m_avgs, c_f_avg, c_m_avg, adhd_f_avg, adhd_m_avg,
+                    adhd_f_std_errors, adhd_m_std_errors, c_f_std_errors, c_m_std_errors]
+    female_args = ["Average Movement of All Female Participants Based on ADHD Status", "Group", "Average Movement",
+                   c_f_avg, adhd_f_avg, c_f_std_error, adhd_f_std_error, 'purple', 'pink', female_p, alpha]
+    male_args = ["Average Movement of All Male Participants Based on ADHD Status", "Group", "Average Movement",
+                 c_m_avg, adhd_m_avg, c_m_std_error, adhd_m_std_error, 'blue', 'green', male_p, alpha]
+    return [{"kind": "scatter", "name": SCATTER_NAME, "args": [plain(arg) for arg in scatter_args]},
+            {"kind": "bar", "name": str(female_p) + BAR_NAME, "args": [plain(arg) for arg in female_args]},
+            {"kind": "bar", "name": str(male_p) + BAR_NAME, "args": [plain(arg) for arg in male_args]}]
+
+def render_figure(spec, dpi=800, file_format="jpg"):
+    """
+    This function takes in a figure description and renders it to a file without pyplot,
+    so no window is opened and nothing is shared with other figures.
+
+    Parameters
+    ----------
+    spec : dict
+        Figure description made by the figure_specs function.
+    dpi : int, optional
+        Dots per inch of raster formats. The default is 800.
+    file_format : str, optional
+        File format and extension, raster ("jpg", "png") or vector ("svg", "pdf").
+        The default is "jpg".
+
+    Returns
+    -------
+    filename : str
+        Name of the file written.
+
+    """
+    # Source for rendering without pyplot: https://matplotlib.org/stable/gallery/user_interfaces/canvasagg.html
+    from matplotlib import rc_context
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    
+    # Figure made with its own Agg canvas, drawn on using the same drawing functions as the
+    # interactive figures, and saved
+    filename = spec["name"] + "." + file_format
+    if spec["kind"] == "scatter":
+        figure = Figure(figsize=(7, 7), dpi=dpi)
+        FigureCanvasAgg(figure)
+        draw_scatter(figure.add_subplot(), *spec["args"])
+        figure.savefig(filename, dpi=dpi)
+    else:
+        with rc_context({'font.size': BAR_FONT_SIZE}):
+            figure = Figure(figsize=(9, 9), dpi=dpi)
+            FigureCanvasAgg(figure)
+            draw_bar_graph(figure.add_subplot(), *spec["args"])
+            figure.savefig(filename, dpi=dpi)
+    return filename
+
+def load_render_cache(filename):
+    """
+    This function takes in the name of a render cache file and loads it.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the render cache JSON file.
+
+    Returns
+    -------
+    render_cache : dict
+        Dictionary of figure file names to the digest of what they were rendered from,
+        empty if the file is missing or unreadable.
+
+    """
+    try:
+        with open(filename) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def render_figures(specs, dpi=800, file_format="jpg", workers=1, cache_file=RENDER_CACHE_FILE):
+    """
+    This function takes in figure descriptions and renders the ones whose data, dpi, or
+    format changed since they were last rendered (or whose file is gone), in parallel
+    worker processes if more than one worker is asked for.
+
+    Parameters
+    ----------
+    specs : list
+        Figure descriptions made by the figure_specs function.
+    dpi : int, optional
+        Dots per inch of raster formats. The default is 800.
+    file_format : str, optional
+        File format and extension. The default is "jpg".
+    workers : int, optional
+        Number of worker processes, None uses one per CPU. The default is 1.
+    cache_file : str, optional
+        Name of the render cache file, None renders every figure. The default is RENDER_CACHE_FILE.
+
+    Returns
+    -------
+    rendered : list
+        Names of the files rendered (figures that were skipped are left out).
+
+    """
+    # Digest of each figure's description and render settings compared with the one recorded
+    # when its file was last written
+    render_cache = load_render_cache(cache_file) if cache_file else {}
+    todo = []
+    digests = []
+    for spec in specs:
+        digest = data_digest((spec, dpi, file_format))
+        filename = spec["name"] + "." + file_format
+        if render_cache.get(filename) != digest or not os.path.exists(filename):
+            todo.append(spec)
+            digests.append(digest)
+    
+    # Figures rendered one after another or spread over a process pool
+    # Source for process pools: https://docs.python.org/3/library/concurrent.futures.html
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1 and len(todo) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        from functools import partial
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as executor:
+            rendered = list(executor.map(partial(render_figure, dpi=dpi, file_format=file_format), todo))
+    else:
+        rendered = [render_figure(spec, dpi, file_format) for spec in todo]
+    
+    # Digests of the rendered figures recorded for the next run
+    if cache_file and rendered:
+        render_cache.update(zip(rendered, digests))
+        write_json(cache_file, render_cache)
+    return rendered
+
+def draw_traces(ax, pyramids, colors, labels, start=None, end=None, pixel_width=1000):
+    """
+    This function draws the movement trace of each participant on a set of matplotlib axes,
+    as the range (min to max) and mean of each bucket of the finest pyramid level with no
+    more buckets in the span than there are pixels (see choose_level in finalproject_pyramid),
+    so the number of points drawn does not depend on the zoom.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        Axes to draw on.
+    pyramids : list
+        Pyramids made by the load_pyramid function in finalproject_pyramid.
+    colors : list
+        Color of each participant's trace.
+    labels : list
+        Legend label of each participant's trace (None for no legend entry).
+    start : float, optional
+        First day shown, counted from midnight before each participant's first minute.
+        The default is None (day 0).
+    end : float, optional
+        Day the traces end at. The default is None (each recording's last day).
+    pixel_width : int, optional
+        Width of the axes in pixels. The default is 1000.
+
+    Returns
+    -------
+    points : int
+        Number of buckets drawn over all participants.
+
+    """
+    # Source for step plots: https://matplotlib.org/stable/api/_as_gen/matplotlib.axes.Axes.fill_between.html
+    points = 0
+    for pyramid, color, label in zip(pyramids, colors, labels):
+        
+        # Span in minutes, level picked using choose_level function, and its buckets in the span
+        # taken out using level_window function
+        first = 0 if start is None else start * 1440
+        last = pyramid[LEVELS[0][0]]["count"].size if end is None else end * 1440
+        bucket_starts, window = level_window(pyramid, choose_level(first, last, pixel_width), first, last)
+        days = bucket_starts / 1440
+        ax.fill_between(days, window["min"], window["max"], step="post", color=color, alpha=0.15, linewidth=0)
+        ax.step(days, window["mean"], where="post", color=color, linewidth=0.5, label=label)
+        points += days.size
+    
+    # Title, axes labels, & legend added
+    ax.set_title("Movement of Each Participant Over the Recording")
+    ax.set_xlabel("Day of Recording")
+    ax.set_ylabel("Movement")
+    if start is not None or end is not None:
+        ax.set_xlim(start, end)
+    ax.legend()
+    return points
+
+def trace_figure(filename, start=None, end=None, dpi=800, use_cache=True):
+    """
+    This function draws the movement traces of every participant in the combined group
+    files, colored by group as in the scatterplot, and saves them to a file without pyplot.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the file to save (its extension picks the format).
+    start : float, optional
+        First day shown. The default is None (day 0).
+    end : float, optional
+        Day the traces end at. The default is None (each recording's last day).
+    dpi : int, optional
+        Dots per inch of raster formats. The default is 800.
+    use_cache : bool, optional
+        Whether to load and save the pyramids next to the activity files. The default is True.
+
+    Returns
+    -------
+    points : int
+        Number of buckets drawn over all participants.
+
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from finalproject_combine import activity_file_name
+    
+    # Pyramids of every participant in each group loaded using load_pyramid function, with the
+    # group's color and one legend entry per group
+    pyramids, colors, labels = [], [], []
+    for group_file, color, label in (("patient_activity_combined_f.csv", "pink", "ADHD Females"),
+                                     ("patient_activity_combined_m.csv", "green", "ADHD Males"),
+                                     ("patient_activity_c_combined_f.csv", "purple", "Control Females"),
+                                     ("patient_activity_c_combined_m.csv", "blue", "Control Males")):
+        for row, patient_id in enumerate(read_summary(group_file)["patient_id"].tolist()):
+            pyramids.append(load_pyramid(activity_file_name(patient_id), use_cache))
+            colors.append(color)
+            labels.append(label if row == 0 else None)
+    
+    # Traces drawn with the axes' width in pixels (at the saved dpi) deciding each pyramid level
+    figure = Figure(figsize=TRACE_SIZE, dpi=dpi)
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    points = draw_traces(ax, pyramids, colors, labels, start, end, int(ax.get_window_extent().width))
+    figure.savefig(filename, dpi=dpi)
+    return points
+
+def resampled_tests(control_avgs_ls, adhd_avgs_ls, resamples, seed, workers, alpha = 0.2):
+    """
+    This function runs a permutation test and finds a bootstrap confidence interval for
+    the difference in means between two groups, and prints the results.
+
+    Parameters
+    ----------
+    control_avgs_ls : list
+        List of averages of the control group.
+    adhd_avgs_ls : list
+        List of averages of the ADHD group.
+    resamples : int
+        Number of permutations and bootstrap resamples.
+    seed : int
+        Random seed.
+    workers : int
+        Number of processes to run resamples in, None uses one per CPU.
+    alpha : float, optional
+        Alpha value for significance. Default is 0.2.
+
+    Returns
+    -------
+    p_value : float
+        The permutation test p-value.
+
+    """
+    result = permutation_test(control_avgs_ls, adhd_avgs_ls, resamples, seed, workers)
+    lower, upper = bootstrap_difference_ci(control_avgs_ls, adhd_avgs_ls, resamples, seed=seed, workers=workers)
+    
+    # printed if null hypothesis is rejected or not, with the 95% interval for control minus ADHD
+    p = result["p_value"]
+    decision = "Reject" if p < alpha else "Fail to reject"
+    print("\nPermutation p value =", round(p, 2), "(" + str(resamples), "permutations).", decision, "the null hypothesis.")
+    print("Difference in means (control - ADHD) =", round(result["difference"], 2),
+          "95% bootstrap CI", (round(lower, 2), round(upper, 2)))
+    return round(p, 2)
+
+def main(report=None, resamples=0, seed=0, workers=1, headless=False, dpi=800, file_format="jpg", use_render_cache=True,
+         traces=None, zoom=None):
+    """
+    This function loads the combined patient activity summaries, runs the significance
+    tests, and draws the scatterplot and bar graphs.
+
+    Parameters
+    ----------
+    resamples : int, optional
+        Number of permutations and bootstrap resamples. If more than 0, the bar graphs use
+        permutation test p values and 95% bootstrap confidence interval error bars instead
+        of t test p values and standard errors. The default is 0.
+    seed : int, optional
+        Random seed for the permutations and bootstrap resamples. The default is 0.
+    workers : int, optional
+        Number of processes to run resamples (and headless figures) in, None uses one per
+        CPU. The default is 1.
+    headless : bool, optional
+        Whether to render the figures straight to files without pyplot or windows, in
+        parallel and skipping figures whose data did not change. The default is False.
+    dpi : int, optional
+        Dots per inch of headless raster figures. The default is 800.
+    file_format : str, optional
+        File format of headless figures, "jpg", "png", "svg", or "pdf". The default is "jpg".
+    use_render_cache : bool, optional
+        Whether headless figures whose data, dpi, and format did not change are skipped.
+        The default is True.
+    traces : str, optional
+        Name of a file to also draw every participant's movement trace to, using the
+        activity pyramids. The default is None (no trace figure).
+    zoom : tuple, optional
+        First and last day shown in the trace figure. The default is None (every day).
+    report : str, optional
+        Name of a JSON file to write a report of each stage's wall time and peak memory
+        (summary loading, t tests, and each figure) to. The default is None (nothing is recorded).
+
+    Returns
+    -------
+    None.
+
+    """
+    # Recording turned on if a report was asked for
+    if report:
+        instrument.enable()
+    
+    # Summary files for each group loaded once into numpy arrays using read_summary function
+    with instrument.stage("summary_load"):
+        adhd_f = read_summary("patient_activity_combined_f.csv")
+        adhd_m = read_summary("patient_activity_combined_m.csv")
+        c_f = read_summary("patient_activity_c_combined_f.csv")
+        c_m = read_summary("patient_activity_c_combined_m.csv")
+    
+    # Averages for participants with adhd set to variable, and average of those averages found 
+    # using avg function
+    adhd_f_avgs = get_avgs(adhd_f)
+    adhd_m_avgs = get_avgs(adhd_m)
     adhd_f_avg = average(adhd_f_avgs) 
     adhd_m_avg = average(adhd_m_avgs) 
-    adhd_f_std_errors = std_errors_scatter("patient_activity_combined_f.csv")
-    adhd_m_std_errors= std_errors_scatter("patient_activity_combined_m.csv")
+    adhd_f_std_errors = std_errors_scatter(adhd_f)
+    adhd_m_std_errors= std_errors_scatter(adhd_m)
     adhd_f_std_error = std_errors_bar(adhd_f_avgs)
     adhd_m_std_error= std_errors_bar(adhd_m_avgs)
     
-    # Files read for participants without adhd using read_csv function, averages set to variable, 
-    # and average of those averages found using avg function
-    c_f_avgs = get_avgs("patient_activity_c_combined_f.csv")
-    c_m_avgs = get_avgs("patient_activity_c_combined_m.csv")
+    # Averages for participants without adhd set to variable, and average of those averages found 
+    # using avg function
+    c_f_avgs = get_avgs(c_f)
+    c_m_avgs = get_avgs(c_m)
     c_f_avg = average(c_f_avgs) 
     c_m_avg = average(c_m_avgs) 
-    c_f_std_errors = std_errors_scatter("patient_activity_c_combined_f.csv")
-    c_m_std_errors= std_errors_scatter("patient_activity_c_combined_m.csv")
+    c_f_std_errors = std_errors_scatter(c_f)
+    c_m_std_errors= std_errors_scatter(c_m)
     c_f_std_error = std_errors_bar(c_f_avgs)
     c_m_std_error= std_errors_bar(c_m_avgs)
     
@@ -448,17 +858,91 @@ def main():
     # correction is true
     
     # Significance found using t test function with lists and true correction
-    female_p = p_value(c_f_avgs, adhd_f_avgs, True)
-    male_p = p_value(c_m_avgs, adhd_m_avgs, True)
-   
+    with instrument.stage("t_tests"):
+        female_p = p_value(c_f_avgs, adhd_f_avgs, True)
+        male_p = p_value(c_m_avgs, adhd_m_avgs, True)
+    
+    # Permutation tests and bootstrap confidence intervals replace the t tests and standard
+    # errors on the bar graphs if resamples were asked for
+    if resamples > 0:
+        with instrument.stage("resampling"):
+            female_p, male_p = (resampled_tests(c_avgs, adhd_avgs, resamples, seed, workers)
+                                for c_avgs, adhd_avgs in ((c_f_avgs, adhd_f_avgs), (c_m_avgs, adhd_m_avgs)))
+            c_f_std_error = ci_error_bar(c_f_avg, bootstrap_mean_ci(c_f_avgs, resamples, seed=seed, workers=workers))
+            c_m_std_error = ci_error_bar(c_m_avg, bootstrap_mean_ci(c_m_avgs, resamples, seed=seed, workers=workers))
+            adhd_f_std_error = ci_error_bar(adhd_f_avg, bootstrap_mean_ci(adhd_f_avgs, resamples, seed=seed, workers=workers))
+            adhd_m_std_error = ci_error_bar(adhd_m_avg, bootstrap_mean_ci(adhd_m_avgs, resamples, seed=seed, workers=workers))
     
-    # Scatterplot created using scatter function and averages of all participants in lists 
-    # differentiated by sex and adhd status
-    scatter(adhd_f_avgs, adhd_m_avgs, c_f_avgs, c_m_avgs, c_f_avg, c_m_avg, adhd_f_avg, adhd_m_avg, adhd_f_std_errors, adhd_m_std_errors, c_f_std_errors, c_m_std_errors)
+    # In headless mode every figure is described, then rendered (only if changed) using render_figures function
+    if headless:
+        with instrument.stage("render"):
+            specs = figure_specs(adhd_f_avgs, adhd_m_avgs, c_f_avgs, c_m_avgs, c_f_avg, c_m_avg, adhd_f_avg, adhd_m_avg,
+                                 adhd_f_std_errors, adhd_m_std_errors, c_f_std_errors, c_m_std_errors,
+                                 adhd_f_std_error, adhd_m_std_error, c_f_std_error, c_m_std_error, female_p, male_p, 0.2)
+            rendered = render_figures(specs, dpi, file_format, workers, RENDER_CACHE_FILE if use_render_cache else None)
+        instrument.count("render", len(rendered))
+        print("\nRendered", len(rendered), "of", len(specs), "figures")
     
-    # Bar graphs created using bar_graphs function and the averages of the averages of all 
-    # participants in lists differentiated by sex and adhd status
-    bar_graphs(c_f_avg, c_m_avg, adhd_f_avg, adhd_m_avg, adhd_f_std_error, adhd_m_std_error, c_f_std_error, c_m_std_error, female_p, male_p, 0.2)
+    # Otherwise the scatterplot is created using scatter function and averages of all participants in 
+    # lists differentiated by sex and adhd status, and the bar graphs using bar_graphs function and the
+    # averages of the averages of all participants in lists differentiated by sex and adhd status
+    else:
+        with instrument.stage("figure:scatter"):
+            scatter(adhd_f_avgs, adhd_m_avgs, c_f_avgs, c_m_avgs, c_f_avg, c_m_avg, adhd_f_avg, adhd_m_avg, adhd_f_std_errors, adhd_m_std_errors, c_f_std_errors, c_m_std_errors)
+        bar_graphs(c_f_avg, c_m_avg, adhd_f_avg, adhd_m_avg, adhd_f_std_error, adhd_m_std_error, c_f_std_error, c_m_std_error, female_p, male_p, 0.2)
+    
+    # Movement traces drawn from the pyramids using trace_figure function if asked for
+    if traces:
+        with instrument.stage("figure:traces"):
+            points = trace_figure(traces, *(zoom or (None, None)), dpi)
+        print("Drew", points, "trace buckets to", traces)
+    
+    # Instrumentation report written if asked for
+    if report:
+        instrument.write_report(report)
+        instrument.disable()
+
+def parse_args(argv=None):
+    """
+    This function reads the command line options of the program.
 
-# Call to main
-main()
\ No newline at end of file
+    Parameters
+    ----------
+    argv : list, optional
+        Command line arguments. The default is None (the arguments the program was run with).
+
+    Returns
+    -------
+    args : argparse.Namespace
+        The parsed options.
+
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description="Compare and graph movement of ADHD and control groups.")
+    parser.add_argument("--report", metavar="FILE",
+                        help="write per stage timing and memory to a JSON file")
+    parser.add_argument("--resample", type=int, default=0, metavar="N",
+                        help="use N permutations and bootstrap resamples for the bar graph p values and error bars")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="random seed for --resample (default 0)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes to run resamples and headless figures in, 0 for one per CPU (default 1)")
+    parser.add_argument("--headless", action="store_true",
+                        help="render figures straight to files without windows, skipping unchanged figures")
+    parser.add_argument("--dpi", type=int, default=800,
+                        help="dots per inch of headless figures (default 800)")
+    parser.add_argument("--format", default="jpg", choices=["jpg", "png", "svg", "pdf"],
+                        help="file format of headless figures (default jpg)")
+    parser.add_argument("--rerender", action="store_true",
+                        help="render every headless figure even if its data did not change")
+    parser.add_argument("--traces", metavar="FILE",
+                        help="also draw every participant's movement trace (min/max range and mean) to a file")
+    parser.add_argument("--zoom", type=float, nargs=2, metavar=("START", "END"),
+                        help="first and last recording day shown in the trace figure")
+    return parser.parse_args(argv)
+
+# Call to main, only when run as a program so the functions can be imported without graphing
+if __name__ == "__main__":
+    args = parse_args()
+    main(args.report, args.resample, args.seed, args.workers or None, args.headless, args.dpi, args.format, not args.rerender,
+         args.traces, args.zoom)
\ No newline at end of file
@@ -0,0 +1,263 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Multi-Resolution Activity Pyramid for Trace Plots
+
+"""
+# json and os imported to keep each pyramid next to the activity cache with the fingerprint of the
+# file it was built from, numpy imported to build every level with reshaped reductions
+import json
+import os
+import numpy as np
+from finalproject_cache import cache_paths, file_fingerprint, fingerprint_matches, read_cached_activity
+from finalproject_reader import read_activity_file, resolve_input
+
+# Pyramid levels, finest first, with the minutes in each of their buckets; a day is a whole
+# number of buckets of every level, so each level is made by reshaping the one before it
+LEVELS = (("minute", 1), ("15min", 15), ("hour", 60), ("day", 1440))
+
+# Version of the saved pyramid layout; pyramids saved by other versions are built again
+PYRAMID_VERSION = 1
+
+def minute_grid(movement_data, timestamps):
+    """
+    This function takes in a participant's movement data and timestamps and puts them on a
+    minute grid starting at midnight of the first day and ending at midnight after the last.
+
+    Parameters
+    ----------
+    movement_data : numpy.ndarray
+        Movement data for one participant.
+    timestamps : numpy.ndarray
+        Array of datetime64[m] timestamps matching the movement data.
+
+    Returns
+    -------
+    values : numpy.ndarray
+        float64 movement of each grid minute, nan where there is no data. A minute recorded
+        more than once keeps its last value.
+    start : int
+        First grid minute, in minutes since 1970-01-01 00:00.
+
+    """
+    minutes = np.asarray(timestamps, dtype="datetime64[m]").astype(np.int64)
+    if minutes.size == 0:
+        return np.empty(0), 0
+    start = int(minutes.min()) // 1440 * 1440
+    n_days = (int(minutes.max()) - start) // 1440 + 1
+    values = np.full(n_days * 1440, np.nan)
+    values[minutes - start] = movement_data
+    return values, start
+
+def build_pyramid(movement_data, timestamps):
+    """
+    This function takes in a participant's movement data and timestamps and builds every
+    level of the pyramid, each holding the min, max, mean, and count of its buckets.
+
+    Parameters
+    ----------
+    movement_data : numpy.ndarray
+        Movement data for one participant.
+    timestamps : numpy.ndarray
+        Array of datetime64[m] timestamps matching the movement data.
+
+    Returns
+    -------
+    pyramid : dict
+        Dictionary with the "start" minute (see minute_grid) and, for each level name in
+        LEVELS, a dictionary of float32 "min", "max", and "mean" arrays (nan for buckets
+        without data) and an int32 "count" array, one value per bucket.
+
+    """
+    values, start = minute_grid(movement_data, timestamps)
+    has_data = ~np.isnan(values)
+    level = {"min": values, "max": values, "mean": values, "count": has_data.astype(np.int32)}
+    pyramid = {"start": start}
+    previous_size = 1
+    for name, size in LEVELS:
+
+        # Each bucket reduced from the buckets of the level before it with one reshape per array:
+        # counts and sums added, and the smallest and largest values kept (buckets without data
+        # take part as +inf or -inf so they never win)
+        factor = size // previous_size
+        counts = level["count"].reshape(-1, factor)
+        filled = counts > 0
+        count = counts.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = (np.where(filled, level["mean"].reshape(-1, factor), 0.0) * counts).sum(axis=1) / count
+        lowest = np.where(filled, level["min"].reshape(-1, factor), np.inf).min(axis=1)
+        highest = np.where(filled, level["max"].reshape(-1, factor), -np.inf).max(axis=1)
+        empty = count == 0
+        level = {"min": np.where(empty, np.nan, lowest).astype(np.float32),
+                 "max": np.where(empty, np.nan, highest).astype(np.float32),
+                 "mean": np.where(empty, np.nan, mean).astype(np.float32),
+                 "count": count.astype(np.int32)}
+        pyramid[name] = level
+        previous_size = size
+    return pyramid
+
+def pyramid_path(filename):
+    """
+    This function takes in an activity file name and returns the name of the file its
+    pyramid is saved in, in the activity cache folder next to it.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the participant's movement data file.
+
+    Returns
+    -------
+    path : str
+        Name of the .npz pyramid file.
+
+    """
+    meta_path, activity_path, timestamp_path = cache_paths(filename)
+    return meta_path[:-len(".json")] + ".pyramid.npz"
+
+def save_pyramid(path, pyramid, fingerprint):
+    """
+    This function takes in a pyramid file name, a pyramid, and the fingerprint of the
+    activity file it was built from, and saves them, replacing the file in one step.
+
+    Parameters
+    ----------
+    path : str
+        Name of the .npz pyramid file.
+    pyramid : dict
+        Pyramid made by the build_pyramid function.
+    fingerprint : dict
+        Fingerprint made by the file_fingerprint function before the activity file was read.
+
+    Returns
+    -------
+    None.
+
+    """
+    # Source for saving several arrays in one file: https://numpy.org/doc/stable/reference/generated/numpy.savez.html
+    arrays = {name + "_" + statistic: pyramid[name][statistic] for name, size in LEVELS
+              for statistic in ("min", "max", "mean", "count")}
+
+    # The minute level's min, max, and mean are the same array, so it is saved once
+    del arrays["minute_min"], arrays["minute_max"]
+    temporary_path = path + "." + str(os.getpid()) + ".tmp"
+    with open(temporary_path, "wb") as file:
+        np.savez(file, start=pyramid["start"], meta=json.dumps({"version": PYRAMID_VERSION, "fingerprint": fingerprint}), **arrays)
+    os.replace(temporary_path, path)
+
+def load_pyramid(filename, use_cache=True):
+    """
+    This function takes in an activity file name and returns its pyramid, loading the saved
+    pyramid if the file has not changed since it was built and otherwise building (and
+    saving) it from the file's movement data.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the participant's movement data file.
+    use_cache : bool, optional
+        Whether to load and save pyramids (and use the activity cache); without caches the
+        file is parsed directly. The default is True.
+
+    Returns
+    -------
+    pyramid : dict
+        Pyramid made by the build_pyramid function.
+
+    """
+    # Compressed copy found using resolve_input function if only that exists; without caches
+    # the file is read and parsed directly using read_activity_file function
+    filename = resolve_input(filename)
+    if not use_cache:
+        return build_pyramid(*read_activity_file(filename, timestamps=True))
+    path = pyramid_path(filename)
+    try:
+        with np.load(path) as saved:
+            meta = json.loads(str(saved["meta"]))
+            stored_mtime = meta["fingerprint"]["mtime_ns"]
+            matches = meta["version"] == PYRAMID_VERSION and fingerprint_matches(filename, meta["fingerprint"])
+            if matches:
+                pyramid = {"start": int(saved["start"])}
+                for name, size in LEVELS:
+                    pyramid[name] = {statistic: saved[name + "_" + statistic] if name + "_" + statistic in saved.files
+                                     else saved[name + "_mean"] for statistic in ("min", "max", "mean", "count")}
+        if matches:
+
+            # Pyramid saved again if the file was only touched so the hash is not checked again next time
+            if meta["fingerprint"]["mtime_ns"] != stored_mtime:
+                save_pyramid(path, pyramid, meta["fingerprint"])
+            return pyramid
+
+    # Missing or broken pyramid files are built again
+    except (OSError, ValueError, KeyError):
+        pass
+
+    # Fingerprint taken before reading so a file changed while it is read is built again next time
+    fingerprint = file_fingerprint(filename)
+    pyramid = build_pyramid(*read_cached_activity(filename, timestamps=True))
+
+    # Pyramids are only a speed up, so a folder that cannot be written to is skipped
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        save_pyramid(path, pyramid, fingerprint)
+    except OSError:
+        pass
+    return pyramid
+
+def choose_level(start, end, pixel_width):
+    """
+    This function takes in the span of a trace plot and its width in pixels, and picks
+    the finest level with no more buckets in the span than there are pixels.
+
+    Parameters
+    ----------
+    start : float
+        First minute shown, counted from the pyramid start.
+    end : float
+        Minute after the last one shown.
+    pixel_width : int
+        Width of the plot in pixels.
+
+    Returns
+    -------
+    level : str
+        Name of the level (the coarsest level if none fits).
+
+    """
+    for name, size in LEVELS:
+        if (end - start) / size <= pixel_width:
+            return name
+    return LEVELS[-1][0]
+
+def level_window(pyramid, level, start=None, end=None):
+    """
+    This function takes in a pyramid, a level, and a span of minutes, and returns the
+    buckets of that level in the span without copying them.
+
+    Parameters
+    ----------
+    pyramid : dict
+        Pyramid made by the build_pyramid function.
+    level : str
+        Name of the level.
+    start : float, optional
+        First minute, counted from the pyramid start. The default is None (the first minute).
+    end : float, optional
+        Minute after the last one. The default is None (the end of the recording).
+
+    Returns
+    -------
+    bucket_starts : numpy.ndarray
+        Minute (counted from the pyramid start) each returned bucket starts at.
+    window : dict
+        The level's "min", "max", "mean", and "count" arrays for the buckets in the span.
+
+    """
+    size = dict(LEVELS)[level]
+    n_buckets = pyramid[level]["count"].size
+    first = 0 if start is None else min(max(int(start // size), 0), n_buckets)
+    last = n_buckets if end is None else min(max(int(-(-end // size)), first), n_buckets)
+    return (np.arange(first, last) * size,
+            {statistic: values[first:last] for statistic, values in pyramid[level].items()})
@@ -0,0 +1,417 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Vectorized Activity File Reader
+
+"""
+# os imported to find compressed copies of input files, numpy imported to parse whole files as
+# arrays of bytes instead of line by line; bz2, gzip, and lzma are imported inside open_input
+# only when a compressed file is opened
+import os
+import numpy as np
+
+# Compressed file extensions that are read transparently, with the module that opens each
+COMPRESSED_SUFFIXES = {".gz": "gzip", ".xz": "lzma", ".bz2": "bz2"}
+
+# Number of decompressed bytes parsed at a time when a compressed activity file is read
+DECOMPRESS_CHUNK_SIZE = 1 << 20
+
+# Byte values of the characters the activity files are made of
+NEWLINE = ord("\n")
+SPACE = ord(" ")
+SEMICOLON = ord(";")
+MINUS = ord("-")
+PLUS = ord("+")
+COLON = ord(":")
+ZERO = ord("0")
+
+# Lookup table of the bytes str.strip() removes (other than the newline lines are split on)
+WHITESPACE = np.zeros(256, dtype=bool)
+WHITESPACE[[ord(character) for character in " \t\r\x0b\x0c"]] = True
+
+# Byte offsets of each timestamp part inside a "MM-DD-YYYY HH:MM" cell
+TIMESTAMP_WIDTH = 16
+MONTH_DIGITS = (0, 1)
+DAY_DIGITS = (3, 4)
+YEAR_DIGITS = (6, 7, 8, 9)
+HOUR_DIGITS = (11, 12)
+MINUTE_DIGITS = (14, 15)
+
+# Number of days in each month of a year that is not a leap year
+MONTH_LENGTHS = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+# Byte offsets of the separators inside a "MM-DD-YYYY HH:MM" cell and the byte each must be
+TIMESTAMP_SEPARATORS = ((2, MINUS), (5, MINUS), (10, SPACE), (13, COLON))
+
+def compression_suffix(filename):
+    """
+    This function takes in a file name and finds its compressed file extension.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file.
+
+    Returns
+    -------
+    suffix : str or None
+        ".gz", ".xz", or ".bz2", None if the file is not compressed.
+
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    return extension if extension in COMPRESSED_SUFFIXES else None
+
+def resolve_input(filename):
+    """
+    This function takes in an input file name and returns the name of the file to read:
+    the file itself if it exists, otherwise the first compressed copy of it that exists
+    (e.g. patient_activity_07.csv.gz), otherwise the name unchanged so opening it raises
+    the usual FileNotFoundError.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the uncompressed file.
+
+    Returns
+    -------
+    filename : str
+        The name of the file to read.
+
+    """
+    if os.path.exists(filename) or compression_suffix(filename):
+        return filename
+    for suffix in COMPRESSED_SUFFIXES:
+        if os.path.exists(filename + suffix):
+            return filename + suffix
+    return filename
+
+def open_input(filename, mode="rb"):
+    """
+    This function takes in an input file name and opens it, decompressing it as it is
+    read if it is compressed, so no decompressed copy is ever written.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file, compressed or not.
+    mode : str, optional
+        "rb" for bytes or "r" for text. The default is "rb".
+
+    Returns
+    -------
+    file : file object
+        The opened file.
+
+    """
+    # Source for reading compressed files: https://docs.python.org/3/library/archiving.html
+    suffix = compression_suffix(filename)
+    if suffix is None:
+        return open(filename, mode)
+    import importlib
+    return importlib.import_module(COMPRESSED_SUFFIXES[suffix]).open(filename, "rt" if mode == "r" else mode)
+
+def line_bounds(buffer, skip_header=True):
+    """
+    This function takes in a byte array of a semicolon separated file and finds where
+    every line starts and ends.
+
+    Parameters
+    ----------
+    buffer : numpy.ndarray
+        The file contents as an array of uint8 bytes.
+    skip_header : bool, optional
+        Whether the first line is a header to leave out. The default is True.
+
+    Returns
+    -------
+    starts : numpy.ndarray
+        Index of the first byte of each line.
+    ends : numpy.ndarray
+        Index one past the last byte of each line, with line endings not included.
+
+    """
+    # Newline positions found, a final line without a newline is given one at the end of the buffer
+    ends = np.flatnonzero(buffer == NEWLINE)
+    if buffer.size and buffer[-1] != NEWLINE:
+        ends = np.append(ends, buffer.size)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+
+    # Header line dropped if asked
+    if skip_header:
+        starts = starts[1:]
+        ends = ends[1:]
+
+    # Whitespace (including the carriage returns of Windows line endings) removed from both
+    # ends of each line, the same as str.strip() did in the per-line loop
+    return strip_whitespace(buffer, starts, ends)
+
+def strip_whitespace(buffer, starts, ends):
+    """
+    This function takes in a byte array and the start and end of a number of lines or
+    cells and moves each start and end past the whitespace at that end.
+
+    Parameters
+    ----------
+    buffer : numpy.ndarray
+        The file contents as an array of uint8 bytes.
+    starts : numpy.ndarray
+        Index of the first byte of each line or cell.
+    ends : numpy.ndarray
+        Index one past the last byte of each line or cell.
+
+    Returns
+    -------
+    starts : numpy.ndarray
+        Index of the first byte that is not whitespace (the end for blank cells).
+    ends : numpy.ndarray
+        Index one past the last byte that is not whitespace.
+
+    """
+    # One byte taken off every line that still starts or ends with whitespace per pass, so
+    # the number of passes is the longest run of whitespace rather than the number of rows
+    leading = (ends > starts) & WHITESPACE[buffer[np.minimum(starts, buffer.size - 1)]]
+    while leading.any():
+        starts = starts + leading
+        leading = (ends > starts) & WHITESPACE[buffer[np.minimum(starts, buffer.size - 1)]]
+    trailing = (ends > starts) & WHITESPACE[buffer[np.maximum(ends - 1, 0)]]
+    while trailing.any():
+        ends = ends - trailing
+        trailing = (ends > starts) & WHITESPACE[buffer[np.maximum(ends - 1, 0)]]
+    return starts, ends
+
+def parse_integers(buffer, starts, ends):
+    """
+    This function takes in a byte array and the start and end of a number of integer
+    cells and converts every cell to an integer at once.
+
+    Parameters
+    ----------
+    buffer : numpy.ndarray
+        The file contents as an array of uint8 bytes.
+    starts : numpy.ndarray
+        Index of the first byte of each cell.
+    ends : numpy.ndarray
+        Index one past the last byte of each cell.
+
+    Returns
+    -------
+    values : numpy.ndarray
+        Array of int64 cell values.
+
+    Raises
+    ------
+    ValueError
+        If a cell has no digits or a byte other than a digit after its sign.
+
+    """
+    # Whitespace around each cell removed and a leading plus or minus sign skipped over, as
+    # int() allowed in the per-line loop
+    starts, ends = strip_whitespace(buffer, starts, ends)
+    signs = buffer[np.minimum(starts, buffer.size - 1)]
+    negative = (ends > starts) & (signs == MINUS)
+    starts = starts + (negative | ((ends > starts) & (signs == PLUS)))
+    lengths = ends - starts
+    values = np.zeros(starts.size, dtype=np.int64)
+    if starts.size == 0:
+        return values
+
+    # Cells with no digits, such as a bare minus sign, are not numbers
+    if (lengths <= 0).any():
+        raise ValueError("activity cell is not an integer")
+
+    # Horner's method run across all cells at once, one digit column per pass, so the
+    # number of passes is the width of the widest cell rather than the number of rows
+    for column in range(int(lengths.max())):
+        in_cell = column < lengths
+        digits = buffer[np.where(in_cell, starts + column, 0)].astype(np.int64) - ZERO
+        if ((digits[in_cell] < 0) | (digits[in_cell] > 9)).any():
+            raise ValueError("activity cell is not an integer")
+        values = np.where(in_cell, values * 10 + digits, values)
+    return np.where(negative, -values, values)
+
+def parse_timestamps(buffer, starts):
+    """
+    This function takes in a byte array and the start of a number of "MM-DD-YYYY HH:MM"
+    timestamp cells and converts every cell to a numpy datetime at once.
+
+    Parameters
+    ----------
+    buffer : numpy.ndarray
+        The file contents as an array of uint8 bytes.
+    starts : numpy.ndarray
+        Index of the first byte of each timestamp cell.
+
+    Returns
+    -------
+    timestamps : numpy.ndarray
+        Array of datetime64[m] timestamps.
+
+    Raises
+    ------
+    ValueError
+        If a cell has a byte other than a digit or the separator expected at its offset.
+
+    """
+    # Separators checked at their fixed offsets from the start of each cell
+    for offset, separator in TIMESTAMP_SEPARATORS:
+        if (buffer[starts + offset] != separator).any():
+            raise ValueError("timestamp cell is not in MM-DD-YYYY HH:MM format")
+
+    def number(offsets):
+        # Digits at fixed offsets from the start of each cell checked (bytes below "0" wrap
+        # around past 9 when "0" is subtracted) and combined into one number
+        value = np.zeros(starts.size, dtype=np.int64)
+        for offset in offsets:
+            digits = buffer[starts + offset] - np.uint8(ZERO)
+            if (digits > 9).any():
+                raise ValueError("timestamp cell is not in MM-DD-YYYY HH:MM format")
+            value = value * 10 + digits
+        return value
+
+    # Source for datetime64 unit arithmetic: https://numpy.org/doc/stable/reference/arrays.datetime.html
+
+    # Every part range checked first, since datetime64 arithmetic would roll a month 13 or a
+    # day 32 over into the next year or month instead of failing; February has 29 days in
+    # years divisible by 4, except centuries not divisible by 400
+    year, month, day = number(YEAR_DIGITS), number(MONTH_DIGITS), number(DAY_DIGITS)
+    hour, minute = number(HOUR_DIGITS), number(MINUTE_DIGITS)
+    if ((month < 1) | (month > 12) | (hour > 23) | (minute > 59)).any():
+        raise ValueError("timestamp cell is not a valid date and time")
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    if ((day < 1) | (day > MONTH_LENGTHS[month - 1] + ((month == 2) & leap))).any():
+        raise ValueError("timestamp cell is not a valid date and time")
+
+    # Months since 1970 turned into a month date, then days, hours, and minutes added on
+    months = (year - 1970) * 12 + month - 1
+    days = months.astype("datetime64[M]").astype("datetime64[D]") + (day - 1)
+    return days.astype("datetime64[m]") + hour * 60 + minute
+
+def parse_activity_bytes(raw, timestamps=False, skip_header=True):
+    """
+    This function takes in the raw bytes of a patient activity file and converts the
+    ACTIVITY column (and the TIMESTAMP column if asked) to arrays. Rows with an empty
+    ACTIVITY cell are left out.
+
+    Parameters
+    ----------
+    raw : bytes
+        The contents of a patient activity file.
+    timestamps : bool, optional
+        Whether to also parse the TIMESTAMP column. The default is False.
+    skip_header : bool, optional
+        Whether the first line is the TIMESTAMP;ACTIVITY header. The default is True.
+
+    Returns
+    -------
+    activity : numpy.ndarray
+        Array of int32 movement data for one participant.
+    timestamp : numpy.ndarray
+        Array of datetime64[m] timestamps matching the activity array, only returned
+        if timestamps is True.
+
+    """
+    # Source for frombuffer: https://numpy.org/doc/stable/reference/generated/numpy.frombuffer.html
+
+    # Bytes viewed as a numpy array without copying, line starts and ends found
+    buffer = np.frombuffer(raw, dtype=np.uint8)
+    starts, ends = line_bounds(buffer, skip_header)
+
+    # First semicolon of each line found by searching the sorted semicolon positions for
+    # each line start; lines without a semicolon have no activity cell
+    semicolons = np.append(np.flatnonzero(buffer == SEMICOLON), buffer.size)
+    first = np.searchsorted(semicolons, starts)
+    separator = semicolons[first]
+    has_cell = separator < ends
+
+    # The activity cell runs from after the semicolon to the next semicolon or the end of
+    # the line; rows where it is empty are dropped, the same as the per-line loop did
+    cell_starts = separator + 1
+    cell_ends = np.minimum(semicolons[np.minimum(first + 1, semicolons.size - 1)], ends)
+    keep = has_cell & (cell_ends > cell_starts)
+
+    activity = parse_integers(buffer, cell_starts[keep], cell_ends[keep]).astype(np.int32)
+    if not timestamps:
+        return activity
+
+    # Timestamps parsed only for kept rows, any cell that is not "MM-DD-YYYY HH:MM" is an error
+    kept_starts = starts[keep]
+    if ((separator[keep] - kept_starts) != TIMESTAMP_WIDTH).any():
+        raise ValueError("timestamp cell is not in MM-DD-YYYY HH:MM format")
+    return activity, parse_timestamps(buffer, kept_starts)
+
+def iter_parsed_chunks(file, chunk_size, timestamps=False):
+    """
+    This function takes in an open binary activity file, reads it in fixed size blocks,
+    and parses each block with the parse_activity_bytes function. Lines cut off at the end
+    of a block are carried over to the next block, so memory use does not grow with file size.
+
+    Parameters
+    ----------
+    file : file object
+        Activity file opened in binary mode (or a decompressing file object), positioned at
+        the start of the header line.
+    chunk_size : int
+        Number of bytes to read at a time.
+    timestamps : bool, optional
+        Whether to also parse the TIMESTAMP column. The default is False.
+
+    Yields
+    ------
+    parsed : numpy.ndarray or tuple
+        What the parse_activity_bytes function returns for the complete lines of one block.
+
+    """
+    leftover = b""
+    skip_header = True
+    for block in iter(lambda: file.read(chunk_size), b""):
+
+        # Block joined to the partial line left from the last block, and cut after its last newline
+        block = leftover + block
+        last_newline = block.rfind(b"\n")
+        if last_newline < 0:
+            leftover = block
+            continue
+        leftover = block[last_newline + 1:]
+        yield parse_activity_bytes(block[:last_newline + 1], timestamps, skip_header)
+        skip_header = False
+
+    # Last line parsed if the file did not end with a newline
+    if leftover:
+        yield parse_activity_bytes(leftover, timestamps, skip_header)
+
+def read_activity_file(filename, timestamps=False):
+    """
+    This function takes in a file name, reads the whole file in one call and parses
+    it with the parse_activity_bytes function. Compressed files are decompressed in
+    blocks that are parsed as they come, and the parsed blocks joined.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the participant's movement data file.
+    timestamps : bool, optional
+        Whether to also parse the TIMESTAMP column. The default is False.
+
+    Returns
+    -------
+    activity : numpy.ndarray
+        Array of int32 movement data for one participant.
+    timestamp : numpy.ndarray
+        Array of datetime64[m] timestamps, only returned if timestamps is True.
+
+    """
+    if compression_suffix(filename):
+        with open_input(filename) as file:
+            chunks = list(iter_parsed_chunks(file, DECOMPRESS_CHUNK_SIZE, timestamps))
+
+        # Timestamps only parsed if asked, so compressed files accept the same cells as plain ones
+        if not timestamps:
+            return np.concatenate(chunks or [np.empty(0, dtype=np.int32)])
+        return (np.concatenate([chunk[0] for chunk in chunks] or [np.empty(0, dtype=np.int32)]),
+                np.concatenate([chunk[1] for chunk in chunks] or [np.empty(0, dtype="datetime64[m]")]))
+    with open(filename, "rb") as file:
+        raw = file.read()
+    return parse_activity_bytes(raw, timestamps)
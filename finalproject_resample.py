@@ -0,0 +1,276 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Permutation Tests and Bootstrap Confidence Intervals
+
+"""
+# os imported to count CPUs, numpy imported to make and evaluate whole batches of resamples at once
+import os
+import numpy as np
+
+# Number of resamples made in one block; blocks (not workers) get their own random seeds, so
+# results are the same for any number of workers
+BLOCK_SIZE = 10000
+
+def block_sizes(n_resamples, block_size=BLOCK_SIZE):
+    """
+    This function takes in a number of resamples and splits it into blocks.
+
+    Parameters
+    ----------
+    n_resamples : int
+        Total number of resamples.
+    block_size : int, optional
+        Largest number of resamples in a block. The default is BLOCK_SIZE.
+
+    Returns
+    -------
+    sizes : list
+        Number of resamples in each block.
+
+    """
+    full, rest = divmod(n_resamples, block_size)
+    return [block_size] * full + ([rest] if rest else [])
+
+def run_blocks(block_function, arguments, n_resamples, seed, workers):
+    """
+    This function takes in a block function, the arguments every block shares, a number of
+    resamples, a seed, and a worker count, and runs the blocks (in a process pool if more
+    than one worker) with one child seed per block. Results come back in block order.
+
+    Parameters
+    ----------
+    block_function : function
+        Module level function called as block_function(*arguments, seed_sequence, size).
+    arguments : tuple
+        Arguments shared by every block.
+    n_resamples : int
+        Total number of resamples.
+    seed : int
+        Random seed.
+    workers : int
+        Number of worker processes, None uses one per CPU.
+
+    Returns
+    -------
+    results : list
+        What block_function returned for each block.
+
+    """
+    # Source for independent child seeds: https://numpy.org/doc/stable/reference/random/parallel.html
+    sizes = block_sizes(n_resamples)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    jobs = [arguments + (seed_sequence, size) for seed_sequence, size in zip(seeds, sizes)]
+    if workers > 1 and len(jobs) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            return list(executor.map(block_function, *zip(*jobs)))
+    return [block_function(*job) for job in jobs]
+
+def permutation_block(pooled, n_first, observed, seed_sequence, size):
+    """
+    This function takes in pooled data, the size of the first group, the observed
+    difference in means, a seed, and a block size, and counts how many random relabelings
+    give a difference in means at least as large (in absolute value) as the observed one.
+
+    Parameters
+    ----------
+    pooled : numpy.ndarray
+        Both groups' values, first group first.
+    n_first : int
+        Number of values in the first group.
+    observed : float
+        Observed difference in means (first minus second).
+    seed_sequence : numpy.random.SeedSequence
+        Seed for this block.
+    size : int
+        Number of permutations in this block.
+
+    Returns
+    -------
+    extreme : int
+        Number of permutations at least as extreme as the observed difference.
+
+    """
+    # Each row of the index matrix is one shuffle of the pooled values; the first n_first columns
+    # are the relabeled first group, the rest of each row's total is the second group
+    rng = np.random.default_rng(seed_sequence)
+    indexes = rng.permuted(np.tile(np.arange(pooled.size), (size, 1)), axis=1)
+    first_sums = pooled[indexes[:, :n_first]].sum(axis=1)
+    differences = first_sums / n_first - (pooled.sum() - first_sums) / (pooled.size - n_first)
+    return int(np.count_nonzero(np.abs(differences) >= abs(observed) - 1e-12))
+
+def permutation_test(control_avgs_ls, adhd_avgs_ls, n_resamples=100000, seed=0, workers=1):
+    """
+    This function takes in two groups and runs a two sided permutation test for the
+    difference in their means.
+
+    Parameters
+    ----------
+    control_avgs_ls : list or numpy.ndarray
+        List of averages of the control group.
+    adhd_avgs_ls : list or numpy.ndarray
+        List of averages of the ADHD group.
+    n_resamples : int, optional
+        Number of random permutations. The default is 100000.
+    seed : int, optional
+        Random seed. The default is 0.
+    workers : int, optional
+        Number of worker processes, None uses one per CPU. The default is 1.
+
+    Returns
+    -------
+    result : dict
+        Dictionary with the observed "difference" in means (control minus ADHD), the
+        "p_value", and the "n_resamples".
+
+    """
+    # Source for permutation p values: https://en.wikipedia.org/wiki/Permutation_test
+    control = np.asarray(control_avgs_ls, dtype=np.float64)
+    adhd = np.asarray(adhd_avgs_ls, dtype=np.float64)
+    observed = control.mean() - adhd.mean()
+    pooled = np.concatenate((control, adhd))
+    extreme = sum(run_blocks(permutation_block, (pooled, control.size, observed), n_resamples, seed, workers))
+
+    # The observed labeling counts as one of the permutations, so the p value is never 0
+    return {"difference": float(observed),
+            "p_value": (extreme + 1) / (n_resamples + 1),
+            "n_resamples": n_resamples}
+
+def bootstrap_block(groups, seed_sequence, size):
+    """
+    This function takes in a tuple of groups, a seed, and a block size, and resamples each
+    group with replacement, returning the mean of every resample of every group.
+
+    Parameters
+    ----------
+    groups : tuple
+        Tuple of numpy arrays.
+    seed_sequence : numpy.random.SeedSequence
+        Seed for this block.
+    size : int
+        Number of resamples in this block.
+
+    Returns
+    -------
+    means : numpy.ndarray
+        Array of shape (number of groups, size) of resample means.
+
+    """
+    # Each row of an index matrix is one resample with replacement of that group
+    rng = np.random.default_rng(seed_sequence)
+    return np.array([group[rng.integers(0, group.size, (size, group.size))].mean(axis=1) for group in groups])
+
+def bootstrap_means(groups, n_resamples, seed, workers):
+    """
+    This function takes in a list of groups and returns the means of n_resamples bootstrap
+    resamples of each group.
+
+    Parameters
+    ----------
+    groups : list
+        List of lists or arrays of values.
+    n_resamples : int
+        Number of bootstrap resamples.
+    seed : int
+        Random seed.
+    workers : int
+        Number of worker processes, None uses one per CPU.
+
+    Returns
+    -------
+    means : numpy.ndarray
+        Array of shape (number of groups, n_resamples) of resample means.
+
+    """
+    groups = tuple(np.asarray(group, dtype=np.float64) for group in groups)
+    return np.concatenate(run_blocks(bootstrap_block, (groups,), n_resamples, seed, workers), axis=1)
+
+def bootstrap_mean_ci(avgs_list, n_resamples=100000, confidence=0.95, seed=0, workers=1):
+    """
+    This function takes in a list of averages and finds a percentile bootstrap confidence
+    interval for their mean.
+
+    Parameters
+    ----------
+    avgs_list : list or numpy.ndarray
+        List of averages.
+    n_resamples : int, optional
+        Number of bootstrap resamples. The default is 100000.
+    confidence : float, optional
+        Confidence level of the interval. The default is 0.95.
+    seed : int, optional
+        Random seed. The default is 0.
+    workers : int, optional
+        Number of worker processes, None uses one per CPU. The default is 1.
+
+    Returns
+    -------
+    lower : float
+        Lower end of the confidence interval.
+    upper : float
+        Upper end of the confidence interval.
+
+    """
+    means = bootstrap_means([avgs_list], n_resamples, seed, workers)[0]
+    tail = (1 - confidence) / 2 * 100
+    lower, upper = np.percentile(means, [tail, 100 - tail])
+    return float(lower), float(upper)
+
+def bootstrap_difference_ci(control_avgs_ls, adhd_avgs_ls, n_resamples=100000, confidence=0.95, seed=0, workers=1):
+    """
+    This function takes in two groups and finds a percentile bootstrap confidence interval
+    for the difference in their means (control minus ADHD), resampling each group separately.
+
+    Parameters
+    ----------
+    control_avgs_ls : list or numpy.ndarray
+        List of averages of the control group.
+    adhd_avgs_ls : list or numpy.ndarray
+        List of averages of the ADHD group.
+    n_resamples : int, optional
+        Number of bootstrap resamples. The default is 100000.
+    confidence : float, optional
+        Confidence level of the interval. The default is 0.95.
+    seed : int, optional
+        Random seed. The default is 0.
+    workers : int, optional
+        Number of worker processes, None uses one per CPU. The default is 1.
+
+    Returns
+    -------
+    lower : float
+        Lower end of the confidence interval.
+    upper : float
+        Upper end of the confidence interval.
+
+    """
+    # Source for percentile bootstrap intervals: https://en.wikipedia.org/wiki/Bootstrapping_(statistics)
+    control_means, adhd_means = bootstrap_means([control_avgs_ls, adhd_avgs_ls], n_resamples, seed, workers)
+    tail = (1 - confidence) / 2 * 100
+    lower, upper = np.percentile(control_means - adhd_means, [tail, 100 - tail])
+    return float(lower), float(upper)
+
+def ci_error_bar(avg, ci):
+    """
+    This function takes in an average and a confidence interval around it and turns them
+    into the lower and upper error bar lengths matplotlib's errorbar function takes.
+
+    Parameters
+    ----------
+    avg : float
+        The average the bar is drawn at.
+    ci : tuple
+        Lower and upper ends of the confidence interval.
+
+    Returns
+    -------
+    yerr : numpy.ndarray
+        Array of shape (2, 1) with the lower and upper error bar lengths.
+
+    """
+    return np.array([[avg - ci[0]], [ci[1] - avg]])
@@ -0,0 +1,277 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Sharded (Map/Reduce) Cohort Processing
+
+"""
+# argparse, json, os, and re imported to read options, write and read partial files, and find
+# patient ids in file names, functools imported to send the data directory to pool workers
+import argparse
+import json
+import os
+import re
+from functools import partial
+import finalproject_combine as combine
+from finalproject_cache import write_json
+from finalproject_info import load_patient_info, stratum_ids, value_index
+from finalproject_reader import resolve_input
+from finalproject_sketch import sketch_summary
+from finalproject_stream import merge_accumulators, new_accumulator, stream_statistics
+
+# Version of the partial file layout; partial files from other versions are not merged
+SHARD_VERSION = 1
+
+# Activity file names, compressed or not, with the patient id as the first group
+ACTIVITY_FILE_PATTERN = re.compile(r"patient_activity_(\d+)\.csv(\.gz|\.xz|\.bz2)?")
+
+# Combined csv written for each group by the reduce step, the same names finalproject_combine.py uses
+GROUP_FILES = {"f": "patient_activity_combined_f.csv", "m": "patient_activity_combined_m.csv",
+               "c_f": "patient_activity_c_combined_f.csv", "c_m": "patient_activity_c_combined_m.csv"}
+
+def file_patient_id(filename):
+    """
+    This function takes in an activity file name (or path) and finds its patient id.
+
+    Parameters
+    ----------
+    filename : str
+        Name of a patient activity file, e.g. "data/patient_activity_07.csv" (or a
+        compressed copy such as "data/patient_activity_07.csv.gz").
+
+    Returns
+    -------
+    patient_id : int
+        The patient id.
+
+    Raises
+    ------
+    ValueError
+        If the name is not a patient activity file name.
+
+    """
+    match = ACTIVITY_FILE_PATTERN.fullmatch(os.path.basename(filename))
+    if match is None:
+        raise ValueError("not a patient activity file name: " + filename)
+    return int(match.group(1))
+
+def shard_patient(data_dir, patient_id, sketch_k=None):
+    """
+    This function takes in a data directory and a patient id and finds the running
+    statistics of the patient's activity file there. It is kept at module level so process
+    pool workers can run it.
+
+    Parameters
+    ----------
+    data_dir : str
+        Directory the shard's activity files are in.
+    patient_id : int
+        The patient id.
+    sketch_k : int, optional
+        Size of a quantile sketch to keep as well. The default is None (no sketch).
+
+    Returns
+    -------
+    accumulator : dict or None
+        Accumulator made by the stream_statistics function, None if the file does not
+        exist, cannot be read, or holds no movement data.
+
+    """
+    activity_file = resolve_input(os.path.join(data_dir, "patient_activity_" + str(patient_id).zfill(2) + ".csv"))
+    try:
+        accumulator = stream_statistics(activity_file, sketch_k=sketch_k)
+    except (OSError, ValueError) as error:
+        combine.record_read_error(activity_file, error)
+        return None
+    return accumulator if accumulator["count"] else None
+
+def map_shard(ids, data_dir, info_filename="patient_info.csv", workers=1, sketch_k=None):
+    """
+    This function is the map step: it takes in the patient ids of one shard and the
+    directory their activity files are in, and finds each patient's running statistics
+    and each group's running statistics and patient list.
+
+    Parameters
+    ----------
+    ids : list
+        Integer patient ids of the shard.
+    data_dir : str
+        Directory the shard's activity files are in.
+    info_filename : str, optional
+        Name of the patient info file used to put patients in groups. The default is
+        "patient_info.csv".
+    workers : int, optional
+        Number of worker processes, None uses one per CPU. The default is 1.
+    sketch_k : int, optional
+        Size of the quantile sketch kept in every patient's and group's accumulator (see
+        new_sketch in finalproject_sketch). The default is None (no sketches).
+
+    Returns
+    -------
+    partial_aggregate : dict
+        Dictionary with a "version", the "data_dir", "patients" (patient id string to
+        accumulator), and "groups" (group name to its sorted "patients" ids and the
+        "accumulator" of all their movement data).
+
+    """
+    # Accumulators found for every id using map_patients function, patients without data left out
+    ids = sorted(set(int(patient_id) for patient_id in ids))
+    accumulators = combine.map_patients(partial(shard_patient, data_dir, sketch_k=sketch_k), ids, workers)
+    patients = {str(patient_id): accumulator for patient_id, accumulator in zip(ids, accumulators) if accumulator}
+
+    # Groups found from the patient info using stratum_ids function with each group's conditions
+    info_index = value_index(load_patient_info(info_filename))
+    groups = {}
+    for group, conditions in combine.GROUP_CONDITIONS.items():
+        members = [int(patient_id) for patient_id in stratum_ids(info_index, conditions) if str(patient_id) in patients]
+        accumulator = new_accumulator(sketch_k)
+        for patient_id in members:
+            accumulator = merge_accumulators(accumulator, patients[str(patient_id)])
+        groups[group] = {"patients": members, "accumulator": accumulator}
+    return {"version": SHARD_VERSION, "data_dir": data_dir, "patients": patients, "groups": groups}
+
+def reduce_shards(partial_aggregates):
+    """
+    This function is the reduce step: it takes in any number of partial aggregates made by
+    the map_shard function, in any order, and merges them.
+
+    Parameters
+    ----------
+    partial_aggregates : list
+        List of partial aggregate dictionaries.
+
+    Returns
+    -------
+    group_data : dict
+        Dictionary of group name to its list of (patient id, average, standard deviation)
+        rows, in patient id order, the lists make_lists gives.
+    group_statistics : dict
+        Dictionary of group name to the merged accumulator of all the group's movement data
+        (with a merged quantile sketch if every shard kept sketches).
+    patients : dict
+        Dictionary of patient id string to the patient's accumulator.
+
+    Raises
+    ------
+    ValueError
+        If a partial aggregate is from another version, or two shards have the same patient.
+
+    """
+    patients = {}
+    group_ids = {group: [] for group in combine.GROUP_CONDITIONS}
+    group_statistics = {group: new_accumulator() for group in combine.GROUP_CONDITIONS}
+    for partial_aggregate in partial_aggregates:
+        if partial_aggregate.get("version") != SHARD_VERSION:
+            raise ValueError("partial aggregate version " + str(partial_aggregate.get("version")) + " cannot be merged")
+
+        # A patient in two shards would be counted twice, so shards must not overlap
+        overlap = patients.keys() & partial_aggregate["patients"].keys()
+        if overlap:
+            raise ValueError("patients in more than one shard: " + ", ".join(sorted(overlap, key=int)))
+        patients.update(partial_aggregate["patients"])
+        for group, entry in partial_aggregate["groups"].items():
+            group_ids[group].extend(entry["patients"])
+            group_statistics[group] = merge_accumulators(group_statistics[group], entry["accumulator"])
+
+    # Each group's rows made from its patients' accumulators using accumulator_statistics function
+    group_data = {group: [(patient_id,) + combine.accumulator_statistics(patients[str(patient_id)])
+                          for patient_id in sorted(ids)] for group, ids in group_ids.items()}
+    return group_data, group_statistics, patients
+
+def load_partial(filename):
+    """
+    This function takes in the name of a partial aggregate file and loads it.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the partial aggregate JSON file.
+
+    Returns
+    -------
+    partial_aggregate : dict
+        The partial aggregate, see the map_shard function.
+
+    """
+    with open(filename) as file:
+        return json.load(file)
+
+def main(argv=None):
+    """
+    This function runs the map step ("map") or the reduce step ("reduce") from the command
+    line. The map step writes one partial aggregate file for the chosen patients; the reduce
+    step merges partial aggregate files into the four combined csvs the graphing program reads.
+
+    Parameters
+    ----------
+    argv : list, optional
+        Command line arguments. The default is None (the arguments the program was run with).
+
+    Returns
+    -------
+    None.
+
+    """
+    parser = argparse.ArgumentParser(description="Process a cohort in shards and merge the results.")
+    steps = parser.add_subparsers(dest="step", required=True)
+    map_parser = steps.add_parser("map", help="find the statistics of one shard of patients")
+    chosen = map_parser.add_mutually_exclusive_group(required=True)
+    chosen.add_argument("--ids", metavar="FIRST-LAST", help="patient id range, e.g. 1-40")
+    chosen.add_argument("--files", nargs="+", help="activity files of the shard")
+    chosen.add_argument("--all", action="store_true", help="every activity file in the data directory")
+    map_parser.add_argument("--data-dir", default=".", help="directory the activity files are in (default .)")
+    map_parser.add_argument("--info", default="patient_info.csv", help="patient info file (default patient_info.csv)")
+    map_parser.add_argument("--workers", type=int, default=1, help="worker processes, 0 for one per CPU (default 1)")
+    map_parser.add_argument("--sketch-k", type=int, metavar="K",
+                            help="also keep mergeable quantile sketches of size K for medians and percentiles")
+    map_parser.add_argument("--output", required=True, help="partial aggregate JSON file to write")
+    reduce_parser = steps.add_parser("reduce", help="merge partial aggregate files into the combined csvs")
+    reduce_parser.add_argument("partials", nargs="+", help="partial aggregate JSON files")
+    reduce_parser.add_argument("--output-dir", default=".", help="directory to write the combined csvs to (default .)")
+    reduce_parser.add_argument("--summary", metavar="FILE", help="also write each group's patient count and pooled statistics to a JSON file")
+    args = parser.parse_args(argv)
+
+    if args.step == "map":
+
+        # Shard chosen by id range, by file list (files must share the data directory), or by directory
+        if args.ids:
+            first, last = (int(part) for part in args.ids.split("-"))
+            ids = range(first, last + 1)
+        elif args.files:
+            ids = [file_patient_id(filename) for filename in args.files]
+            directories = {os.path.dirname(filename) for filename in args.files} - {""}
+            if len(directories) == 1 and args.data_dir == ".":
+                args.data_dir = directories.pop()
+        else:
+            ids = [file_patient_id(filename) for filename in os.listdir(args.data_dir)
+                   if ACTIVITY_FILE_PATTERN.fullmatch(filename)]
+        partial_aggregate = map_shard(ids, args.data_dir, args.info, args.workers or None, args.sketch_k)
+        write_json(args.output, partial_aggregate)
+        print("Mapped", len(partial_aggregate["patients"]), "patients from", args.data_dir, "into", args.output)
+    else:
+
+        # Overlapping shards, partial files from another version, or sketches that cannot be
+        # merged are reported as usage errors
+        try:
+            group_data, group_statistics, patients = reduce_shards([load_partial(filename) for filename in args.partials])
+        except ValueError as error:
+            parser.error(str(error))
+        for group, filename in GROUP_FILES.items():
+            combine.create_csv(os.path.join(args.output_dir, filename), group_data[group])
+            
+            # Quantile csvs written too if the shards kept sketches
+            if all("sketch" in patients[str(row[0])] for row in group_data[group]) and "sketch" in group_statistics[group]:
+                combine.create_window_csv(os.path.join(args.output_dir, filename.replace(".csv", "_quantiles.csv")),
+                                          [dict(patient_id=row[0], **sketch_summary(patients[str(row[0])]["sketch"]))
+                                           for row in group_data[group]])
+        if args.summary:
+            write_json(args.summary, {group: dict(zip(("average", "std_dev"), combine.accumulator_statistics(statistics) or (None, None)),
+                                                  patients=len(group_data[group]), minutes=statistics["count"],
+                                                  **(sketch_summary(statistics["sketch"]) if "sketch" in statistics else {}))
+                                      for group, statistics in group_statistics.items()})
+        print("Reduced", len(args.partials), "shards into", sum(len(rows) for rows in group_data.values()), "patients")
+
+# Call to main, only when run as a program so process pool workers can import this file
+if __name__ == "__main__":
+    main()
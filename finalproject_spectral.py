@@ -0,0 +1,223 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Circadian (Cosinor) and Spectral Movement Features
+
+"""
+# numpy imported to put recordings on a regular minute grid and to fit and transform whole
+# batches of patients at once
+import numpy as np
+
+# Minutes in a day, the period of the cosinor fit
+MINUTES_PER_DAY = 1440
+
+# Number of patients transformed at once; the grid and spectrum buffers are this many rows
+BATCH_SIZE = 64
+
+# Period bands (in hours) that spectral power is split into: circadian, ultradian, and faster
+CIRCADIAN_BAND = (20, 28)
+ULTRADIAN_BAND = (2, 20)
+
+# Periods (in hours) searched for the strongest rhythm
+DOMINANT_PERIOD_RANGE = (2, 48)
+
+def regular_grid(movement_data, timestamps):
+    """
+    This function takes in a participant's movement data and timestamps and puts them on a
+    regular one minute grid from the first to the last timestamp.
+
+    Parameters
+    ----------
+    movement_data : numpy.ndarray
+        Movement data for one participant.
+    timestamps : numpy.ndarray
+        Array of datetime64[m] timestamps matching the movement data.
+
+    Returns
+    -------
+    grid : numpy.ndarray
+        Movement on the grid minus the participant's average, 0 (the average) for minutes
+        without data. A minute recorded more than once keeps its last value.
+    observed : numpy.ndarray
+        Boolean array, True for grid minutes that have data.
+    start_minute : int
+        Minute of the day (0 to 1439) of the first grid minute.
+
+    """
+    minutes = np.asarray(timestamps, dtype="datetime64[m]").astype(np.int64)
+    if minutes.size == 0:
+        return np.empty(0), np.empty(0, dtype=bool), 0
+
+    # Each value placed at its minute's offset from the first timestamp
+    positions = minutes - minutes.min()
+    data = np.asarray(movement_data, dtype=np.float64)
+    grid = np.zeros(int(positions.max()) + 1)
+    observed = np.zeros(grid.size, dtype=bool)
+    grid[positions] = data - data.mean()
+    observed[positions] = True
+    return grid, observed, int(minutes.min() % MINUTES_PER_DAY)
+
+def cosinor_fit(grids, observed, start_minutes, lengths):
+    """
+    This function takes in a batch of gridded recordings and fits a 24 hour cosine,
+    movement = mesor + amplitude * cos(2 pi (t - acrophase) / 24 hours), to each of them
+    by least squares over the minutes that have data.
+
+    Parameters
+    ----------
+    grids : numpy.ndarray
+        Array of shape (patients, grid length) made of regular_grid outputs, zero padded.
+    observed : numpy.ndarray
+        Boolean array of the same shape, True for minutes with data.
+    start_minutes : numpy.ndarray
+        Minute of the day of each patient's first grid minute.
+    lengths : numpy.ndarray
+        Grid length of each patient.
+
+    Returns
+    -------
+    mesor : numpy.ndarray
+        Fitted rhythm adjusted average minus the patient's average.
+    amplitude : numpy.ndarray
+        Fitted amplitude of each patient.
+    acrophase : numpy.ndarray
+        Clock time (hours, 0 to 24) of each patient's fitted peak.
+
+    """
+    # Source for cosinor fits: https://en.wikipedia.org/wiki/Cosinor
+    # Source for batched solving: https://numpy.org/doc/stable/reference/generated/numpy.linalg.solve.html
+
+    # Cosine and sine of each grid minute's clock time, then the 3 x 3 normal equations of every
+    # patient built from weighted sums over the batch at once (weights are 0 for missing minutes)
+    angles = 2 * np.pi * (start_minutes[:, None] + np.arange(grids.shape[1])) / MINUTES_PER_DAY
+    weights = observed.astype(np.float64)
+    cos = np.cos(angles) * weights
+    sin = np.sin(angles) * weights
+    columns = (weights, cos, sin)
+    normal = np.empty((grids.shape[0], 3, 3))
+    for row, first in enumerate(columns):
+        for column, second in enumerate(columns):
+            normal[:, row, column] = np.einsum("ij,ij->i", first, second)
+    right = np.stack([np.einsum("ij,ij->i", column, grids) for column in columns], axis=1)
+
+    # Patients without enough data to fit get nan
+    fitted = (lengths > 0) & (np.abs(np.linalg.det(normal)) > 1e-9)
+    solution = np.full((grids.shape[0], 3), np.nan)
+    if fitted.any():
+        solution[fitted] = np.linalg.solve(normal[fitted], right[fitted][:, :, None])[:, :, 0]
+    mesor, beta_cos, beta_sin = solution.T
+    amplitude = np.hypot(beta_cos, beta_sin)
+    acrophase = np.mod(np.arctan2(beta_sin, beta_cos), 2 * np.pi) / (2 * np.pi) * 24
+    return mesor, amplitude, acrophase
+
+def band_masks(n_bins, grid_length):
+    """
+    This function takes in a number of real FFT bins and the grid length they came from and
+    finds which bins fall in each period band.
+
+    Parameters
+    ----------
+    n_bins : int
+        Number of real FFT bins (grid_length // 2 + 1).
+    grid_length : int
+        Number of minutes transformed.
+
+    Returns
+    -------
+    periods : numpy.ndarray
+        Period of each bin in hours (inf for the constant bin).
+    masks : dict
+        Boolean bin masks for "circadian", "ultradian", "fast", "all" (every bin but the
+        constant one), and "dominant" (periods searched for the strongest rhythm).
+
+    """
+    with np.errstate(divide="ignore"):
+        periods = grid_length / np.arange(n_bins) / 60
+    return periods, {"circadian": (periods >= CIRCADIAN_BAND[0]) & (periods <= CIRCADIAN_BAND[1]),
+                     "ultradian": (periods >= ULTRADIAN_BAND[0]) & (periods < CIRCADIAN_BAND[0]),
+                     "fast": periods < ULTRADIAN_BAND[0],
+                     "all": np.isfinite(periods),
+                     "dominant": (periods >= DOMINANT_PERIOD_RANGE[0]) & (periods <= DOMINANT_PERIOD_RANGE[1])}
+
+def spectral_features(recordings, batch_size=BATCH_SIZE):
+    """
+    This function takes in the movement data and timestamps of many patients and finds
+    every patient's circadian (cosinor) and spectral features. Each grid is zero padded to
+    a power of two number of days, a length that depends only on the patient's own
+    recording, so a patient's features do not depend on the other patients in the run;
+    recordings of similar lengths share a padded length and are transformed in batches
+    that reuse the same grid buffer.
+
+    Parameters
+    ----------
+    recordings : list
+        List of (movement data, timestamps) tuples, one per patient.
+    batch_size : int, optional
+        Number of patients transformed at once. The default is BATCH_SIZE.
+
+    Returns
+    -------
+    features : list
+        List of dictionaries (one per recording, in order) with "mesor", "amplitude",
+        "acrophase" (hours), "relative_amplitude" (amplitude over the average),
+        "dominant_period" (hours), and the "circadian_power", "ultradian_power", and
+        "fast_power" fractions of the total spectral power. Recordings without data get nan.
+
+    """
+    # Source for real FFTs: https://numpy.org/doc/stable/reference/generated/numpy.fft.rfft.html
+    grids = [regular_grid(movement_data, timestamps) for movement_data, timestamps in recordings]
+    averages = [float(np.mean(movement_data)) if len(movement_data) else np.nan for movement_data, timestamps in recordings]
+    features = [dict.fromkeys(("mesor", "amplitude", "acrophase", "relative_amplitude", "dominant_period",
+                               "circadian_power", "ultradian_power", "fast_power"), float("nan")) for grid in grids]
+
+    # Patients with at least two grid minutes grouped by their number of days rounded up to a
+    # power of two (a 6 to 8 day recording padded to 8 days, a 9 to 16 day one to 16 days)
+    padded_lengths = {}
+    for index, (grid, observed, start) in enumerate(grids):
+        if grid.size > 1:
+            days = -(-grid.size // MINUTES_PER_DAY)
+            padded_lengths.setdefault((1 << (days - 1).bit_length()) * MINUTES_PER_DAY, []).append(index)
+
+    # The buffers and band masks are made once per padded length and reused for every batch of it
+    for grid_length, members in sorted(padded_lengths.items()):
+        n_bins = grid_length // 2 + 1
+        periods, masks = band_masks(n_bins, grid_length)
+        rows_per_batch = min(batch_size, len(members))
+        grid_buffer = np.zeros((rows_per_batch, grid_length))
+        observed_buffer = np.zeros((rows_per_batch, grid_length), dtype=bool)
+        for first in range(0, len(members), rows_per_batch):
+            batch = members[first:first + rows_per_batch]
+            rows = len(batch)
+            grid_buffer[:] = 0
+            observed_buffer[:] = False
+            for row, index in enumerate(batch):
+                grid, observed, start = grids[index]
+                grid_buffer[row, :grid.size] = grid
+                observed_buffer[row, :grid.size] = observed
+            starts = np.array([grids[index][2] for index in batch] + [0] * (rows_per_batch - rows))
+            lengths = np.array([grids[index][0].size for index in batch] + [0] * (rows_per_batch - rows))
+
+            # Power spectrum of the whole batch in one transform, then split into period bands
+            spectrum = np.fft.rfft(grid_buffer, axis=1)
+            power = spectrum.real ** 2 + spectrum.imag ** 2
+            total = power[:, masks["all"]].sum(axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                fractions = {band: power[:, masks[band]].sum(axis=1) / total for band in ("circadian", "ultradian", "fast")}
+            dominant = periods[masks["dominant"]][np.argmax(power[:, masks["dominant"]], axis=1)] if masks["dominant"].any() \
+                else np.full(rows_per_batch, np.nan)
+            mesor, amplitude, acrophase = cosinor_fit(grid_buffer, observed_buffer, starts, lengths)
+
+            # One dictionary per patient, in the patient's place in the recordings
+            for row, index in enumerate(batch):
+                average = averages[index]
+                features[index] = {"mesor": float(mesor[row] + average),
+                                   "amplitude": float(amplitude[row]),
+                                   "acrophase": float(acrophase[row]),
+                                   "relative_amplitude": float(amplitude[row] / average) if average else float("nan"),
+                                   "dominant_period": float(dominant[row]),
+                                   "circadian_power": float(fractions["circadian"][row]),
+                                   "ultradian_power": float(fractions["ultradian"][row]),
+                                   "fast_power": float(fractions["fast"][row])}
+    return features
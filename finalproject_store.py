@@ -0,0 +1,280 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Memory Mapped Cohort Store
+
+"""
+# json and os imported to keep the store index next to the activity files, numpy imported to
+# write and memory map the whole cohort as two arrays
+import json
+import os
+import numpy as np
+from finalproject_cache import read_cached_activity, write_json
+from finalproject_manifest import input_fingerprint, input_unchanged
+from finalproject_stream import accumulator_statistics, chunk_accumulator
+
+# Folder (made next to the activity files) that holds the cohort store
+STORE_DIR = ".cohort_store"
+
+# Store format version, stores written by another version are built again
+STORE_VERSION = 1
+
+def store_paths(store_dir=STORE_DIR):
+    """
+    This function takes in a store folder and returns the names of the files in it.
+
+    Parameters
+    ----------
+    store_dir : str, optional
+        Folder of the store. The default is STORE_DIR.
+
+    Returns
+    -------
+    index_path : str
+        Name of the JSON index of patient offsets, lengths, and file fingerprints.
+    activity_path : str
+        Name of the .npy file of every patient's movement data, one after another.
+    timestamp_path : str
+        Name of the .npy file of the matching timestamps.
+
+    """
+    return (os.path.join(store_dir, "index.json"),
+            os.path.join(store_dir, "activity.npy"),
+            os.path.join(store_dir, "timestamp.npy"))
+
+def read_store_file(filename):
+    """
+    This function takes in an activity file name and reads its movement data and timestamps
+    with the binary cache. It is the default reader of the build_store function.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the participant's movement data file.
+
+    Returns
+    -------
+    activity : numpy.ndarray
+        Array of int32 movement data, empty if the file does not exist.
+    timestamp : numpy.ndarray
+        Array of datetime64[m] timestamps, empty if the file does not exist.
+
+    """
+    try:
+        return read_cached_activity(filename, timestamps=True)
+    except FileNotFoundError:
+        return np.array([], dtype=np.int32), np.array([], dtype="datetime64[m]")
+
+def build_store(files, read=read_store_file, store_dir=STORE_DIR):
+    """
+    This function takes in the activity file of each patient and writes them into one
+    contiguous movement array, one timestamp array, and an index of where each patient's
+    data starts and how long it is.
+
+    Parameters
+    ----------
+    files : dict
+        Dictionary of patient id to the name of the patient's activity file.
+    read : function, optional
+        Function that takes in a file name and returns the movement data and timestamps.
+        The default is read_store_file.
+    store_dir : str, optional
+        Folder to write the store to. The default is STORE_DIR.
+
+    Returns
+    -------
+    index : dict
+        The index written, with the "version" and, under "patients", each patient id's
+        "offset", "length", and the "fingerprint" the file had when it was read.
+
+    """
+    # Source for writing arrays straight to .npy files: https://numpy.org/doc/stable/reference/generated/numpy.lib.format.open_memmap.html
+    index_path, activity_path, timestamp_path = store_paths(store_dir)
+    os.makedirs(store_dir, exist_ok=True)
+
+    # Every file fingerprinted (before reading, so a file changed while it is read is read
+    # again next time) and read; patients without movement data kept in the index with length 0
+    patients = {}
+    arrays = []
+    offset = 0
+    for patient_id, filename in files.items():
+        fingerprint = input_fingerprint(filename)
+        activity, timestamp = read(filename)
+        patients[str(patient_id)] = {"offset": offset, "length": int(activity.size), "fingerprint": fingerprint}
+        arrays.append((activity, timestamp))
+        offset += activity.size
+
+    # Both arrays filled one patient after another and moved into place, then the index written
+    # last so a store that was only partly written is never used
+    activity_store = np.lib.format.open_memmap(activity_path + ".tmp", mode="w+", dtype=np.int32, shape=(offset,))
+    timestamp_store = np.lib.format.open_memmap(timestamp_path + ".tmp", mode="w+", dtype="datetime64[m]", shape=(offset,))
+    for (activity, timestamp), entry in zip(arrays, patients.values()):
+        activity_store[entry["offset"]:entry["offset"] + entry["length"]] = activity
+        timestamp_store[entry["offset"]:entry["offset"] + entry["length"]] = timestamp
+    activity_store.flush()
+    timestamp_store.flush()
+    del activity_store, timestamp_store
+    os.replace(activity_path + ".tmp", activity_path)
+    os.replace(timestamp_path + ".tmp", timestamp_path)
+    index = {"version": STORE_VERSION, "patients": patients}
+    write_json(index_path, index)
+    return index
+
+def load_store_index(store_dir=STORE_DIR):
+    """
+    This function takes in a store folder and loads its index.
+
+    Parameters
+    ----------
+    store_dir : str, optional
+        Folder of the store. The default is STORE_DIR.
+
+    Returns
+    -------
+    index : dict or None
+        The index written by the build_store function, None if there is no usable store.
+
+    """
+    index_path, activity_path, timestamp_path = store_paths(store_dir)
+    try:
+        with open(index_path) as file:
+            index = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if index.get("version") != STORE_VERSION or not (os.path.exists(activity_path) and os.path.exists(timestamp_path)):
+        return None
+    return index
+
+def store_is_current(index, files):
+    """
+    This function takes in a store index and the activity file of each patient, and checks
+    whether the store holds exactly those patients and none of their files changed.
+
+    Parameters
+    ----------
+    index : dict
+        Index loaded by the load_store_index function.
+    files : dict
+        Dictionary of patient id to the name of the patient's activity file.
+
+    Returns
+    -------
+    current : bool
+        True if the store can be used as it is.
+
+    """
+    patients = index["patients"]
+    if list(patients) != [str(patient_id) for patient_id in files]:
+        return False
+    return all(input_unchanged(filename, patients[str(patient_id)]["fingerprint"])
+               for patient_id, filename in files.items())
+
+def open_store(files, read=read_store_file, store_dir=STORE_DIR, rebuild=False):
+    """
+    This function takes in the activity file of each patient and opens the cohort store,
+    building it first if it is missing, out of date, or a rebuild is asked for.
+
+    Parameters
+    ----------
+    files : dict
+        Dictionary of patient id to the name of the patient's activity file, in the order
+        the patients are stored.
+    read : function, optional
+        Function used to read activity files if the store is built. The default is read_store_file.
+    store_dir : str, optional
+        Folder of the store. The default is STORE_DIR.
+    rebuild : bool, optional
+        Whether to build the store even if it is current. The default is False.
+
+    Returns
+    -------
+    store : dict
+        Dictionary with the memory mapped "activity" and "timestamps" arrays, and the "ids",
+        "offsets", and "lengths" int64 arrays of the patients with movement data (in store
+        order), "rows", a dictionary of patient id to position in those arrays, and
+        "patients", the index entry of every patient (with each file's fingerprint).
+
+    """
+    # Index written again if only modification times changed, so the files are not hashed next time
+    index = None if rebuild else load_store_index(store_dir)
+    recorded = json.dumps(index)
+    if index is None or not store_is_current(index, files):
+        index = build_store(files, read, store_dir)
+    elif json.dumps(index) != recorded:
+        write_json(store_paths(store_dir)[0], index)
+
+    # Arrays memory mapped, so opening the store reads nothing until a patient is sliced
+    # Source for memory mapping: https://numpy.org/doc/stable/reference/generated/numpy.load.html
+    index_path, activity_path, timestamp_path = store_paths(store_dir)
+    entries = [(int(patient_id), entry["offset"], entry["length"])
+               for patient_id, entry in index["patients"].items() if entry["length"] > 0]
+    ids, offsets, lengths = (np.array(column, dtype=np.int64) for column in zip(*entries)) if entries else \
+        (np.empty(0, dtype=np.int64),) * 3
+    return {"activity": np.load(activity_path, mmap_mode="r"),
+            "timestamps": np.load(timestamp_path, mmap_mode="r"),
+            "ids": ids,
+            "offsets": offsets,
+            "lengths": lengths,
+            "rows": {patient_id: row for row, patient_id in enumerate(ids.tolist())},
+            "patients": index["patients"]}
+
+def patient_slice(store, patient_id, timestamps=False):
+    """
+    This function takes in a cohort store and a patient id and returns the patient's
+    movement data without copying or opening any file.
+
+    Parameters
+    ----------
+    store : dict
+        Store opened by the open_store function.
+    patient_id : int
+        The patient id.
+    timestamps : bool, optional
+        Whether to also return the timestamps. The default is False.
+
+    Returns
+    -------
+    activity : numpy.ndarray
+        Read only view of the patient's int32 movement data, empty if the patient has none.
+    timestamp : numpy.ndarray
+        Read only view of the matching timestamps, only returned if timestamps is True.
+
+    """
+    row = store["rows"].get(int(patient_id))
+    if row is None:
+        start = stop = 0
+    else:
+        start = int(store["offsets"][row])
+        stop = start + int(store["lengths"][row])
+    if timestamps:
+        return store["activity"][start:stop], store["timestamps"][start:stop]
+    return store["activity"][start:stop]
+
+def cohort_statistics(store):
+    """
+    This function takes in a cohort store and finds the average and population standard
+    deviation of every patient's movement data, the same way the accumulators do.
+
+    Parameters
+    ----------
+    store : dict
+        Store opened by the open_store function.
+
+    Returns
+    -------
+    averages : numpy.ndarray
+        Average of each patient in store["ids"].
+    std_devs : numpy.ndarray
+        Population standard deviation of each patient in store["ids"].
+
+    """
+    # Each patient's slice of the memory mapped store (patients without movement data are not in
+    # it) made into an accumulator using chunk_accumulator function, one patient at a time, so the
+    # exact integer sum and the dot product of the deviations match every other mode
+    statistics = [accumulator_statistics(chunk_accumulator(store["activity"][offset:offset + length]))
+                  for offset, length in zip(store["offsets"].tolist(), store["lengths"].tolist())]
+    averages = np.array([average for average, std_dev in statistics], dtype=np.float64)
+    std_devs = np.array([std_dev for average, std_dev in statistics], dtype=np.float64)
+    return averages, std_devs
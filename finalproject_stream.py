@@ -0,0 +1,209 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Streaming Movement Statistics
+
+"""
+# numpy imported to reduce each chunk of movement data at once
+import numpy as np
+from finalproject_reader import iter_parsed_chunks, open_input, resolve_input
+from finalproject_sketch import merge_sketches, new_sketch, update_sketch
+
+# Number of bytes read from an activity file at a time when streaming
+CHUNK_SIZE = 1 << 20
+
+def new_accumulator(sketch_k=None):
+    """
+    This function creates an empty running statistics accumulator.
+
+    Parameters
+    ----------
+    sketch_k : int, optional
+        Size of a quantile sketch to keep as well (see new_sketch in finalproject_sketch).
+        The default is None (no sketch).
+
+    Returns
+    -------
+    accumulator : dict
+        Accumulator with the "count", exact integer "total", "mean", "m2" (sum of squared
+        differences from the mean), "min", and "max" of the movement data seen so far, and
+        the quantile "sketch" of it if asked for.
+
+    """
+    accumulator = {"count": 0, "total": 0, "mean": 0.0, "m2": 0.0, "min": None, "max": None}
+    if sketch_k:
+        accumulator["sketch"] = new_sketch(sketch_k)
+    return accumulator
+
+def chunk_accumulator(movement_data, sketch_k=None):
+    """
+    This function takes in a chunk of movement data and creates an accumulator for it.
+
+    Parameters
+    ----------
+    movement_data : list or numpy.ndarray
+        Chunk of movement data.
+    sketch_k : int, optional
+        Size of a quantile sketch of the chunk to keep as well. The default is None (no sketch).
+
+    Returns
+    -------
+    accumulator : dict
+        Accumulator for the chunk, see the new_accumulator function.
+
+    """
+    movement_data = np.asarray(movement_data, dtype=np.int64)
+    if movement_data.size == 0:
+        return new_accumulator(sketch_k)
+
+    # Integer sum is exact, so the mean matches dividing the sum by the length;
+    # squared differences from the chunk mean summed with a dot product
+    total = int(movement_data.sum())
+    mean = total / movement_data.size
+    deviations = movement_data - mean
+    return {"count": int(movement_data.size),
+            "total": total,
+            "mean": mean,
+            "m2": float(np.dot(deviations, deviations)),
+            "min": int(movement_data.min()),
+            "max": int(movement_data.max()),
+            **({"sketch": update_sketch(new_sketch(sketch_k), movement_data)} if sketch_k else {})}
+
+def merge_accumulators(first, second):
+    """
+    This function takes in two accumulators and combines them into one, as if all of
+    their movement data had been seen by a single accumulator. Chunks, files, and shards
+    can be combined in any order.
+
+    Parameters
+    ----------
+    first : dict
+        Accumulator made by the new_accumulator or chunk_accumulator function.
+    second : dict
+        Accumulator made by the new_accumulator or chunk_accumulator function.
+
+    Returns
+    -------
+    accumulator : dict
+        Combined accumulator.
+
+    """
+    # Source for combining variances: https://en.wikipedia.org/wiki/Algorithms_for_calculating_variance#Parallel_algorithm
+    if first["count"] == 0:
+        return dict(second)
+    if second["count"] == 0:
+        return dict(first)
+
+    # Means combined weighted by counts, and the squared differences corrected for the
+    # distance between the two means
+    count = first["count"] + second["count"]
+    delta = second["mean"] - first["mean"]
+    merged = {"count": count,
+              "total": first["total"] + second["total"],
+              "mean": first["mean"] + delta * second["count"] / count,
+              "m2": first["m2"] + second["m2"] + delta * delta * first["count"] * second["count"] / count,
+              "min": min(first["min"], second["min"]),
+              "max": max(first["max"], second["max"])}
+    
+    # Sketches merged only if both sides have one, since a side without a sketch has data the
+    # merged sketch would be missing
+    if "sketch" in first and "sketch" in second:
+        merged["sketch"] = merge_sketches(first["sketch"], second["sketch"])
+    return merged
+
+def update_accumulator(accumulator, movement_data):
+    """
+    This function takes in an accumulator and a chunk of movement data and returns the
+    accumulator with the chunk added.
+
+    Parameters
+    ----------
+    accumulator : dict
+        Accumulator made by the new_accumulator function.
+    movement_data : list or numpy.ndarray
+        Chunk of movement data.
+
+    Returns
+    -------
+    accumulator : dict
+        Updated accumulator.
+
+    """
+    # Chunk sketched (if the accumulator keeps a sketch) in the same pass as its other statistics
+    return merge_accumulators(accumulator, chunk_accumulator(movement_data, accumulator["sketch"]["k"] if "sketch" in accumulator else None))
+
+def accumulator_statistics(accumulator):
+    """
+    This function takes in an accumulator and finds the average and (population) standard
+    deviation of the movement data it has seen.
+
+    Parameters
+    ----------
+    accumulator : dict
+        Accumulator made by the functions in this file.
+
+    Returns
+    -------
+    average : float
+        The calculated average of the movement data.
+    std_dev : float
+        The calculated standard deviation of the movement data.
+
+    """
+    # Nothing returned for empty accumulators, the same as calculate_statistics does for empty lists
+    if accumulator["count"] > 0:
+        average = accumulator["total"] / accumulator["count"]
+        std_dev = (accumulator["m2"] / accumulator["count"]) ** 0.5
+        return average, std_dev
+
+def iter_activity_chunks(file, chunk_size=CHUNK_SIZE):
+    """
+    This function takes in an open binary activity file, reads it in fixed size blocks,
+    and parses each block into an array of movement data. Lines cut off at the end of a
+    block are carried over to the next block, so memory use does not grow with file size.
+
+    Parameters
+    ----------
+    file : file object
+        Activity file opened in binary mode (or a decompressing file object made by the
+        open_input function), positioned at the start of the header line.
+    chunk_size : int, optional
+        Number of bytes to read at a time. The default is CHUNK_SIZE.
+
+    Yields
+    ------
+    movement_data : numpy.ndarray
+        Array of int32 movement data for the complete lines of one block.
+
+    """
+    yield from iter_parsed_chunks(file, chunk_size)
+
+def stream_statistics(filename, chunk_size=CHUNK_SIZE, sketch_k=None):
+    """
+    This function takes in an activity file name and finds the running statistics of
+    the movement data in it, one block at a time.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the participant's movement data file (a compressed copy is read if
+        only that exists).
+    chunk_size : int, optional
+        Number of bytes to read at a time. The default is CHUNK_SIZE.
+    sketch_k : int, optional
+        Size of a quantile sketch to keep as well. The default is None (no sketch).
+
+    Returns
+    -------
+    accumulator : dict
+        Accumulator for the whole file, see the new_accumulator function.
+
+    """
+    # Compressed files decompressed block by block straight into the parser using open_input function
+    accumulator = new_accumulator(sketch_k)
+    with open_input(resolve_input(filename)) as file:
+        for movement_data in iter_activity_chunks(file, chunk_size):
+            accumulator = update_accumulator(accumulator, movement_data)
+    return accumulator
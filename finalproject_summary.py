@@ -0,0 +1,77 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Typed Summary Files Shared by the Combining and Graphing Programs
+
+"""
+# csv imported to write summary files, numpy imported to load their columns as arrays,
+# warnings imported to quiet numpy about summary files with no rows
+import csv
+import warnings
+import numpy as np
+
+# Named columns of a combined patient activity summary file
+SUMMARY_COLUMNS = ("patient_id", "average", "std_dev")
+
+def write_summary(filename, rows, columns=SUMMARY_COLUMNS):
+    """
+    This function takes in a file name to create and a list of rows, and writes them as
+    a csv file with a header of named numeric columns.
+
+    Parameters
+    ----------
+    filename : str
+        Name of file to create.
+    rows : list
+        List of rows (tuples of numbers in the order of columns) to write.
+    columns : tuple, optional
+        Names of the columns. The default is SUMMARY_COLUMNS.
+
+    Returns
+    -------
+    None.
+
+    """
+    # Technique to write csv source: https://docs.python.org/3/library/csv.html
+    # Floats are written with repr, so they read back exactly
+    with open(filename, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+def read_summary(filename):
+    """
+    This function takes in a summary file name and loads every column of the file into
+    a numpy array in one read.
+
+    Parameters
+    ----------
+    filename : str
+        Name of a file written by the write_summary function (or any csv of numeric
+        columns with a header row, empty cells are not allowed).
+
+    Returns
+    -------
+    summary : dict
+        Dictionary with the column names as the keys and float64 arrays as the values
+        ("patient_id" is converted to an int64 array).
+
+    """
+    with open(filename) as file:
+        header = file.readline().strip().split(",")
+        if not header or header[0] != "patient_id":
+            raise ValueError(filename + " is not a summary file, run finalproject_combine.py to remake it")
+
+        # Source for loadtxt: https://numpy.org/doc/stable/reference/generated/numpy.loadtxt.html
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            values = np.loadtxt(file, delimiter=",", ndmin=2)
+
+    # Files without rows give an empty column for every header name
+    if values.size == 0:
+        values = np.empty((0, len(header)))
+    summary = {name: values[:, index] for index, name in enumerate(header)}
+    summary["patient_id"] = summary["patient_id"].astype(np.int64)
+    return summary
@@ -0,0 +1,155 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Following Activity Files as They Grow
+
+"""
+# json and os imported to keep each file's read position between runs and to check file sizes
+import json
+import os
+from finalproject_cache import write_json
+from finalproject_reader import compression_suffix, parse_activity_bytes, resolve_input
+from finalproject_stream import new_accumulator, update_accumulator
+
+# File holding every followed file's read position and running statistics, and a version
+# number that is raised whenever what is kept in it changes
+TAIL_STATE_FILE = ".tail_state.json"
+TAIL_STATE_VERSION = 1
+
+# Number of bytes at the start of a file kept to notice a file replaced by a new recording
+HEAD_SIZE = 256
+
+def new_tail():
+    """
+    This function creates the state of a file that has not been read yet.
+
+    Returns
+    -------
+    tail : dict
+        Dictionary with the byte "offset" read up to (always just after a newline), the
+        "head" (first bytes of the file, as text) seen when reading, and the "accumulator"
+        of the movement data read so far (see new_accumulator in finalproject_stream).
+
+    """
+    return {"offset": 0, "head": "", "accumulator": new_accumulator()}
+
+def read_head(file, size):
+    """
+    This function takes in an open binary file and reads its first bytes as text.
+
+    Parameters
+    ----------
+    file : file object
+        File opened in binary mode.
+    size : int
+        Number of bytes to read.
+
+    Returns
+    -------
+    head : str
+        The bytes read, decoded as latin-1 so any bytes can be kept in JSON.
+
+    """
+    file.seek(0)
+    return file.read(size).decode("latin-1")
+
+def tail_file(filename, tail):
+    """
+    This function takes in an activity file name and its state, parses only the complete
+    lines added since it was last read, and adds them to its running statistics. A file
+    that shrank or whose first bytes changed was replaced, so it is read again from the start.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the participant's movement data file.
+    tail : dict
+        State made by the new_tail function (or returned by this function).
+
+    Returns
+    -------
+    tail : dict
+        Updated state (a new dictionary, the given one is not changed).
+    new_rows : int
+        Number of movement values added; -1 if the file was read again from the start.
+
+    Raises
+    ------
+    OSError
+        If the file cannot be opened.
+    ValueError
+        If the file is compressed (compressed files are archives, not growing recordings).
+
+    """
+    # A file only found as a compressed copy is an archive, not a growing recording
+    filename = resolve_input(filename)
+    if compression_suffix(filename):
+        raise ValueError("compressed files cannot be followed: " + filename)
+    restarted = False
+    with open(filename, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+
+        # A shorter file, or one starting with different bytes, is a new recording
+        if size < tail["offset"] or read_head(file, min(HEAD_SIZE, tail["offset"])) != tail["head"][:tail["offset"]]:
+            tail = new_tail()
+            restarted = True
+        if size == tail["offset"]:
+            return tail, -1 if restarted else 0
+
+        # Only the bytes after the offset read, and cut after their last newline so a line still
+        # being written is left for the next read
+        file.seek(tail["offset"])
+        block = file.read(size - tail["offset"])
+        last_newline = block.rfind(b"\n")
+        if last_newline < 0:
+            return tail, -1 if restarted else 0
+        movement_data = parse_activity_bytes(block[:last_newline + 1], skip_header=tail["offset"] == 0)
+        offset = tail["offset"] + last_newline + 1
+        head = tail["head"] if len(tail["head"]) >= HEAD_SIZE else read_head(file, min(HEAD_SIZE, offset))
+    return ({"offset": offset, "head": head, "accumulator": update_accumulator(tail["accumulator"], movement_data)},
+            -1 if restarted else int(movement_data.size))
+
+def load_tail_state(filename=TAIL_STATE_FILE):
+    """
+    This function takes in a tail state file name and loads every followed file's state,
+    starting from nothing if the file does not exist, cannot be read, or is from older code.
+
+    Parameters
+    ----------
+    filename : str, optional
+        Name of the tail state file. The default is TAIL_STATE_FILE.
+
+    Returns
+    -------
+    tails : dict
+        Dictionary of activity file name to state made by the tail_file function.
+
+    """
+    try:
+        with open(filename) as file:
+            state = json.load(file)
+        if state.get("version") == TAIL_STATE_VERSION:
+            return state["files"]
+    except (OSError, ValueError):
+        pass
+    return {}
+
+def save_tail_state(tails, filename=TAIL_STATE_FILE):
+    """
+    This function takes in every followed file's state and writes them to the tail state file.
+
+    Parameters
+    ----------
+    tails : dict
+        Dictionary of activity file name to state made by the tail_file function.
+    filename : str, optional
+        Name of the tail state file. The default is TAIL_STATE_FILE.
+
+    Returns
+    -------
+    None.
+
+    """
+    write_json(filename, {"version": TAIL_STATE_VERSION, "files": tails})
@@ -0,0 +1,125 @@
+"""
+@authors: Mikayla Karkoski and Hannah Wimpy
+Author emails: karkoski.m@northeastern.edu & wimpy.h@northeastern.edu
+NUIDs: 002179361 and 002277836
+DS2001 Programming with Data Practicum
+Final Project Code; Time Windowed Movement Statistics
+
+"""
+# numpy imported to bucket movement data by time window without looping over minutes
+import numpy as np
+
+# Hours (24 hour clock) that daytime starts and ends at, the rest of the day is nighttime
+DAYTIME_START = 8
+DAYTIME_END = 22
+
+# Weekday number (Monday is 0) that the weekend starts on, and what weekday 1970-01-01 was
+WEEKEND_START = 5
+EPOCH_WEEKDAY = 3
+
+def grouped_statistics(keys, movement_data, n_groups):
+    """
+    This function takes in a group number for each movement value and finds the average,
+    standard deviation, and count of every group at once.
+
+    Parameters
+    ----------
+    keys : numpy.ndarray
+        Integer group number (0 to n_groups - 1) of each movement value.
+    movement_data : numpy.ndarray
+        Movement data for one participant.
+    n_groups : int
+        Number of groups.
+
+    Returns
+    -------
+    averages : numpy.ndarray
+        Average of each group, nan for groups without data.
+    std_devs : numpy.ndarray
+        Population standard deviation of each group, nan for groups without data.
+
+    """
+    # Source for bincount: https://numpy.org/doc/stable/reference/generated/numpy.bincount.html
+
+    # Counts and sums of each group found with bincount, then squared differences from each
+    # group's own average summed the same way (two array passes, numerically stable)
+    movement_data = np.asarray(movement_data, dtype=np.float64)
+    counts = np.bincount(keys, minlength=n_groups)
+    sums = np.bincount(keys, weights=movement_data, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        averages = sums / counts
+        deviations = movement_data - averages[keys]
+        variances = np.bincount(keys, weights=deviations * deviations, minlength=n_groups) / counts
+    return averages, np.sqrt(variances)
+
+def window_keys(timestamps):
+    """
+    This function takes in the timestamps of a participant's movement data and finds
+    which hour of day, daytime or nighttime, recording day, and weekday or weekend each
+    minute falls in.
+
+    Parameters
+    ----------
+    timestamps : numpy.ndarray
+        Array of datetime64[m] timestamps.
+
+    Returns
+    -------
+    keys : dict
+        Dictionary of integer key arrays: "hour" (0 to 23), "daytime" (1 for daytime,
+        0 for nighttime), "day" (0 for the first recording day), and "weekend" (1 for
+        Saturday and Sunday, 0 otherwise).
+
+    """
+    # Minutes since 1970 split into whole days and minute of day
+    minutes = np.asarray(timestamps, dtype="datetime64[m]").astype(np.int64)
+    days, minute_of_day = np.divmod(minutes, 1440)
+    hours = minute_of_day // 60
+    return {"hour": hours,
+            "daytime": ((hours >= DAYTIME_START) & (hours < DAYTIME_END)).astype(np.int64),
+            "day": days - days.min() if days.size else days,
+            "weekend": ((days + EPOCH_WEEKDAY) % 7 >= WEEKEND_START).astype(np.int64)}
+
+def window_statistics(movement_data, timestamps):
+    """
+    This function takes in a participant's movement data and timestamps and finds the
+    average and standard deviation of movement in each time window: each hour of the day,
+    daytime and nighttime, each recording day, and weekdays and weekends.
+
+    Parameters
+    ----------
+    movement_data : numpy.ndarray
+        Movement data for one participant.
+    timestamps : numpy.ndarray
+        Array of datetime64[m] timestamps matching the movement data.
+
+    Returns
+    -------
+    window_stats : dict
+        Dictionary with "<window>_mean" and "<window>_std" entries for the windows
+        hour_00 to hour_23, daytime, nighttime, weekday, weekend, and day01, day02, ...
+        for each recording day. Windows without data are nan.
+
+    """
+    keys = window_keys(timestamps)
+    window_stats = {}
+
+    def add(names, averages, std_devs):
+        # Each window's average and standard deviation added under its name
+        for name, avg, std in zip(names, averages, std_devs):
+            window_stats[name + "_mean"] = float(avg)
+            window_stats[name + "_std"] = float(std)
+
+    # Hour of day, daytime/nighttime, and weekday/weekend windows have a fixed number of groups
+    averages, std_devs = grouped_statistics(keys["hour"], movement_data, 24)
+    add(["hour_" + str(hour).zfill(2) for hour in range(24)], averages, std_devs)
+    averages, std_devs = grouped_statistics(keys["daytime"], movement_data, 2)
+    add(["nighttime", "daytime"], averages, std_devs)
+    averages, std_devs = grouped_statistics(keys["weekend"], movement_data, 2)
+    add(["weekday", "weekend"], averages, std_devs)
+
+    # Recording days numbered from the first day of the recording
+    n_days = int(keys["day"].max()) + 1 if keys["day"].size else 0
+    averages, std_devs = grouped_statistics(keys["day"], movement_data, n_days)
+    add(["day" + str(day + 1).zfill(2) for day in range(n_days)], averages, std_devs)
+    return window_stats
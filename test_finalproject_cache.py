@@ -0,0 +1,44 @@
+"""
+Tests for finalproject_cache.py; run with python -m pytest.
+
+"""
+import json
+import os
+import numpy as np
+import pytest
+from finalproject_cache import cache_paths, read_cached_activity
+from finalproject_reader import read_activity_file
+
+RAW = b"TIMESTAMP;ACTIVITY\r\n02-23-2009 16:00;0\r\n02-23-2009 16:01;195\r\n02-23-2009 16:02;7\r\n"
+
+def test_touched_file_is_reused_and_changed_file_is_read_again(tmp_path):
+    filename = str(tmp_path / "patient_activity_01.csv")
+    with open(filename, "wb") as file:
+        file.write(RAW)
+    assert read_cached_activity(filename).tolist() == [0, 195, 7]
+    meta_path, activity_path, timestamp_path = cache_paths(filename)
+
+    # Only the modification time changed: the entry is used and its time refreshed
+    os.utime(filename, ns=(1, 1))
+    assert read_cached_activity(filename).tolist() == [0, 195, 7]
+    with open(meta_path) as file:
+        assert json.load(file)["mtime_ns"] == 1
+
+    # Contents changed without changing the size or the time: the hash tells them apart
+    with open(filename, "wb") as file:
+        file.write(RAW.replace(b";195", b";196"))
+    os.utime(filename, ns=(1, 2))
+    assert read_cached_activity(filename).tolist() == [0, 196, 7]
+    activity, timestamps = read_cached_activity(filename, timestamps=True)
+    assert timestamps[-1] == np.datetime64("2009-02-23T16:02")
+
+def test_unparsed_timestamps_do_not_break_cached_reads(tmp_path):
+    filename = str(tmp_path / "patient_activity_01.csv")
+    with open(filename, "wb") as file:
+        file.write(RAW.replace(b"02-23-2009 16:01", b"2-23-2009 16:01"))
+
+    # Activity read the same with or without the cache, and nothing cached for it
+    assert np.array_equal(read_cached_activity(filename), read_activity_file(filename))
+    assert not os.path.exists(cache_paths(filename)[0])
+    with pytest.raises(ValueError):
+        read_cached_activity(filename, timestamps=True)
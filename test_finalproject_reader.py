@@ -0,0 +1,59 @@
+"""
+Tests for finalproject_reader.py; run with python -m pytest.
+
+"""
+import bz2
+import gzip
+import lzma
+import numpy as np
+import pytest
+from finalproject_reader import parse_activity_bytes, read_activity_file
+
+# Timestamps that are not zero padded are never parsed when only activity is asked for
+LOOSE_TIMESTAMPS = b"TIMESTAMP;ACTIVITY\r\n2-23-2009 16:00;0\r\n02-23-2009 16:01;195\r\n02-23-2009 16:2;\r\n02-23-2009 16:03;-4\r\n"
+
+@pytest.mark.parametrize("suffix, compress", [(".gz", gzip.compress), (".xz", lzma.compress), (".bz2", bz2.compress)])
+def test_compressed_and_plain_inputs_match(tmp_path, suffix, compress):
+    for raw in (LOOSE_TIMESTAMPS, open("patient_activity_01.csv", "rb").read()):
+        plain = tmp_path / "patient_activity_01.csv"
+        plain.write_bytes(raw)
+        compressed = tmp_path / ("patient_activity_01.csv" + suffix)
+        compressed.write_bytes(compress(raw))
+        expected = read_activity_file(str(plain))
+        assert np.array_equal(read_activity_file(str(compressed)), expected)
+
+    # Well formed files give the same timestamps too
+    activity, timestamps = read_activity_file(str(compressed), timestamps=True)
+    assert np.array_equal(activity, expected)
+    assert np.array_equal(timestamps, read_activity_file(str(plain), timestamps=True)[1])
+
+def baseline_activity(raw):
+    # The per-line loop the vectorized reader replaced
+    cells = [line.strip().split(";") for line in raw.decode().split("\n")[1:] if line.strip()]
+    return [int(cell[1]) for cell in cells if cell[1] != ""]
+
+def test_edge_cells_parse_like_the_per_line_loop():
+    raw = (b"TIMESTAMP;ACTIVITY\r\n02-23-2009 16:00; 5\r\n02-23-2009 16:01;+5\r\n02-23-2009 16:02;\t-7 \r\n"
+           b"  02-23-2009 16:03;0012\t\r\n02-23-2009 16:04;\r\n02-23-2009 16:05;-0 \n02-23-2009 16:06;8")
+    activity, timestamps = parse_activity_bytes(raw, timestamps=True)
+    assert activity.tolist() == baseline_activity(raw) == [5, 5, -7, 12, 0, 8]
+    assert timestamps.tolist() == [np.datetime64("2009-02-23T16:00") + minute for minute in (0, 1, 2, 3, 5, 6)]
+
+@pytest.mark.parametrize("cell", [b"-", b"+", b"- 5", b"5 5", b"5a", b" "])
+def test_cells_that_are_not_integers_are_rejected(cell):
+    with pytest.raises(ValueError):
+        parse_activity_bytes(b"TIMESTAMP;ACTIVITY\n02-23-2009 16:00;" + cell + b";x\n")
+
+@pytest.mark.parametrize("timestamp", [b"13-01-2009 16:00", b"00-01-2009 16:00", b"01-32-2009 16:00", b"04-31-2009 16:00",
+                                       b"02-29-2009 16:00", b"02-29-1900 16:00", b"02-23-2009 24:00", b"02-23-2009 16:60",
+                                       b"02/23/2009 16:00", b"02-23-2009T16:00", b"02-2a-2009 16:00"])
+def test_invalid_timestamps_are_rejected(timestamp):
+    raw = b"TIMESTAMP;ACTIVITY\n" + timestamp + b";1\n"
+    assert parse_activity_bytes(raw).tolist() == [1]
+    with pytest.raises(ValueError):
+        parse_activity_bytes(raw, timestamps=True)
+
+def test_leap_days_are_accepted():
+    raw = b"TIMESTAMP;ACTIVITY\n02-29-2000 00:00;1\n02-29-2008 23:59;2\n"
+    assert parse_activity_bytes(raw, timestamps=True)[1].tolist() == [np.datetime64("2000-02-29T00:00"),
+                                                                       np.datetime64("2008-02-29T23:59")]
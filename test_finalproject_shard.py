@@ -0,0 +1,30 @@
+"""
+Tests for finalproject_shard.py; run with python -m pytest.
+
+"""
+import os
+import pytest
+from finalproject_cache import write_json
+from finalproject_shard import main, map_shard, reduce_shards
+
+def test_overlapping_shards_are_a_usage_error(tmp_path, capsys):
+    first, second = map_shard([1, 2], "."), map_shard([2, 3], ".")
+    with pytest.raises(ValueError, match="patients in more than one shard: 2"):
+        reduce_shards([first, second])
+
+    # From the command line the overlap is reported by argparse and no csv is written
+    write_json(str(tmp_path / "first.json"), first)
+    write_json(str(tmp_path / "second.json"), second)
+    with pytest.raises(SystemExit) as exit_info:
+        main(["reduce", str(tmp_path / "first.json"), str(tmp_path / "second.json"), "--output-dir", str(tmp_path)])
+    assert exit_info.value.code == 2
+    assert "patients in more than one shard: 2" in capsys.readouterr().err
+    assert not any(name.endswith(".csv") for name in os.listdir(tmp_path))
+
+def test_disjoint_shards_reduce(tmp_path):
+    write_json(str(tmp_path / "first.json"), map_shard([1, 2], "."))
+    write_json(str(tmp_path / "second.json"), map_shard([3, 4], "."))
+    main(["reduce", str(tmp_path / "first.json"), str(tmp_path / "second.json"), "--output-dir", str(tmp_path)])
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".csv")) == sorted(
+        ["patient_activity_combined_f.csv", "patient_activity_combined_m.csv",
+         "patient_activity_c_combined_f.csv", "patient_activity_c_combined_m.csv"])
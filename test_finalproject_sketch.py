@@ -0,0 +1,63 @@
+"""
+Tests for finalproject_sketch.py; run with python -m pytest.
+
+"""
+import json
+from functools import reduce
+import numpy as np
+from finalproject_cache import write_json
+from finalproject_sketch import (level_capacity, merge_sketches, new_sketch, sketch_levels, sketch_quantiles,
+                                 update_sketch)
+
+QUANTILES = np.linspace(0.01, 0.99, 99)
+
+def skewed_data(n_values, seed=0):
+    # Mostly still minutes, then a long tail of movement, like the activity files
+    rng = np.random.default_rng(seed)
+    return np.where(rng.random(n_values) < 0.4, 0, np.round(rng.lognormal(4, 1.5, n_values)))
+
+def worst_rank_error(data, estimates):
+    # Distance from each quantile to the range of ranks its estimate has in the data (ties give a range)
+    data = np.sort(data)
+    low = np.searchsorted(data, estimates, side="left") / data.size
+    high = np.searchsorted(data, estimates, side="right") / data.size
+    return float(np.max(np.maximum(low - QUANTILES, 0) + np.maximum(QUANTILES - high, 0)))
+
+def check_capacities(sketch):
+    levels = sketch_levels(sketch)
+    assert all(level.size <= level_capacity(sketch["k"], number, len(levels)) for number, level in enumerate(levels))
+
+def test_small_sketches_are_exact():
+    data = skewed_data(100)
+    assert np.array_equal(sketch_quantiles(update_sketch(new_sketch(), data), QUANTILES),
+                          np.quantile(data, QUANTILES, method="inverted_cdf"))
+    assert np.isnan(sketch_quantiles(new_sketch(), [0.5])).all()
+
+def test_merged_sketches_stay_within_the_error_bound():
+    data = skewed_data(200000)
+    parts = []
+    for chunk in np.array_split(data, 20):
+        # Each part streamed in pieces of uneven size, as file chunks are
+        sketch = new_sketch(200)
+        for piece in np.array_split(chunk, [1000, 1500, 7000]):
+            sketch = update_sketch(sketch, piece)
+        check_capacities(sketch)
+        parts.append(sketch)
+    merged = reduce(merge_sketches, parts)
+    check_capacities(merged)
+    assert merged["count"] == data.size
+    assert sum(level.size for level in sketch_levels(merged)) <= 3 * merged["k"]
+    assert worst_rank_error(data, sketch_quantiles(merged, QUANTILES)) <= 0.02
+
+    # Merging with a smaller sketch keeps the smaller k
+    assert merge_sketches(merged, update_sketch(new_sketch(50), data[:10]))["k"] == 50
+
+def test_sketches_load_back_from_json(tmp_path):
+    sketch = update_sketch(new_sketch(50), skewed_data(5000))
+    write_json(str(tmp_path / "sketch.json"), sketch)
+    with open(tmp_path / "sketch.json") as file:
+        loaded = json.load(file)
+    assert np.array_equal(sketch_quantiles(loaded, QUANTILES), sketch_quantiles(sketch, QUANTILES))
+    merged = merge_sketches(loaded, sketch)
+    assert merged["count"] == 10000
+    check_capacities(merged)
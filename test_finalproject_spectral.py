@@ -0,0 +1,38 @@
+"""
+Tests for finalproject_spectral.py; run with python -m pytest.
+
+"""
+import numpy as np
+from finalproject_combine import read_movement
+from finalproject_spectral import spectral_features
+
+def synthetic_recording(n_minutes, start, seed):
+    # Movement with a 24 hour rhythm plus noise, one value per minute from the start time
+    rng = np.random.default_rng(seed)
+    minutes = np.arange(n_minutes)
+    movement = np.maximum(0, 200 + 150 * np.cos(2 * np.pi * (minutes - 900) / 1440) + rng.normal(0, 50, n_minutes))
+    return movement.astype(np.int32), np.datetime64(start, "m") + minutes
+
+def test_features_do_not_depend_on_other_patients():
+    recordings = [synthetic_recording(3000, "2009-02-25T10:54", 0),
+                  synthetic_recording(20000, "2009-03-01T00:00", 1),
+                  synthetic_recording(9000, "2009-03-05T17:30", 2)]
+    alone = spectral_features(recordings[:1])[0]
+    for together in (spectral_features(recordings)[0], spectral_features(recordings[::-1])[2],
+                     spectral_features(recordings, batch_size=1)[0]):
+        for name, value in alone.items():
+            assert np.isclose(together[name], value, rtol=1e-9, equal_nan=True), name
+
+def test_real_patient_alone_and_in_cohort():
+    recordings = [read_movement(name, timestamps=True, use_cache=False)
+                  for name in ("patient_activity_01.csv", "patient_activity_02.csv", "patient_activity_98.csv")]
+    alone = spectral_features(recordings[:1])[0]
+    together = spectral_features(recordings)[0]
+    for name, value in alone.items():
+        assert np.isclose(together[name], value, rtol=1e-9, equal_nan=True), name
+
+def test_empty_recording_gives_nan():
+    empty = (np.array([], dtype=np.int32), np.array([], dtype="datetime64[m]"))
+    features = spectral_features([empty, synthetic_recording(3000, "2009-02-25T00:00", 0)])
+    assert all(np.isnan(value) for value in features[0].values())
+    assert 20 <= features[1]["dominant_period"] <= 28
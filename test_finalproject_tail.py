@@ -0,0 +1,57 @@
+"""
+Tests for finalproject_tail.py; run with python -m pytest.
+
+"""
+import gzip
+import pytest
+from finalproject_stream import chunk_accumulator
+from finalproject_tail import new_tail, tail_file
+
+HEADER = b"TIMESTAMP;ACTIVITY\r\n"
+
+def rows(values, hour=16):
+    return b"".join(b"02-23-2009 %02d:%02d;%d\r\n" % (hour, minute, value) for minute, value in enumerate(values))
+
+def test_growth_is_read_incrementally(tmp_path):
+    path = tmp_path / "patient_activity_01.csv"
+    path.write_bytes(HEADER + rows([1, 2, 3]))
+    tail, new_rows = tail_file(str(path), new_tail())
+    assert new_rows == 3
+
+    # A line still being written is left for the next read
+    with open(path, "ab") as file:
+        file.write(rows([4, 5], hour=17) + b"02-23-2009 18:00;6")
+    tail, new_rows = tail_file(str(path), tail)
+    assert new_rows == 2
+    assert tail_file(str(path), tail)[1] == 0
+    with open(path, "ab") as file:
+        file.write(b"0\r\n")
+    tail, new_rows = tail_file(str(path), tail)
+    assert new_rows == 1
+    assert tail["offset"] == path.stat().st_size
+    assert tail["accumulator"] == chunk_accumulator([1, 2, 3, 4, 5, 60])
+
+def test_truncated_file_is_read_from_the_start(tmp_path):
+    path = tmp_path / "patient_activity_01.csv"
+    path.write_bytes(HEADER + rows([1, 2, 3, 4]))
+    tail = tail_file(str(path), new_tail())[0]
+    path.write_bytes(HEADER + rows([7]))
+    tail, new_rows = tail_file(str(path), tail)
+    assert new_rows == -1
+    assert tail["accumulator"] == chunk_accumulator([7])
+
+def test_replaced_file_is_read_from_the_start(tmp_path):
+    # Same length but different first bytes is a new recording, not growth
+    path = tmp_path / "patient_activity_01.csv"
+    path.write_bytes(HEADER + rows([1, 2, 3]))
+    tail = tail_file(str(path), new_tail())[0]
+    path.write_bytes(HEADER + rows([9, 8, 7], hour=20) + rows([6], hour=21))
+    tail, new_rows = tail_file(str(path), tail)
+    assert new_rows == -1
+    assert tail["accumulator"] == chunk_accumulator([9, 8, 7, 6])
+
+def test_compressed_files_cannot_be_followed(tmp_path):
+    path = tmp_path / "patient_activity_01.csv.gz"
+    path.write_bytes(gzip.compress(HEADER + rows([1])))
+    with pytest.raises(ValueError, match="compressed files cannot be followed"):
+        tail_file(str(tmp_path / "patient_activity_01.csv"), new_tail())